@@ -0,0 +1,273 @@
+import os
+import time
+import asyncio
+import threading
+import traceback
+import contextlib
+from collections import deque
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import messenger_listener as bot
+from llm_client import call_llm_async, call_line_complete
+from telegram_client import AsyncTelegramClient, TelegramError
+
+class AsyncChatScheduler:
+    """
+    ChatScheduler for the event loop: each chat's jobs run in order as one
+    task, chats run concurrently (up to max_concurrent jobs at once), and
+    cancel() cancels the running task as well as setting the cancel_event
+    its blocking helpers poll.
+    """
+
+    def __init__(self, max_concurrent=64, max_queued_per_chat=10):
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._max_queued = max_queued_per_chat
+        # chat_id -> {"jobs": deque of (coalesce_key, func, args), "running": (coalesce_key, cancel_event, task)}
+        self._chats = {}
+        self._tasks = set()
+        self._stats = {"completed": 0, "failed": 0, "coalesced": 0, "cancelled": 0}
+
+    def submit(self, chat_id, func, *args, coalesce_key=None):
+        """Queues await func(*args, cancel_event=...). Returns "queued", "coalesced" or "busy"."""
+        chat = self._chats.get(chat_id)
+        if chat and coalesce_key is not None:
+            running = chat["running"]
+            in_flight = running and running[0] == coalesce_key and not running[1].is_set()
+            if in_flight or any(job[0] == coalesce_key for job in chat["jobs"]):
+                self._stats["coalesced"] += 1
+                return "coalesced"
+        if chat and len(chat["jobs"]) >= self._max_queued:
+            return "busy"
+
+        job = (coalesce_key, func, args)
+        if chat:
+            chat["jobs"].append(job)
+            return "queued"
+        self._chats[chat_id] = {"jobs": deque([job]), "running": None}
+        task = asyncio.create_task(self._drain(chat_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return "queued"
+
+    async def _run_job(self, func, args, cancel_event):
+        async with self._slots:
+            await func(*args, cancel_event=cancel_event)
+
+    async def _drain(self, chat_id):
+        chat = self._chats[chat_id]
+        while chat["jobs"]:
+            coalesce_key, func, args = chat["jobs"].popleft()
+            cancel_event = threading.Event()
+            task = asyncio.create_task(self._run_job(func, args, cancel_event))
+            chat["running"] = (coalesce_key, cancel_event, task)
+            try:
+                await task
+                self._stats["completed"] += 1
+            except asyncio.CancelledError:
+                # /cancel stopped this job; anything else (shutdown) stops the drain
+                if not cancel_event.is_set():
+                    raise
+            except Exception:
+                self._stats["failed"] += 1
+                print(f"Job {getattr(func, '__name__', func)} for chat {chat_id} failed:")
+                traceback.print_exc()
+            finally:
+                chat["running"] = None
+        del self._chats[chat_id]
+
+    def cancel(self, chat_id):
+        """Cancels the chat's running job and drops its queued ones. Returns (running_cancelled, dropped)."""
+        chat = self._chats.get(chat_id)
+        if not chat:
+            return False, 0
+        dropped = len(chat["jobs"])
+        chat["jobs"].clear()
+        running = chat["running"]
+        running_cancelled = bool(running) and not running[1].is_set()
+        if running_cancelled:
+            running[1].set()
+            running[2].cancel()
+        self._stats["cancelled"] += dropped + running_cancelled
+        return running_cancelled, dropped
+
+    def stats(self):
+        running = sum(1 for chat in self._chats.values() if chat["running"])
+        return {
+            "pending": running + sum(len(chat["jobs"]) for chat in self._chats.values()),
+            "completed": self._stats["completed"],
+            "failed": self._stats["failed"],
+            "active_chats": len(self._chats),
+            "queued": sum(len(chat["jobs"]) for chat in self._chats.values()),
+            "coalesced": self._stats["coalesced"],
+            "cancelled": self._stats["cancelled"],
+        }
+
+_scheduler = None
+_telegram = None
+_background = set()
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        settings = bot.load_config().get("triggers", {}).get("telegram", {})
+        _scheduler = AsyncChatScheduler(settings.get("max_concurrent", 64))
+    return _scheduler
+
+def get_telegram():
+    global _telegram
+    if _telegram is None:
+        _telegram = AsyncTelegramClient(os.getenv("TELEGRAM_BOT_TOKEN"))
+    return _telegram
+
+def spawn(coro):
+    """Runs coro in the background, keeping a reference so it is not garbage collected."""
+    task = asyncio.create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    return task
+
+async def send_message(chat_id, text, parse_mode="Markdown"):
+    try:
+        await get_telegram().send_message(chat_id, text, parse_mode)
+    except TelegramError as e:
+        print(f"Error sending message: {e}")
+
+# --- Async tools: network waits are awaited, blocking work runs in threads ---
+
+async def check_async(regenerate=False, cancel_event=None):
+    error, context = await asyncio.to_thread(bot.prepare_check, cancel_event)
+    if error:
+        return error
+    llm_data = await call_llm_async(context["prompt"], **bot.analysis_llm_args(context, regenerate))
+    return await asyncio.to_thread(bot.finish_check, context["data"], llm_data)
+
+ASYNC_TOOLS = {
+    "check_metrics": lambda cancel_event: check_async(cancel_event=cancel_event),
+    "regenerate_draft": lambda cancel_event: check_async(regenerate=True, cancel_event=cancel_event),
+}
+
+async def call_tool_async(tool_name, cancel_event=None, chat_id=None):
+    if tool_name in ASYNC_TOOLS:
+        return await ASYNC_TOOLS[tool_name](cancel_event=cancel_event)
+    return await asyncio.to_thread(bot.call_tool, tool_name, cancel_event, chat_id)
+
+async def agentic_loop_async(user_input, cancel_event=None, chat_id=None):
+    """run_agentic_loop with the LLM calls awaited."""
+    tool_name = await asyncio.to_thread(bot.route_fast_path, user_input)
+    if tool_name:
+        return await call_tool_async(tool_name, cancel_event, chat_id)
+
+    started = time.perf_counter()
+    res = await call_llm_async(bot.route_prompt(user_input), purpose="route", stop_when=call_line_complete(bot.TOOLS),
+                               validate=bot.route_accepted)
+    tool_name, reply = await asyncio.to_thread(bot.interpret_route, user_input, res, started)
+    if tool_name:
+        return await call_tool_async(tool_name, cancel_event, chat_id)
+    if reply:
+        return reply
+
+    chat_res = await call_llm_async(bot.chat_prompt(user_input), purpose="chat")
+    return bot.format_chat_reply(chat_res)
+
+async def stats_async():
+    scheduler_stats = get_scheduler().stats()
+    return await asyncio.to_thread(bot.trigger_stats, scheduler_stats, scheduler_stats, get_telegram().get_stats())
+
+async def handle_update_async(update, cancel_event=None):
+    """handle_update for the event loop; a cancelled job raises CancelledError and sends nothing."""
+    message = update.get("message", {})
+    chat_id = message.get("chat", {}).get("id")
+    text = message.get("text", "")
+
+    print(f"Received message: {text}")
+
+    # Agentic Brain Integration
+    if text and not text.startswith("/"):
+        await send_message(chat_id, "🧠 *Thinking...*")
+        await send_message(chat_id, await agentic_loop_async(text, cancel_event, chat_id))
+        return
+
+    # Command Handling
+    response_text = ""
+    if text == "/start":
+        response_text = bot.WELCOME_TEXT
+    elif text == "/help":
+        response_text = bot.HELP_TEXT
+    elif text == "/check_latest":
+        await send_message(chat_id, "🔍 **Scanning OpenLane designs...**")
+        response_text = await check_async(cancel_event=cancel_event)
+    elif text == "/regenerate":
+        await send_message(chat_id, "🔄 **Regenerating the analysis...**")
+        response_text = await check_async(regenerate=True, cancel_event=cancel_event)
+    elif text == "/confirm":
+        response_text = await asyncio.to_thread(bot.trigger_confirm_post, cancel_event, chat_id)
+    elif text.startswith("/schedule"):
+        response_text = await asyncio.to_thread(bot.trigger_schedule_post, text[len("/schedule"):], chat_id)
+    elif text == "/list_designs":
+        response_text = await asyncio.to_thread(bot.trigger_list_designs)
+    elif text == "/stats":
+        response_text = await stats_async()
+    elif text == "/clear_cache":
+        response_text = await asyncio.to_thread(bot.clear_metrics_cache)
+
+    if response_text:
+        await send_message(chat_id, response_text)
+
+async def telegram_webhook(request):
+    """Same contract as the Flask webhook: validate, de-duplicate, queue, ack."""
+    from database_manager import release_update
+
+    try:
+        update = await request.json()
+    except ValueError:
+        update = None
+    if not update:
+        return JSONResponse({"status": "error", "message": "No data received"}, status_code=400)
+
+    rejected = await asyncio.to_thread(bot.admit_update, update)
+    if rejected:
+        return JSONResponse({"status": rejected})
+
+    update_id = update.get("update_id")
+    message = update.get("message", {})
+    chat_id = message.get("chat", {}).get("id")
+    text = message.get("text", "")
+
+    # /cancel jumps the chat's queue
+    if text == "/cancel":
+        spawn(send_message(chat_id, bot.cancel_chat(chat_id, get_scheduler())))
+        return JSONResponse({"status": "ok"})
+
+    status = get_scheduler().submit(chat_id, handle_update_async, update,
+                                    coalesce_key=text if text in bot.COALESCED_COMMANDS else None)
+    if status == "busy":
+        # Let Telegram redeliver once the chat's queue has drained
+        if update_id is not None:
+            await asyncio.to_thread(release_update, update_id)
+        return JSONResponse({"status": "busy"}, status_code=503)
+    if status == "coalesced":
+        spawn(send_message(chat_id, bot.coalesced_notice(text)))
+
+    return JSONResponse({"status": status})
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    services = await asyncio.to_thread(bot.startup)
+    yield
+    for service in services:
+        await asyncio.to_thread(service.stop)
+    if _telegram is not None:
+        await _telegram.aclose()
+
+app = Starlette(routes=[Route("/telegram", telegram_webhook, methods=["POST"])], lifespan=lifespan)
+
+def run(port=5000):
+    print(f"🚀 Enterprise Bot Server (ASGI) starting on port {port}...")
+    uvicorn.run(app, host="0.0.0.0", port=port)
+
+if __name__ == "__main__":
+    run(int(os.environ.get("PORT", 5000)))
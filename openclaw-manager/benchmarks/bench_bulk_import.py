@@ -0,0 +1,58 @@
+"""
+Bulk-importing historical runs: one commit per row against the batch API
+(save_metrics_bulk / save_designs_bulk inside a single transaction()).
+
+    python benchmarks/bench_bulk_import.py [runs]
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database_manager
+
+
+def make_runs(count):
+    records = []
+    for i in range(count):
+        design = f"design_{i % 40}"
+        record = {
+            "design_name": design, "run_id": f"RUN_{i}", "timestamp": 1.7e9 + i,
+            "area_mm2": 100 + i % 7, "power_mw": 1.5, "slack_ns": 2.88, "drc_violations": 0,
+        }
+        records.append((record, f"/designs/{design}/runs/RUN_{i}"))
+    return records
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    records = make_runs(count)
+    designs = [(f"design_{i}", f"/designs/design_{i}", "") for i in range(40)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_manager.DB_PATH = os.path.join(tmp, "per_row.db")
+        database_manager.init_db()
+        start = time.perf_counter()
+        for record, run_path in records:
+            database_manager.append_metrics_history(record, run_path)
+        for design in designs:
+            database_manager.save_design(*design)
+        per_row = time.perf_counter() - start
+        database_manager.close_connection()
+
+        database_manager.DB_PATH = os.path.join(tmp, "bulk.db")
+        database_manager.init_db()
+        start = time.perf_counter()
+        with database_manager.transaction():
+            database_manager.save_metrics_bulk(records)
+            database_manager.save_designs_bulk(designs)
+        bulk = time.perf_counter() - start
+        database_manager.close_connection()
+
+    print(f"commit per row: {per_row:7.3f} s for {count} runs")
+    print(f"bulk, 1 commit: {bulk:7.3f} s for {count} runs ({per_row / bulk:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
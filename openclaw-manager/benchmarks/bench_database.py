@@ -0,0 +1,95 @@
+"""
+Micro-benchmark: connect-per-call with the default rollback journal (the old
+database_manager behaviour) against the pooled WAL connections.
+
+    python benchmarks/bench_database.py [ops_per_thread] [threads]
+"""
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database_manager
+
+
+def legacy_save_design(db_path, name):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute('''
+    INSERT OR REPLACE INTO designs (name, path, last_run_id, last_updated)
+    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+    ''', (name, "/designs/" + name, "RUN_1"))
+    conn.commit()
+    conn.close()
+
+
+def legacy_get_latest_pending_post(db_path):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT content, design_name FROM posts WHERE status = 'pending' ORDER BY created_at DESC LIMIT 1")
+    row = cursor.fetchone()
+    conn.close()
+    return row
+
+
+def pooled_save_design(db_path, name):
+    database_manager.save_design(name, "/designs/" + name, "RUN_1")
+
+
+def pooled_get_latest_pending_post(db_path):
+    return database_manager.get_latest_pending_post()
+
+
+def run(label, save, read, db_path, ops, threads):
+    errors = []
+
+    def worker(tid):
+        try:
+            for i in range(ops):
+                save(db_path, f"design_{tid}_{i % 50}")
+                read(db_path)
+        except sqlite3.OperationalError as e:
+            errors.append(e)
+        finally:
+            database_manager.close_connection()
+
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    total = ops * threads * 2
+    print(f"{label:<28} {total / elapsed:>10.0f} ops/s   ({total} ops, {threads} threads, {len(errors)} lock errors)")
+
+
+def main():
+    ops = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_db = os.path.join(tmp, "legacy.db")
+        pooled_db = os.path.join(tmp, "pooled.db")
+
+        database_manager.DB_PATH = legacy_db
+        database_manager.init_db()
+        database_manager.close_connection()
+        # init_db switched this file to WAL; put it back on the old rollback journal
+        conn = sqlite3.connect(legacy_db)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+
+        database_manager.DB_PATH = pooled_db
+        database_manager.init_db()
+
+        for n in (1, threads):
+            run("before: connect per call", legacy_save_design, legacy_get_latest_pending_post, legacy_db, ops, n)
+            run("after: pooled + WAL", pooled_save_design, pooled_get_latest_pending_post, pooled_db, ops, n)
+
+
+if __name__ == "__main__":
+    main()
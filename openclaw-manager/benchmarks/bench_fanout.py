@@ -0,0 +1,143 @@
+"""
+Multi-platform publishing against local mock X, Mastodon and LinkedIn
+servers: one platform after another versus publish_all()'s concurrent
+fan-out, then the outbox publisher draining a backlog across all three.
+
+    python benchmarks/bench_fanout.py [posts] [--latency-ms 200]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database_manager
+import publisher
+import publishers
+
+DRAFT = (
+    "🚀 Counter design hits tape-out readiness! Area is 12% below the Sky130 baseline and slack is +1.2 ns "
+    "at 100 MHz. Zero DRC, zero LVS, zero antenna violations.\n\n"
+    "Power lands at 8.1 µW/MHz/gate, well under the 10 µW target. Full report: "
+    "https://example.com/reports/counter #OpenLane #ASIC #Sky130\n\n"
+    "Next up: the AES core, where we expect similar gains from the new floorplan."
+)
+
+
+class MockPlatforms(BaseHTTPRequestHandler):
+    """X (/2/tweets), Mastodon (/api/v1/statuses) and LinkedIn (/rest/posts) on one port."""
+    protocol_version = "HTTP/1.1"
+    latency = 0.2
+    lock = threading.Lock()
+    received = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.latency)
+        with self.lock:
+            self.received.append((self.path, body))
+            post_id = str(len(self.received))
+        headers = {}
+        if self.path == "/2/tweets":
+            status, data = 201, {"data": {"id": post_id, "text": body["text"]}}
+            headers = {"x-rate-limit-limit": "100000", "x-rate-limit-remaining": "99999",
+                       "x-rate-limit-reset": str(int(time.time()) + 900)}
+        elif self.path == "/api/v1/statuses":
+            status, data = 200, {"id": post_id, "content": body["status"]}
+        elif self.path == "/rest/posts":
+            status, data = 201, {}
+            headers = {"x-restli-id": f"urn:li:share:{post_id}"}
+        else:
+            status, data = 404, {"error": "not found"}
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        for name, value in {**headers, "Content-Type": "application/json"}.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+def configure(base_url):
+    """Enables every platform, pointed at the mock, with placeholder credentials."""
+    os.environ.update({
+        "API_KEY": "mock", "API_SECRET": "mock", "ACCESS_TOKEN": "mock", "ACCESS_SECRET": "mock",
+        "MASTODON_ACCESS_TOKEN": "mock", "LINKEDIN_ACCESS_TOKEN": "mock", "LINKEDIN_AUTHOR_URN": "urn:li:person:mock",
+    })
+    settings = publishers.load_platform_settings()
+    settings["x"].update(enabled=True, api_base=base_url)
+    settings["mastodon"].update(enabled=True, base_url=base_url)
+    settings["linkedin"].update(enabled=True, api_base=base_url)
+    publishers.load_platform_settings = lambda: settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("posts", nargs="?", type=int, default=10)
+    parser.add_argument("--latency-ms", type=int, default=200, help="mock API response time")
+    args = parser.parse_args()
+    MockPlatforms.latency = args.latency_ms / 1000
+
+    server = _Server(("127.0.0.1", 0), MockPlatforms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    configure(f"http://127.0.0.1:{server.server_address[1]}")
+    platforms = publishers.enabled_platforms()
+
+    for platform in platforms:
+        parts = publishers.get_backend(platform).adapt(DRAFT)
+        print(f"{platform:<9} {len(parts)} part(s): {[len(part) for part in parts]} chars")
+
+    # Warm the pooled connections so both runs measure steady state
+    publishers.publish_all(DRAFT)
+
+    started = time.perf_counter()
+    for platform in platforms:
+        publishers.publish(platform, DRAFT)
+    sequential = time.perf_counter() - started
+
+    started = time.perf_counter()
+    results = publishers.publish_all(DRAFT)
+    concurrent = time.perf_counter() - started
+    failed = [platform for platform, result in results.items() if isinstance(result, publishers.PublishError)]
+
+    print(f"\none draft to {len(platforms)} platforms, {args.latency_ms} ms per API call")
+    print(f"  one after another: {sequential * 1000:7.0f} ms")
+    print(f"  publish_all:       {concurrent * 1000:7.0f} ms  ({sequential / concurrent:.1f}x, failed: {failed or 'none'})")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_manager.DB_PATH = os.path.join(tmp, "bench.db")
+        database_manager.init_db()
+        for i in range(args.posts):
+            post_id = database_manager.save_pending_post(f"design_{i}", f"{DRAFT} #{i}", "9")
+            publisher.queue_post(post_id, f"{DRAFT} #{i}")
+
+        worker = publisher.OutboxPublisher(idle_seconds=1)
+        started = time.perf_counter()
+        worker.start()
+        while sum(counts.get("sent", 0) for counts in database_manager.get_outbox_stats().values()) \
+                < args.posts * len(platforms):
+            time.sleep(0.02)
+        drained = time.perf_counter() - started
+        worker.stop()
+        stats = database_manager.get_outbox_stats()
+        database_manager.close_connection()
+
+    print(f"\noutbox: {args.posts} posts x {len(platforms)} platforms drained in {drained:.2f} s")
+    for platform, counts in sorted(stats.items()):
+        print(f"  {platform:<9} {counts}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
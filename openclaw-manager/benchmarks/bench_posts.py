@@ -0,0 +1,56 @@
+"""
+Latency of the draft lifecycle (save_pending_post -> get_latest_pending_post
+-> mark_post_published) as the posts table grows to 100k historical rows.
+
+    python benchmarks/bench_posts.py
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database_manager
+
+SIZES = (1_000, 10_000, 100_000)
+ROUNDS = 200
+
+
+def fill_history(conn, start, stop):
+    with conn:
+        conn.executemany(
+            "INSERT INTO posts (design_name, content, status, readiness_score) VALUES (?, ?, ?, ?)",
+            [(f"design_{i % 40}", f"Historical post #{i} " + "x" * 200,
+              "published" if i % 3 else "cancelled", "80%") for i in range(start, stop)])
+
+
+def measure():
+    start = time.perf_counter()
+    for i in range(ROUNDS):
+        database_manager.save_pending_post(f"design_{i % 40}", f"Draft {i}", "90%")
+        post_id, content, design_name = database_manager.get_latest_pending_post()
+        database_manager.mark_post_published(post_id)
+    return (time.perf_counter() - start) / ROUNDS * 1e6
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        for indexed in (False, True):
+            database_manager.DB_PATH = os.path.join(tmp, f"posts_{indexed}.db")
+            database_manager.init_db()
+            conn = database_manager.get_connection()
+            if not indexed:
+                conn.execute("DROP INDEX idx_posts_status_created")
+                conn.execute("DROP INDEX idx_posts_design_status")
+
+            filled = 0
+            for size in SIZES:
+                fill_history(conn, filled, size)
+                filled = size
+                label = "indexed" if indexed else "no indexes"
+                print(f"{label:<11} {size:>7} historical posts: {measure():8.1f} us per save/get/publish cycle")
+            database_manager.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Webhook load test: the Flask server (threaded, job queue) against the ASGI
+server (Starlette + uvicorn, one event loop), both talking to local stubs
+of the NVIDIA streaming API and the Telegram Bot API.
+
+Every update is a chat message the router sends to the LLM, so each one
+costs one streamed completion plus two sendMessage calls. Latency is from
+posting the update to its reply reaching the Telegram stub.
+
+    python benchmarks/load_test.py [updates] [--llm-ms 400] [--chats N]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database_manager
+import intent_router
+import llm_client
+import telegram_client
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class LLMStub(BaseHTTPRequestHandler):
+    """OpenAI-compatible streaming endpoint that answers every prompt with a short REPLY."""
+    protocol_version = "HTTP/1.1"
+    chunk_delay = 0.05
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for piece in ["REPLY: ", "Hello ", "from ", "the ", "stub ", "model."]:
+            time.sleep(self.chunk_delay)
+            chunk = {"id": "stub", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                     "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+            self._write(f"data: {json.dumps(chunk)}\n\n".encode())
+        self._write(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+class TelegramStub(BaseHTTPRequestHandler):
+    """Bot API stub recording when each chat receives its final reply."""
+    protocol_version = "HTTP/1.1"
+    lock = threading.Lock()
+    sent = {}
+    replied_at = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        chat_id = body.get("chat_id")
+        with self.lock:
+            count = self.sent[chat_id] = self.sent.get(chat_id, 0) + 1
+            # "Thinking..." first, then the answer
+            if count == 2:
+                self.replied_at[chat_id] = time.perf_counter()
+        data = json.dumps({"ok": True, "result": {"message_id": count}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    @classmethod
+    def reset(cls):
+        with cls.lock:
+            cls.sent = {}
+            cls.replied_at = {}
+
+
+def start_stub(handler):
+    server = _StubServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def configure(llm_url, telegram_url, tmp):
+    """Points the bot at the stubs and a scratch database, with caches and rate limits out of the way."""
+    os.environ["NVIDIA_API_KEY"] = "stub"
+    os.environ["TELEGRAM_BOT_TOKEN"] = "stub"
+    os.environ.pop("TELEGRAM_AUTHORIZED_USER_ID", None)
+
+    llm_settings = llm_client.load_llm_settings()
+    llm_settings.update({"base_url": f"{llm_url}/v1", "max_connections": 1000})
+    llm_settings["cache"] = {**llm_settings["cache"], "enabled": False}
+    llm_client.load_llm_settings = lambda: llm_settings
+
+    telegram_settings = telegram_client.load_telegram_settings()
+    telegram_settings.update({"api_base": telegram_url, "global_per_second": 100_000,
+                              "chat_per_second": 100_000, "chat_burst": 100_000})
+    telegram_client.load_telegram_settings = lambda: telegram_settings
+
+    database_manager.DB_PATH = os.path.join(tmp, "load_test.db")
+    database_manager.init_db()
+    intent_router.MODEL_PATH = os.path.join(tmp, "no_router_model.json")
+
+
+def start_flask(port):
+    from werkzeug.serving import make_server
+    import messenger_listener
+
+    server = make_server("127.0.0.1", port, messenger_listener.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.shutdown
+
+
+def start_asgi(port):
+    import uvicorn
+    import asgi_server
+
+    server = uvicorn.Server(uvicorn.Config(asgi_server.app, host="127.0.0.1", port=port,
+                                           log_level="warning", lifespan="off", backlog=1024))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+        thread.join()
+    return stop
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run_load(url, updates, chats, first_update_id):
+    TelegramStub.reset()
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=64))
+    posted_at = {}
+    acks = []
+
+    def post(i):
+        chat_id = 1000 + i % chats
+        update = {"update_id": first_update_id + i,
+                  "message": {"chat": {"id": chat_id}, "from": {"id": 1}, "text": f"hello there #{i}"}}
+        start = time.perf_counter()
+        posted_at.setdefault(chat_id, start)
+        r = session.post(f"{url}/telegram", json=update, timeout=60)
+        acks.append(time.perf_counter() - start)
+        return r.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=64) as pool:
+        statuses = list(pool.map(post, range(updates)))
+
+    # With one update per chat, the second message to a chat is that update's reply
+    deadline = time.time() + 300
+    while len(TelegramStub.replied_at) < min(chats, updates) and time.time() < deadline:
+        time.sleep(0.05)
+    finished = max(TelegramStub.replied_at.values(), default=time.perf_counter())
+
+    latencies = [TelegramStub.replied_at[c] - posted_at[c] for c in TelegramStub.replied_at]
+    return {
+        "replied": len(latencies),
+        "rejected": sum(1 for status in statuses if status != 200),
+        "throughput": len(latencies) / (finished - started),
+        "p50": percentile(latencies, 50) if latencies else float("nan"),
+        "p99": percentile(latencies, 99) if latencies else float("nan"),
+        "ack_p99": percentile(acks, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("updates", nargs="?", type=int, default=200)
+    parser.add_argument("--llm-ms", type=int, default=300, help="stub completion time")
+    parser.add_argument("--chats", type=int, default=None, help="distinct chats (default: one per update)")
+    args = parser.parse_args()
+    chats = args.chats or args.updates
+    LLMStub.chunk_delay = args.llm_ms / 1000 / 6
+
+    llm_server, llm_url = start_stub(LLMStub)
+    telegram_server, telegram_url = start_stub(TelegramStub)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(llm_url, telegram_url, tmp)
+        results = {}
+        for offset, (name, start) in enumerate((("flask", start_flask), ("asgi", start_asgi))):
+            port = 18700 + offset
+            stop = start(port)
+            try:
+                results[name] = run_load(f"http://127.0.0.1:{port}", args.updates, chats, offset * 1_000_000)
+            finally:
+                stop()
+        database_manager.close_connection()
+
+    llm_server.shutdown()
+    telegram_server.shutdown()
+
+    print(f"{args.updates} updates from {chats} chats, {args.llm_ms} ms per stub completion")
+    print(f"{'server':<7}{'replied':>9}{'503s':>6}{'updates/s':>11}{'p50 s':>8}{'p99 s':>8}{'ack p99 ms':>12}")
+    for name, r in results.items():
+        print(f"{name:<7}{r['replied']:>9}{r['rejected']:>6}{r['throughput']:>11.1f}{r['p50']:>8.2f}{r['p99']:>8.2f}"
+              f"{r['ack_p99'] * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
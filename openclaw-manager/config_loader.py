@@ -0,0 +1,34 @@
+import os
+import json
+import threading
+
+# Get the directory of the current script
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
+
+_config_cache = {"mtime": None, "config": None}
+_config_lock = threading.Lock()
+
+def load_config():
+    """
+    config.json, re-parsed only when the file changes. Shared by every
+    module, so treat the result as read-only. Raises OSError or ValueError
+    when the file is missing or invalid.
+    """
+    mtime = os.path.getmtime(CONFIG_PATH)
+    with _config_lock:
+        if _config_cache["config"] is None or _config_cache["mtime"] != mtime:
+            with open(CONFIG_PATH, 'r') as f:
+                _config_cache["config"] = json.load(f)
+            _config_cache["mtime"] = mtime
+        return _config_cache["config"]
+
+def load_section(*keys, default=None):
+    """config[keys[0]][keys[1]]..., or default ({} if not given) when the file or a key is missing."""
+    try:
+        section = load_config()
+        for key in keys:
+            section = section[key]
+    except (OSError, ValueError, KeyError, TypeError):
+        return {} if default is None else default
+    return section
@@ -1,12 +1,95 @@
 import sqlite3
 import os
+import json
+import sys
+import time
+import threading
+from contextlib import contextmanager
 
-DB_PATH = "bot_data.db"
+# Anchored at the script directory so the DB is the same whatever the cwd
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "bot_data.db")
 
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
+# Wait this long on a locked database before raising "database is locked"
+BUSY_TIMEOUT_MS = 5000
+
+_local = threading.local()
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000)
+    # WAL lets readers run alongside the writer; NORMAL sync is durable in WAL
+    # mode except for the last commits on power loss, and saves an fsync per commit
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-8000")  # 8 MB page cache
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+def get_connection():
+    """
+    Returns this thread's connection to DB_PATH, opening it on first use.
+    Connections are never shared across threads, and a forked worker process
+    opens its own instead of reusing the parent's.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.pid != os.getpid() or _local.path != DB_PATH:
+        conn = _connect(DB_PATH)
+        _local.conn, _local.pid, _local.path = conn, os.getpid(), DB_PATH
+        _local.tx_depth = 0
+    return conn
+
+@contextmanager
+def transaction():
+    """
+    Unit of work: every write made on this thread inside the block commits
+    (or rolls back) together. Nested calls, including the write functions in
+    this module, join the outermost transaction, so e.g.
+
+        with transaction():
+            save_designs_bulk(designs)
+            save_metrics_bulk(records)
+
+    is a single commit.
+    """
+    conn = get_connection()
+    if getattr(_local, "tx_depth", 0):
+        _local.tx_depth += 1
+        try:
+            yield conn
+        finally:
+            _local.tx_depth -= 1
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    _local.tx_depth = 1
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        _local.tx_depth = 0
+
+def close_connection():
+    """Closes this thread's connection, if any."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.pid == os.getpid():
+        conn.close()
+    _local.conn = None
+
+# --- Schema migrations ---
+# Each migration is applied once, in order; PRAGMA user_version records the
+# last one applied. Never edit a shipped migration, append a new one instead.
+# All CREATE statements use IF NOT EXISTS so databases created before
+# versioning (user_version 0) upgrade cleanly.
+
+# Rows copied per statement when a migration has to rebuild a table
+MIGRATION_BATCH_SIZE = 5000
+
+def _migration_base_tables(cursor):
+    """designs and posts tables"""
     # Table for chip designs
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS designs (
@@ -29,48 +112,562 @@ def init_db():
         created_at DATETIME DEFAULT CURRENT_TIMESTAMP
     )
     ''')
-    
-    conn.commit()
-    conn.close()
+
+def _migration_run_index(cursor):
+    """runs table: index of OpenLane runs so discovery only re-scans runs that changed"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        design_name TEXT,
+        run_name TEXT,
+        path TEXT,
+        dir_mtime REAL,
+        gds_found INTEGER DEFAULT 0,
+        last_scanned DATETIME DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(design_name, run_name)
+    )
+    ''')
+
+def _migration_metrics_cache(cursor):
+    """metrics_cache table: extracted metrics valid while the source reports' fingerprint matches"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS metrics_cache (
+        run_path TEXT PRIMARY KEY,
+        fingerprint TEXT,
+        sources TEXT,
+        metrics TEXT,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+def _migration_metrics_history(cursor):
+    """metrics_history table: append-only metrics per extracted run, for trend queries"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS metrics_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        design_name TEXT,
+        run_id TEXT,
+        run_path TEXT,
+        timestamp REAL,
+        area_mm2 REAL,
+        power_mw REAL,
+        slack_ns REAL,
+        drc_violations INTEGER,
+        lvs_errors INTEGER,
+        antenna_violations INTEGER,
+        density_pct REAL,
+        ir_drop_pct REAL,
+        recorded_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_metrics_history_design_ts ON metrics_history (design_name, timestamp)")
+
+def _migration_posts_indexes(cursor):
+    """posts indexes for the latest pending draft lookup and per-design cancellation"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_status_created ON posts (status, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_design_status ON posts (design_name, status)")
+
+def _migration_routing_log(cursor):
+    """routing_log table: labelled messages for training the local intent router"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS routing_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        message TEXT,
+        label TEXT,
+        source TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+def _migration_llm_cache(cursor):
+    """llm_cache table: persisted LLM responses keyed by request hash, expired by age"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS llm_cache (
+        cache_key TEXT PRIMARY KEY,
+        model TEXT,
+        content TEXT,
+        reasoning TEXT,
+        created_at REAL
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache (created_at)")
+
+def _migration_processed_updates(cursor):
+    """processed_updates table: Telegram update_ids already accepted, so redeliveries are ignored"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS processed_updates (
+        update_id INTEGER PRIMARY KEY,
+        received_at REAL
+    )
+    ''')
+
+def _migration_bot_state(cursor):
+    """bot_state table: small named values kept across restarts, such as the getUpdates offset"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS bot_state (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    ''')
+
+def _migration_post_results(cursor):
+    """posts columns for the publish result: tweet id, publish time, last error and the X rate-limit window"""
+    for column in ("tweet_id TEXT", "published_at REAL", "last_error TEXT",
+                   "rate_limit_limit INTEGER", "rate_limit_remaining INTEGER", "rate_limit_reset INTEGER"):
+        cursor.execute(f"ALTER TABLE posts ADD COLUMN {column}")
+
+def _migration_outbox(cursor):
+    """outbox table: posts waiting to be published, with retry state and an idempotency key per post and platform"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        idempotency_key TEXT UNIQUE,
+        post_id INTEGER,
+        platform TEXT,
+        content TEXT,
+        status TEXT DEFAULT 'queued',
+        attempts INTEGER DEFAULT 0,
+        not_before REAL,
+        notify_chat_id INTEGER,
+        remote_id TEXT,
+        last_error TEXT,
+        created_at REAL,
+        updated_at REAL
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_outbox_status_due ON outbox (status, not_before)")
+
+def _migration_metrics_history_unique(cursor):
+    """metrics_history: one row per (design_name, run_id), so re-extracting a run updates it instead of adding a duplicate"""
+    cursor.execute('''
+    DELETE FROM metrics_history WHERE id NOT IN (
+        SELECT MAX(id) FROM metrics_history GROUP BY design_name, run_id
+    )
+    ''')
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_metrics_history_design_run ON metrics_history (design_name, run_id)")
+
+def _migration_outbox_progress(cursor):
+    """outbox remote_ids column: ids of the thread parts already posted, so a retry resumes after them"""
+    cursor.execute("ALTER TABLE outbox ADD COLUMN remote_ids TEXT")
+
+# Position in this list is the schema version (1-based)
+MIGRATIONS = [
+    _migration_base_tables,
+    _migration_run_index,
+    _migration_metrics_cache,
+    _migration_metrics_history,
+    _migration_posts_indexes,
+    _migration_routing_log,
+    _migration_llm_cache,
+    _migration_processed_updates,
+    _migration_bot_state,
+    _migration_post_results,
+    _migration_outbox,
+    _migration_metrics_history_unique,
+    _migration_outbox_progress,
+]
+
+def rebuild_table(cursor, table, create_sql, columns, batch_size=MIGRATION_BATCH_SIZE):
+    """
+    For migrations that change column types or constraints, which SQLite's
+    ALTER TABLE cannot do: creates the new table from create_sql (which must
+    create "<table>_new"), copies `columns` over in rowid batches so no single
+    statement holds the whole table, then swaps it in. Indexes on the old
+    table are dropped with it and must be recreated by the migration.
+    """
+    cursor.execute(create_sql)
+    column_list = ", ".join(columns)
+    last_rowid = 0
+    while True:
+        cursor.execute(f"SELECT MAX(rowid) FROM (SELECT rowid FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?)",
+                       (last_rowid, batch_size))
+        batch_end = cursor.fetchone()[0]
+        if batch_end is None:
+            break
+        cursor.execute(f"INSERT INTO {table}_new ({column_list}) SELECT {column_list} FROM {table} "
+                       f"WHERE rowid > ? AND rowid <= ?", (last_rowid, batch_end))
+        last_rowid = batch_end
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+def get_schema_version():
+    return get_connection().execute("PRAGMA user_version").fetchone()[0]
+
+def pending_migrations():
+    """[(version, description)] of migrations not yet applied."""
+    current = get_schema_version()
+    return [(version, migration.__doc__) for version, migration in enumerate(MIGRATIONS, start=1)
+            if version > current]
+
+def migrate(dry_run=False):
+    """
+    Applies all pending migrations in a single transaction and bumps
+    PRAGMA user_version. With dry_run=True only prints the plan.
+    Returns the list of (version, description) applied (or planned).
+    """
+    plan = pending_migrations()
+    if dry_run:
+        print(f"Schema version {get_schema_version()}, {len(plan)} pending migration(s):")
+        for version, description in plan:
+            print(f"  {version}: {description}")
+        return plan
+    if not plan:
+        return plan
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        # Re-check under the write lock in case another process migrated first
+        current = cursor.execute("PRAGMA user_version").fetchone()[0]
+        for version, migration in enumerate(MIGRATIONS, start=1):
+            if version > current:
+                migration(cursor)
+        cursor.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    for version, description in plan:
+        print(f"Applied migration {version}: {description}")
+    return plan
+
+def init_db():
+    migrate()
     print("Database initialized successfully.")
 
 def save_design(name, path, last_run=""):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-    INSERT OR REPLACE INTO designs (name, path, last_run_id, last_updated)
-    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-    ''', (name, path, last_run))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute('''
+        INSERT OR REPLACE INTO designs (name, path, last_run_id, last_updated)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (name, path, last_run))
+
+def save_designs_bulk(designs):
+    """Upserts many (name, path, last_run) tuples with one executemany."""
+    with transaction() as conn:
+        conn.executemany('''
+        INSERT OR REPLACE INTO designs (name, path, last_run_id, last_updated)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ''', designs)
 
 def save_pending_post(design_name, content, score):
-    conn = sqlite3.connect(DB_PATH)
+    """Stores a new pending draft, cancelling older ones for the design. Returns the post id."""
+    with transaction() as conn:
+        cursor = conn.cursor()
+        # Mark old pending posts for this design as cancelled
+        cursor.execute("UPDATE posts SET status = 'cancelled' WHERE design_name = ? AND status = 'pending'", (design_name,))
+        
+        cursor.execute('''
+        INSERT INTO posts (design_name, content, readiness_score)
+        VALUES (?, ?, ?)
+        ''', (design_name, content, score))
+    return cursor.lastrowid
+
+def get_latest_pending_post():
+    """Returns (post_id, content, design_name) of the newest pending draft, or None."""
+    conn = get_connection()
     cursor = conn.cursor()
-    # Mark old pending posts for this design as cancelled
-    cursor.execute("UPDATE posts SET status = 'cancelled' WHERE design_name = ? AND status = 'pending'", (design_name,))
-    
     cursor.execute('''
-    INSERT INTO posts (design_name, content, readiness_score)
-    VALUES (?, ?, ?)
-    ''', (design_name, content, score))
-    conn.commit()
-    conn.close()
+    SELECT id, content, design_name FROM posts
+    WHERE status = 'pending' ORDER BY created_at DESC, id DESC LIMIT 1
+    ''')
+    return cursor.fetchone()
 
-def get_latest_pending_post():
-    conn = sqlite3.connect(DB_PATH)
+def mark_post_published(post_id, tweet_id=None, rate_limit=None):
+    """
+    Publishes a pending or queued post by id (returns False if it was
+    neither) and records the tweet id and X rate-limit window when given.
+    """
+    rate_limit = rate_limit or {}
+    with transaction() as conn:
+        cursor = conn.execute('''
+        UPDATE posts SET status = 'published', published_at = ?, last_error = NULL
+        WHERE id = ? AND status IN ('pending', 'queued')
+        ''', (time.time(), post_id))
+        if tweet_id is not None or rate_limit:
+            conn.execute('''
+            UPDATE posts SET tweet_id = COALESCE(?, tweet_id), rate_limit_limit = COALESCE(?, rate_limit_limit),
+                rate_limit_remaining = COALESCE(?, rate_limit_remaining), rate_limit_reset = COALESCE(?, rate_limit_reset)
+            WHERE id = ?
+            ''', (tweet_id, rate_limit.get("limit"), rate_limit.get("remaining"), rate_limit.get("reset"), post_id))
+    return cursor.rowcount == 1
+
+def record_post_failure(post_id, error, rate_limit=None):
+    """Keeps a failed publish attempt's error (and rate-limit window, if known) on the still-pending post."""
+    rate_limit = rate_limit or {}
+    with transaction() as conn:
+        conn.execute('''
+        UPDATE posts SET last_error = ?, rate_limit_limit = COALESCE(?, rate_limit_limit),
+            rate_limit_remaining = COALESCE(?, rate_limit_remaining), rate_limit_reset = COALESCE(?, rate_limit_reset)
+        WHERE id = ?
+        ''', (error, rate_limit.get("limit"), rate_limit.get("remaining"), rate_limit.get("reset"), post_id))
+
+def get_indexed_runs(design_name):
+    """Returns {run_name: (path, dir_mtime, gds_found)} for a design."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT run_name, path, dir_mtime, gds_found FROM runs WHERE design_name = ?", (design_name,))
+    rows = cursor.fetchall()
+    return {run_name: (path, dir_mtime, bool(gds_found)) for run_name, path, dir_mtime, gds_found in rows}
+
+def update_run_index(design_name, scanned_runs, removed_runs=()):
+    """
+    Upserts re-scanned runs as (run_name, path, dir_mtime, gds_found) tuples
+    and drops runs that no longer exist on disk.
+    """
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.executemany('''
+        INSERT INTO runs (design_name, run_name, path, dir_mtime, gds_found, last_scanned)
+        VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(design_name, run_name) DO UPDATE SET
+            path = excluded.path,
+            dir_mtime = excluded.dir_mtime,
+            gds_found = excluded.gds_found,
+            last_scanned = CURRENT_TIMESTAMP
+        ''', [(design_name, run_name, path, mtime, int(gds)) for run_name, path, mtime, gds in scanned_runs])
+        cursor.executemany("DELETE FROM runs WHERE design_name = ? AND run_name = ?",
+                           [(design_name, run_name) for run_name in removed_runs])
+
+def get_cached_metrics(run_path):
+    """Returns (metrics, sources, fingerprint) for a run, or None."""
+    conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT content, design_name FROM posts WHERE status = 'pending' ORDER BY created_at DESC LIMIT 1")
+    cursor.execute("SELECT metrics, sources, fingerprint FROM metrics_cache WHERE run_path = ?", (run_path,))
     row = cursor.fetchone()
-    conn.close()
-    return row
+    if not row:
+        return None
+    return json.loads(row[0]), json.loads(row[1]), row[2]
+
+def save_cached_metrics(run_path, metrics, sources, fingerprint):
+    with transaction() as conn:
+        conn.execute('''
+        INSERT OR REPLACE INTO metrics_cache (run_path, fingerprint, sources, metrics, updated_at)
+        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (run_path, fingerprint, json.dumps(sources), json.dumps(metrics)))
+
+def invalidate_metrics_cache(run_path=None):
+    """Drops the cached metrics for one run, or all runs. Returns the number of entries removed."""
+    with transaction() as conn:
+        cursor = conn.cursor()
+        if run_path:
+            cursor.execute("DELETE FROM metrics_cache WHERE run_path = ?", (run_path,))
+        else:
+            cursor.execute("DELETE FROM metrics_cache")
+    return cursor.rowcount
+
+HISTORY_COLUMNS = (
+    "design_name", "run_id", "timestamp", "area_mm2", "power_mw", "slack_ns", "drc_violations",
+    "lvs_errors", "antenna_violations", "density_pct", "ir_drop_pct",
+)
+
+# A run extracted again (cache invalidated, reports changed, watcher and /check racing) replaces its row
+_UPSERT_HISTORY = f'''
+INSERT INTO metrics_history (run_path, {", ".join(HISTORY_COLUMNS)})
+VALUES (?, {", ".join("?" for _ in HISTORY_COLUMNS)})
+ON CONFLICT (design_name, run_id) DO UPDATE SET
+    run_path = excluded.run_path,
+    {", ".join(f"{col} = excluded.{col}" for col in HISTORY_COLUMNS[2:])},
+    recorded_at = CURRENT_TIMESTAMP
+'''
+
+def append_metrics_history(record, run_path):
+    """Records one run's metrics (a MetricsRecord dict) in metrics_history, replacing any earlier row for the run."""
+    with transaction() as conn:
+        conn.execute(_UPSERT_HISTORY, (run_path, *(record.get(col) for col in HISTORY_COLUMNS)))
+
+def save_metrics_bulk(records):
+    """Records many (MetricsRecord dict, run_path) pairs in metrics_history with one executemany."""
+    with transaction() as conn:
+        conn.executemany(_UPSERT_HISTORY,
+                         [(run_path, *(record.get(col) for col in HISTORY_COLUMNS)) for record, run_path in records])
 
-def mark_post_published(content):
-    conn = sqlite3.connect(DB_PATH)
+def get_metrics_history(design_name, limit=50):
+    """
+    Newest-first metrics for a design, e.g. the area trend over the last 50 runs.
+    Served by a range scan on idx_metrics_history_design_ts.
+    """
+    conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("UPDATE posts SET status = 'published' WHERE content = ?", (content,))
-    conn.commit()
-    conn.close()
+    cursor.row_factory = sqlite3.Row
+    cursor.execute(f'''
+    SELECT {", ".join(HISTORY_COLUMNS)} FROM metrics_history
+    WHERE design_name = ? ORDER BY timestamp DESC LIMIT ?
+    ''', (design_name, limit))
+    return [dict(row) for row in cursor.fetchall()]
+
+def log_routing_decision(message, label, source):
+    """Records how a message was routed ('rules', 'model' or 'llm') for router training."""
+    with transaction() as conn:
+        conn.execute("INSERT INTO routing_log (message, label, source) VALUES (?, ?, ?)", (message, label, source))
+
+def get_routing_examples():
+    """
+    [(message, label)] of the decisions the LLM made. Rows the local tiers
+    routed are left out, so the model never learns from its own mistakes.
+    """
+    conn = get_connection()
+    return conn.execute("SELECT message, label FROM routing_log WHERE source = 'llm'").fetchall()
+
+def get_llm_cache_entry(cache_key, max_age_seconds):
+    """Returns (content, reasoning, created_at) if cached within max_age_seconds, else None."""
+    conn = get_connection()
+    return conn.execute(
+        "SELECT content, reasoning, created_at FROM llm_cache WHERE cache_key = ? AND created_at >= ?",
+        (cache_key, time.time() - max_age_seconds),
+    ).fetchone()
+
+def save_llm_cache_entry(cache_key, model, content, reasoning, created_at):
+    with transaction() as conn:
+        conn.execute('''
+        INSERT OR REPLACE INTO llm_cache (cache_key, model, content, reasoning, created_at)
+        VALUES (?, ?, ?, ?, ?)
+        ''', (cache_key, model, content, reasoning, created_at))
+
+def prune_llm_cache(max_age_seconds=None):
+    """Deletes expired responses, or all of them if max_age_seconds is None. Returns the number removed."""
+    with transaction() as conn:
+        cursor = conn.cursor()
+        if max_age_seconds is None:
+            cursor.execute("DELETE FROM llm_cache")
+        else:
+            cursor.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - max_age_seconds,))
+    return cursor.rowcount
+
+def claim_update(update_id):
+    """Records a Telegram update_id. True the first time, False for a redelivery."""
+    with transaction() as conn:
+        cursor = conn.execute("INSERT OR IGNORE INTO processed_updates (update_id, received_at) VALUES (?, ?)",
+                              (update_id, time.time()))
+    return cursor.rowcount == 1
+
+def release_update(update_id):
+    """Forgets a claimed update_id so Telegram's redelivery is processed (e.g. when it could not be queued)."""
+    with transaction() as conn:
+        conn.execute("DELETE FROM processed_updates WHERE update_id = ?", (update_id,))
+
+def prune_processed_updates(max_age_seconds=7 * 86400):
+    """Telegram stops redelivering long before max_age_seconds. Returns the number removed."""
+    with transaction() as conn:
+        cursor = conn.execute("DELETE FROM processed_updates WHERE received_at < ?", (time.time() - max_age_seconds,))
+    return cursor.rowcount
+
+# --- Outbox ---
+# Row status: queued -> sending -> sent | failed. "sending" is written before
+# the API call, so a row found in that state after a restart may already be
+# live; the publisher re-sends it and relies on the platform's duplicate check.
+
+OUTBOX_COLUMNS = ("id", "idempotency_key", "post_id", "platform", "content", "attempts", "notify_chat_id", "remote_ids")
+
+def enqueue_outbox(post_id, platform, content, not_before=None, notify_chat_id=None):
+    """
+    Queues a post for publishing on platform at not_before (now if None) and
+    marks the post queued. A post already queued or sent for the platform is
+    left alone; a failed one is queued again, resuming after the parts it
+    already posted unless the content changed. Returns True if it was queued.
+    """
+    now = time.time()
+    with transaction() as conn:
+        cursor = conn.execute('''
+        INSERT INTO outbox (idempotency_key, post_id, platform, content, not_before, notify_chat_id, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (idempotency_key) DO UPDATE SET
+            status = 'queued', attempts = 0, content = excluded.content, not_before = excluded.not_before,
+            notify_chat_id = excluded.notify_chat_id, last_error = NULL, updated_at = excluded.updated_at,
+            remote_ids = CASE WHEN outbox.content = excluded.content THEN outbox.remote_ids END
+        WHERE outbox.status = 'failed'
+        ''', (f"post-{post_id}-{platform}", post_id, platform, content, not_before or now, notify_chat_id, now, now))
+        if cursor.rowcount == 1:
+            conn.execute("UPDATE posts SET status = 'queued' WHERE id = ? AND status = 'pending'", (post_id,))
+    return cursor.rowcount == 1
+
+def claim_next_outbox(now, skip_platforms=()):
+    """Moves the first-queued due row (outside skip_platforms) to sending and returns it as a dict, or None."""
+    skip = tuple(skip_platforms)
+    with transaction() as conn:
+        row = conn.execute(f'''
+        SELECT {", ".join(OUTBOX_COLUMNS)} FROM outbox
+        WHERE status = 'queued' AND not_before <= ? AND platform NOT IN ({",".join("?" * len(skip))})
+        ORDER BY id LIMIT 1
+        ''', (now, *skip)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE outbox SET status = 'sending', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                     (now, row[0]))
+    item = dict(zip(OUTBOX_COLUMNS, row))
+    item["attempts"] += 1
+    item["remote_ids"] = json.loads(item["remote_ids"]) if item["remote_ids"] else []
+    return item
+
+def next_outbox_due(skip_platforms=()):
+    """Earliest not_before of the queued rows outside skip_platforms, or None."""
+    skip = tuple(skip_platforms)
+    row = get_connection().execute(f'''
+    SELECT MIN(not_before) FROM outbox WHERE status = 'queued' AND platform NOT IN ({",".join("?" * len(skip))})
+    ''', skip).fetchone()
+    return row[0]
+
+def record_outbox_progress(outbox_id, remote_ids):
+    """Stores the ids of the parts posted so far, right after each one, so a retry or restart resumes after them."""
+    with transaction() as conn:
+        conn.execute("UPDATE outbox SET remote_ids = ?, updated_at = ? WHERE id = ?",
+                     (json.dumps(remote_ids), time.time(), outbox_id))
+
+def complete_outbox(outbox_id, remote_id):
+    with transaction() as conn:
+        conn.execute("UPDATE outbox SET status = 'sent', remote_id = ?, last_error = NULL, updated_at = ? WHERE id = ?",
+                     (remote_id, time.time(), outbox_id))
+
+def retry_outbox(outbox_id, not_before, error, count_attempt=True):
+    """Puts a row back in the queue until not_before; a rate-limited attempt is not counted."""
+    with transaction() as conn:
+        conn.execute('''
+        UPDATE outbox SET status = 'queued', not_before = ?, last_error = ?, updated_at = ?,
+            attempts = attempts - ?
+        WHERE id = ?
+        ''', (not_before, error, time.time(), 0 if count_attempt else 1, outbox_id))
+
+def fail_outbox(outbox_id, error):
+    """
+    Gives up on a row. If no other platform has published the post, it goes
+    back to pending so it can be confirmed again; returns whether it did.
+    """
+    with transaction() as conn:
+        conn.execute("UPDATE outbox SET status = 'failed', last_error = ?, updated_at = ? WHERE id = ?",
+                     (error, time.time(), outbox_id))
+        cursor = conn.execute('''
+        UPDATE posts SET status = 'pending', last_error = ?
+        WHERE id = (SELECT post_id FROM outbox WHERE id = ?) AND status = 'queued'
+            AND NOT EXISTS (SELECT 1 FROM outbox WHERE post_id = posts.id AND status IN ('queued', 'sending'))
+        ''', (error, outbox_id))
+    return cursor.rowcount == 1
+
+def requeue_interrupted_outbox():
+    """Returns rows left in sending by a crash or restart to the queue. Returns how many."""
+    with transaction() as conn:
+        cursor = conn.execute("UPDATE outbox SET status = 'queued', updated_at = ? WHERE status = 'sending'",
+                              (time.time(),))
+    return cursor.rowcount
+
+def get_outbox_stats():
+    """{platform: {status: rows}} for the outbox."""
+    stats = {}
+    for platform, status, count in get_connection().execute(
+            "SELECT platform, status, COUNT(*) FROM outbox GROUP BY platform, status"):
+        stats.setdefault(platform, {})[status] = count
+    return stats
+
+def get_bot_state(key, default=None):
+    row = get_connection().execute("SELECT value FROM bot_state WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+def set_bot_state(key, value):
+    with transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO bot_state (key, value) VALUES (?, ?)", (key, str(value)))
 
 if __name__ == "__main__":
-    init_db()
+    if "--dry-run" in sys.argv:
+        migrate(dry_run=True)
+    else:
+        init_db()
@@ -1,26 +1,210 @@
 import os
+import argparse
+import glob
+import hashlib
 import json
 import re
 import sys
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
-def extract_metrics(reports_dir):
+from database_manager import (
+    init_db, get_indexed_runs, update_run_index,
+    get_cached_metrics, save_cached_metrics, invalidate_metrics_cache,
+    get_metrics_history, save_designs_bulk, save_metrics_bulk, transaction,
+)
+from config_loader import load_section
+
+# Get the directory of the current script
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+METRICS_DIR = os.path.join(BASE_DIR, "data", "public_metrics")
+
+# Metric -> (pattern, converter). Each pattern has exactly one capture group.
+METRIC_PATTERNS = {
+    "area_mm2": (r"Chip area for module.*:\s*([\d\.]+)", float),
+    "power_mw": (r"Total Power\s*=\s*([\d\.e\-]+)\s*W", lambda v: float(v) * 1000),  # W -> mW
+    "slack_ns": (r"worst slack\s*([\d\.\-]+)", float),
+    "drc_violations": (r"violation count\s*([\d]+)", int),
+    # Tape-out checklist extras from SKILL.md; None when the run has no such report
+    "lvs_errors": (r"Total errors\s*=\s*(\d+)", int),
+    "antenna_violations": (r"(?:Net violations|Number of pins violated):\s*(\d+)", int),
+    "density_pct": (r"Design area [\d\.]+ u\^2 ([\d\.]+)% utilization", float),
+    "ir_drop_pct": (r"Percentage drop\s*:\s*([\d\.e\-]+)\s*%", float),
+}
+
+# Metrics that fall back to a full-tree scan when their known reports are missing.
+# The extended checklist metrics are only looked up in their known reports.
+CORE_METRICS = ("area_mm2", "power_mw", "slack_ns", "drc_violations")
+
+METRIC_REGEXES = {key: re.compile(pattern) for key, (pattern, convert) in METRIC_PATTERNS.items()}
+
+# Reports are streamed in chunks so peak memory stays flat regardless of log size
+CHUNK_SIZE = 1024 * 1024
+# Longest partial line carried between chunks before its head is dropped
+MAX_CARRY = 64 * 1024
+
+class ExtractionCancelled(Exception):
+    """Raised when an extraction's cancel_event is set."""
+
+def _check_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise ExtractionCancelled()
+
+def scan_report(path, wanted, cancel_event=None):
+    """
+    Streams a report once and returns {metric: value} for the first match of
+    each wanted metric. Stops reading as soon as all of them are found.
+    Raises ExtractionCancelled between chunks once cancel_event is set.
+    """
+    found = {}
+    remaining = set(wanted)
+    carry = ""
+
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        while remaining:
+            _check_cancelled(cancel_event)
+            chunk = f.read(CHUNK_SIZE)
+            if chunk:
+                # Only match complete lines; the partial tail waits for the next chunk
+                cut = chunk.rfind("\n") + 1
+                if not cut:
+                    carry = (carry + chunk)[-MAX_CARRY:]
+                    continue
+                block, carry = carry + chunk[:cut], chunk[cut:]
+            else:
+                block, carry = carry, ""
+
+            # Separate searches per metric keep re's literal-prefix fast scan;
+            # a combined alternation over the block is ~100x slower in CPython.
+            for key in list(remaining):
+                match = METRIC_REGEXES[key].search(block)
+                if not match:
+                    continue
+                try:
+                    found[key] = METRIC_PATTERNS[key][1](match.group(1))
+                except ValueError:
+                    continue
+                remaining.discard(key)
+
+            if not chunk:
+                break
+
+    return found
+
+# Known OpenLane (1.x and 2.x) report locations per metric, relative to the run
+# directory. Overridable via skill_settings.agentic_pr.report_globs in config.json.
+DEFAULT_REPORT_GLOBS = {
+    "area_mm2": [
+        "reports/synthesis/*stat*.rpt",
+        "*-yosys-synthesis/reports/stat.rpt",
+    ],
+    "power_mw": [
+        "reports/signoff/*sta*.power.rpt",
+        "reports/signoff/*sta*.summary.rpt",
+        "*-openroad-stapostpnr/**/*power*.rpt",
+    ],
+    "slack_ns": [
+        "reports/signoff/*sta*.summary.rpt",
+        "reports/signoff/*sta*.worst_slack.rpt",
+        "*-openroad-stapostpnr/**/summary.rpt",
+    ],
+    "drc_violations": [
+        "reports/signoff/drc.rpt",
+        "reports/signoff/*magic*drc*",
+        "reports/signoff/*klayout*drc*",
+        "logs/signoff/*drc*.log",
+        "*-magic-drc/reports/*",
+        "*-klayout-drc/reports/*",
+    ],
+    "lvs_errors": [
+        "reports/signoff/*lvs*.rpt",
+        "logs/signoff/*lvs*.log",
+        "*-netgen-lvs/reports/*",
+    ],
+    "antenna_violations": [
+        "reports/signoff/*antenna*.rpt",
+        "logs/signoff/*antenna*.log",
+        "*-openroad-checkantennas/reports/*",
+    ],
+    "density_pct": [
+        "logs/placement/*global*.log",
+        "*-openroad-globalplacement/*.log",
+    ],
+    "ir_drop_pct": [
+        "reports/signoff/*irdrop*.rpt",
+        "logs/signoff/*irdrop*.log",
+        "*-openroad-irdropreport/reports/*",
+    ],
+}
+
+def load_report_globs():
+    """Report globs from config.json, falling back to the built-in OpenLane layout."""
+    return load_section("skill_settings", "agentic_pr", "report_globs", default=DEFAULT_REPORT_GLOBS)
+
+def _known_reports(reports_dir, patterns):
+    """Files matching the given globs under the run, newest first."""
+    paths = set()
+    for pattern in patterns:
+        paths.update(p for p in glob.glob(os.path.join(glob.escape(reports_dir), pattern), recursive=True)
+                     if os.path.isfile(p))
+    return sorted(paths, key=os.path.getmtime, reverse=True)
+
+def _extract(reports_dir, report_globs, cancel_event=None):
+    """
+    Returns (metrics, sources, complete) where sources are the reports that
+    supplied a value and complete says every core metric was found.
+    """
     metrics = {
         "area_mm2": 0.0,
         "power_mw": 0.0,
         "slack_ns": 0.0,
-        "drc_violations": 0
+        "drc_violations": 0,
+        "lvs_errors": None,
+        "antenna_violations": None,
+        "density_pct": None,
+        "ir_drop_pct": None,
     }
 
-    # Common patterns for extraction
-    patterns = {
-        "area": re.compile(r"Chip area for module.*:\s*([\d\.]+)"),
-        "power": re.compile(r"Total Power\s*=\s*([\d\.e\-]+)\s*W"),
-        "slack": re.compile(r"worst slack\s*([\d\.\-]+)"),
-        "drc": re.compile(r"violation count\s*([\d]+)")
-    }
+    missing = set(metrics)
+    searched = {}  # path -> metrics already looked for in it
+    sources = []
+
+    def scan(path, wanted):
+        searched.setdefault(path, set()).update(wanted)
+        try:
+            found = scan_report(path, wanted, cancel_event)
+        except ExtractionCancelled:
+            raise
+        except Exception as e:
+            print(f"Error reading {path}: {e}")
+            return
+        if found:
+            sources.append(path)
+        metrics.update(found)
+        missing.difference_update(found)
+
+    # Targeted pass: each known report once, newest first, for only the metrics
+    # its globs matched, so a report is not read to EOF for metrics it never
+    # holds and e.g. a step log's "Design area" line cannot supply density_pct
+    report_keys = {}
+    for key in metrics:
+        for path in _known_reports(reports_dir, report_globs.get(key, [])):
+            report_keys.setdefault(path, []).append(key)
+    for path in sorted(report_keys, key=os.path.getmtime, reverse=True):
+        wanted = missing.intersection(report_keys[path])
+        if wanted:
+            scan(path, wanted)
+
+    if not missing.intersection(CORE_METRICS):
+        return metrics, sources, True
 
+    # Fallback: grep the whole run tree for whatever is still missing
     collected_files = []
     for root, dirs, files in os.walk(reports_dir):
+        _check_cancelled(cancel_event)
         for file in files:
             if file.endswith(".rpt") or file.endswith(".log") or file.endswith(".json"):
                 path = os.path.join(root, file)
@@ -29,61 +213,143 @@ def extract_metrics(reports_dir):
     # Sort files by modification time descending to process newer files first
     collected_files.sort(key=lambda x: x[1], reverse=True)
 
-    found_metrics = {k: False for k in metrics}
-
     for path, mtime in collected_files:
-        try:
-            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-                
-                # Area
-                if not found_metrics["area_mm2"]:
-                    area_match = patterns["area"].search(content)
-                    if area_match:
-                        metrics["area_mm2"] = float(area_match.group(1))
-                        found_metrics["area_mm2"] = True
-                
-                # Power (convert W to mW)
-                if not found_metrics["power_mw"]:
-                    power_match = patterns["power"].search(content)
-                    if power_match:
-                        metrics["power_mw"] = float(power_match.group(1)) * 1000
-                        found_metrics["power_mw"] = True
-                
-                # Slack
-                if not found_metrics["slack_ns"]:
-                    slack_match = patterns["slack"].search(content)
-                    if slack_match:
-                        metrics["slack_ns"] = float(slack_match.group(1))
-                        found_metrics["slack_ns"] = True
-                        
-                # DRC
-                if not found_metrics["drc_violations"]:
-                    drc_match = patterns["drc"].search(content)
-                    if drc_match:
-                        metrics["drc_violations"] = int(drc_match.group(1))
-                        found_metrics["drc_violations"] = True
-                        
-            # If all found, we can stop early
-            if all(found_metrics.values()):
-                break
-        except Exception as e:
-            print(f"Error reading {path}: {e}")
+        wanted = missing.intersection(CORE_METRICS).difference(searched.get(path, ()))
+        if wanted:
+            scan(path, wanted)
+
+        # If all found, we can stop early
+        if not missing.intersection(CORE_METRICS):
+            break
 
+    return metrics, sources, not missing.intersection(CORE_METRICS)
+
+def extract_metrics(reports_dir, report_globs=None):
+    if report_globs is None:
+        report_globs = load_report_globs()
+    metrics, sources, complete = _extract(reports_dir, report_globs)
     return metrics
 
+def _fingerprint(run_path, sources, report_globs):
+    """
+    Hash of (size, mtime) for the run directory, every contributing report
+    and every report the globs match, plus the globs used, so a report that
+    lands after the first extraction (e.g. signoff after the GDS) changes it.
+    Only stats files, never opens them. None if a contributing file is gone.
+    """
+    entries = []
+    for path in [run_path] + sources:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        entries.append((path, st.st_size, st.st_mtime))
+    candidates = set()
+    for patterns in report_globs.values():
+        for pattern in patterns:
+            candidates.update(glob.glob(os.path.join(glob.escape(run_path), pattern), recursive=True))
+    for path in sorted(candidates.difference(sources)):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((path, st.st_size, st.st_mtime))
+    payload = json.dumps([entries, report_globs], sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
 
-def find_latest_completed_run(designs_dir):
+def _lookup_cache(run_path, report_globs):
     """
-    Navigates designs/<name>/runs/<run_name> to find the latest run where GDS exists.
+    Metrics from the metrics_cache table in bot_data.db if the contributing
+    reports are unchanged, else None. Only stats files, never opens a report.
+    """
+    cached = get_cached_metrics(run_path)
+    if cached:
+        metrics, sources, fingerprint = cached
+        if fingerprint and _fingerprint(run_path, sources, report_globs) == fingerprint:
+            return metrics
+    return None
+
+
+# OpenLane writes the final GDS to one of these, relative to the run directory
+GDS_RESULT_DIRS = (
+    os.path.join("results", "signoff"),
+    os.path.join("results", "final", "gds"),
+)
+
+def _run_has_gds(run_path):
+    """Full walk of runs/<run>/results looking for a GDS."""
+    results_dir = os.path.join(run_path, "results")
+    if not os.path.exists(results_dir):
+        return False
+    for root, dirs, files in os.walk(results_dir):
+        if any(f.endswith(".gds") for f in files):
+            return True
+    return False
+
+def _probe_gds_dirs(run_path):
+    """Cheap check of the known GDS locations only."""
+    for rel_dir in GDS_RESULT_DIRS:
+        try:
+            if any(f.endswith(".gds") for f in os.listdir(os.path.join(run_path, rel_dir))):
+                return True
+        except OSError:
+            continue
+    return False
+
+def index_design_runs(design_name, runs_dir):
+    """
+    Refreshes the persistent run index for one design and returns
+    {run_name: (path, dir_mtime, gds_found)}.
+
+    Only runs whose directory mtime changed (or that are new) get the full
+    results/ walk. A GDS landing deep in results/ does not touch the run
+    directory mtime, so incomplete runs newer than the latest completed one
+    additionally get a probe of the known GDS directories.
+    """
+    indexed = get_indexed_runs(design_name)
+    current = {}
+    rescanned = []
+    unchanged_incomplete = []
+
+    with os.scandir(runs_dir) as entries:
+        for entry in entries:
+            if not entry.is_dir():
+                continue
+            mtime = entry.stat().st_mtime
+            cached = indexed.get(entry.name)
+            if cached and cached[0] == entry.path and cached[1] == mtime:
+                current[entry.name] = cached
+                if not cached[2]:
+                    unchanged_incomplete.append(entry.name)
+                continue
+
+            gds_found = _run_has_gds(entry.path)
+            current[entry.name] = (entry.path, mtime, gds_found)
+            rescanned.append((entry.name, entry.path, mtime, gds_found))
+
+    latest_completed = max((mtime for path, mtime, gds in current.values() if gds), default=0)
+    for run_name in unchanged_incomplete:
+        path, mtime, _ = current[run_name]
+        if mtime > latest_completed and _probe_gds_dirs(path):
+            current[run_name] = (path, mtime, True)
+            rescanned.append((run_name, path, mtime, True))
+
+    removed = [run_name for run_name in indexed if run_name not in current]
+    if rescanned or removed:
+        update_run_index(design_name, rescanned, removed)
+    return current
+
+def index_all_designs(designs_dir, max_workers=None):
+    """
+    Refreshes the run index for every design under designs_dir, one design per
+    thread (a cold scan of a network share is latency-bound).
+    Returns {design_name: {run_name: (path, dir_mtime, gds_found)}}.
     """
-    latest_run_path = None
-    latest_mtime = 0
-    
     if not os.path.exists(designs_dir):
         print(f"Designs directory not found: {designs_dir}")
-        return None
+        return {}
 
+    runs_dirs = {}
     for design_name in os.listdir(designs_dir):
         design_path = os.path.join(designs_dir, design_name)
         if not os.path.isdir(design_path):
@@ -92,59 +358,269 @@ def find_latest_completed_run(designs_dir):
         runs_dir = os.path.join(design_path, "runs")
         if not os.path.exists(runs_dir):
             continue
-            
-        for run_name in os.listdir(runs_dir):
-            run_path = os.path.join(runs_dir, run_name)
-            if not os.path.isdir(run_path):
-                continue
-                
-            # Check for GDS completion
-            # Path pattern usually: runs/<run>/results/signoff/<design>.gds 
-            # or runs/<run>/results/final/gds/<design>.gds
-            gds_found = False
-            results_dir = os.path.join(run_path, "results")
-            if os.path.exists(results_dir):
-                for root, dirs, files in os.walk(results_dir):
-                    if any(f.endswith(".gds") for f in files):
-                        gds_found = True
-                        break
-            
-            if gds_found:
-                mtime = os.path.getmtime(run_path)
-                if mtime > latest_mtime:
-                    latest_mtime = mtime
-                    latest_run_path = run_path
-                    
-    return latest_run_path
+        runs_dirs[design_name] = runs_dir
+
+    if not runs_dirs:
+        return {}
+
+    workers = min(max_workers or default_worker_count(designs_dir) * 2, len(runs_dirs))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(index_design_runs, name, runs_dir): name for name, runs_dir in runs_dirs.items()}
+        return {futures[future]: future.result() for future in as_completed(futures)}
+
+def _latest_completed(runs):
+    """(run_path, mtime) of the newest run with a GDS, or None."""
+    completed = [(path, mtime) for path, mtime, gds_found in runs.values() if gds_found]
+    return max(completed, key=lambda run: run[1]) if completed else None
+
+def find_latest_runs_by_design(designs_dir):
+    """
+    Returns {design_name: (run_path, mtime)} with the latest completed (GDS)
+    run of every design under designs/<name>/runs/<run_name>.
+    """
+    latest_runs = {}
+    for design_name, runs in index_all_designs(designs_dir).items():
+        latest = _latest_completed(runs)
+        if latest:
+            latest_runs[design_name] = latest
+    return latest_runs
+
+def find_latest_completed_run(designs_dir):
+    """
+    Navigates designs/<name>/runs/<run_name> to find the latest run where GDS exists.
+    Uses the run index in bot_data.db so a warm lookup is one listdir per design.
+    """
+    latest_runs = find_latest_runs_by_design(designs_dir)
+    if not latest_runs:
+        return None
+    run_path, mtime = max(latest_runs.values(), key=lambda run: run[1])
+    return run_path
+
+def _is_network_path(path):
+    """UNC shares (e.g. \\\\wsl.localhost) where every stat is a network round-trip."""
+    return path.startswith("\\\\") or path.startswith("//")
+
+def default_worker_count(designs_dir):
+    cpus = os.cpu_count() or 1
+    # Extraction over a network share is latency-bound, so oversubscribe threads
+    return min(32, cpus * 4) if _is_network_path(designs_dir) else cpus
+
+def extract_all(designs_dir, latest_runs=None, max_workers=None):
+    """
+    Extracts metrics for the latest completed run of every design concurrently.
+    Returns {design_name: metrics}. Local trees use a process pool sized to the
+    CPU count; network shares use a larger thread pool since workers mostly
+    wait on I/O.
+    """
+    if latest_runs is None:
+        latest_runs = find_latest_runs_by_design(designs_dir)
+    if not latest_runs:
+        return {}
+
+    report_globs = load_report_globs()
+    workers = min(max_workers or default_worker_count(designs_dir), len(latest_runs))
+    pool_cls = ThreadPoolExecutor if _is_network_path(designs_dir) else ProcessPoolExecutor
+
+    outcomes = []
+    with pool_cls(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_extract_unsaved, design_name, run_path, report_globs): design_name
+            for design_name, (run_path, mtime) in latest_runs.items()
+        }
+        for future in as_completed(futures):
+            design_name = futures[future]
+            try:
+                outcomes.append(future.result())
+            except Exception as e:
+                print(f"Error extracting {design_name}: {e}")
+
+    # Workers never touch the DB; the whole scan is persisted in one transaction
+    _persist(outcomes)
+    return {result.design_name: result.to_dict() for result, cache_entry in outcomes}
+
+def save_all_metrics(results, latest_runs):
+    """Writes one <design>.json per design plus a combined index.json."""
+    os.makedirs(METRICS_DIR, exist_ok=True)
+
+    index = {}
+    for design_name, data in sorted(results.items()):
+        file_name = f"{design_name}.json"
+        with open(os.path.join(METRICS_DIR, file_name), 'w') as f:
+            json.dump(data, f, indent=4)
+        run_path, mtime = latest_runs[design_name]
+        index[design_name] = {"run_path": run_path, "run_mtime": mtime, "file": file_name, "metrics": data}
+
+    index_path = os.path.join(METRICS_DIR, "index.json")
+    with open(index_path, 'w') as f:
+        json.dump(index, f, indent=4)
+    return index_path
+
+@dataclass(slots=True)
+class MetricsRecord:
+    """One run's metrics, as stored in metrics_history and sent to the LLM."""
+    design_name: str
+    run_id: str
+    timestamp: float  # run directory mtime
+    area_mm2: float = 0.0
+    power_mw: float = 0.0
+    slack_ns: float = 0.0
+    drc_violations: int = 0
+    lvs_errors: Optional[int] = None
+    antenna_violations: Optional[int] = None
+    density_pct: Optional[float] = None
+    ir_drop_pct: Optional[float] = None
+
+    @classmethod
+    def from_metrics(cls, design_name, run_path, metrics):
+        known = {key: value for key, value in metrics.items() if key in METRIC_PATTERNS}
+        return cls(design_name, os.path.basename(run_path), os.path.getmtime(run_path), **known)
+
+    def to_dict(self):
+        return asdict(self)
+
+@dataclass
+class ExtractionResult:
+    """Metrics for one completed run, as returned by extract_latest."""
+    record: MetricsRecord
+    run_path: str
+    from_cache: bool = False
+
+    @property
+    def design_name(self):
+        return self.record.design_name
+
+    def to_dict(self):
+        """The latest.json / LLM prompt shape."""
+        return self.record.to_dict()
+
+def _extract_unsaved(design_name, run_path, report_globs, cancel_event=None):
+    """
+    Extraction without any DB writes, safe to run in a pool worker.
+    Returns (ExtractionResult, cache_entry); cache_entry is None on a cache hit.
+    """
+    metrics = _lookup_cache(run_path, report_globs)
+    if metrics is not None:
+        return ExtractionResult(MetricsRecord.from_metrics(design_name, run_path, metrics), run_path, True), None
+
+    metrics, sources, complete = _extract(run_path, report_globs, cancel_event)
+    # A run still missing core metrics may be mid-flow; without a fingerprint the next lookup re-extracts it
+    fingerprint = _fingerprint(run_path, sources, report_globs) if complete else None
+    cache_entry = (run_path, metrics, sources, fingerprint)
+    return ExtractionResult(MetricsRecord.from_metrics(design_name, run_path, metrics), run_path, False), cache_entry
+
+def _persist(outcomes):
+    """Caches and records in metrics_history every fresh extraction, in one transaction."""
+    fresh = [(result, cache_entry) for result, cache_entry in outcomes if cache_entry]
+    if not fresh:
+        return
+    with transaction():
+        for result, cache_entry in fresh:
+            save_cached_metrics(*cache_entry)
+        save_metrics_bulk([(result.to_dict(), result.run_path) for result, cache_entry in fresh])
+
+def extract_run(design_name, run_path, report_globs=None, cancel_event=None):
+    """
+    Extracts (or serves from cache) one run and records fresh extractions
+    to metrics_history. Returns an ExtractionResult. Raises
+    ExtractionCancelled, with nothing saved, if cancel_event gets set.
+    """
+    if report_globs is None:
+        report_globs = load_report_globs()
+    outcome = _extract_unsaved(design_name, run_path, report_globs, cancel_event)
+    _persist([outcome])
+    return outcome[0]
+
+def extract_latest(designs_dir, report_globs=None, cancel_event=None):
+    """
+    In-process entry point for the bot: extracts the latest completed run.
+    Returns an ExtractionResult, or None if no completed GDS run exists.
+    """
+    latest_run = find_latest_completed_run(designs_dir)
+    if not latest_run:
+        return None
+    # runs/<run> lives under designs/<design_name>
+    design_name = os.path.basename(os.path.dirname(os.path.dirname(latest_run)))
+    return extract_run(design_name, latest_run, report_globs, cancel_event)
+
+def save_latest(result):
+    """Writes the result to data/public_metrics/latest.json and returns the path."""
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    output_path = os.path.join(METRICS_DIR, "latest.json")
+    with open(output_path, 'w') as f:
+        json.dump(result.to_dict(), f, indent=4)
+    return output_path
+
+# Inventory served to /list_designs; refreshed at most every INVENTORY_TTL seconds
+INVENTORY_TTL = 30
+_inventory_lock = threading.Lock()
+_inventory_cache = {"designs_dir": None, "scanned_at": 0.0, "designs": []}
+
+def scan_inventory(designs_dir):
+    """
+    Per-design summary: run count, GDS readiness, latest completed run and
+    its last recorded metrics. Also refreshes the designs table.
+    """
+    inventory = []
+    designs = []
+    for design_name, runs in sorted(index_all_designs(designs_dir).items()):
+        latest = _latest_completed(runs)
+        latest_run = os.path.basename(latest[0]) if latest else None
+        history = get_metrics_history(design_name, limit=1)
+        inventory.append({
+            "name": design_name,
+            "run_count": len(runs),
+            "gds_ready": latest is not None,
+            "latest_run": latest_run,
+            "last_metrics": history[0] if history else None,
+        })
+        designs.append((design_name, os.path.join(designs_dir, design_name), latest_run or ""))
+    save_designs_bulk(designs)
+    return inventory
+
+def get_design_inventory(designs_dir, max_age=INVENTORY_TTL):
+    """Cached scan_inventory; pass max_age=0 to force a refresh."""
+    with _inventory_lock:
+        cache = _inventory_cache
+        if cache["designs_dir"] != designs_dir or time.monotonic() - cache["scanned_at"] >= max_age:
+            cache["designs"] = scan_inventory(designs_dir)
+            cache["designs_dir"] = designs_dir
+            cache["scanned_at"] = time.monotonic()
+        return cache["designs"]
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python extract_metrics.py <designs_directory>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Extract OpenLane metrics for the latest completed run.")
+    parser.add_argument("designs_directory")
+    parser.add_argument("--all", action="store_true", help="extract the latest run of every design concurrently")
+    parser.add_argument("--workers", type=int, help="pool size (default: CPU count, more for network shares)")
+    parser.add_argument("--invalidate-cache", action="store_true", help="drop all cached metrics before extracting")
+    args = parser.parse_args()
+
+    designs_path = args.designs_directory
+    init_db()
 
-    designs_path = sys.argv[1]
+    if args.invalidate_cache:
+        print(f"Invalidated {invalidate_metrics_cache()} cached metric entries.")
+
+    if args.all:
+        latest_runs = find_latest_runs_by_design(designs_path)
+        results = extract_all(designs_path, latest_runs, args.workers)
+        if not results:
+            print("No completed GDS runs found.")
+            sys.exit(1)
+        index_path = save_all_metrics(results, latest_runs)
+        print(f"Metrics for {len(results)} designs saved to {index_path}")
+        sys.exit(0)
     
-    # Discovery phase
-    latest_run = find_latest_completed_run(designs_path)
+    result = extract_latest(designs_path)
     
-    if not latest_run:
+    if not result:
         print("No completed GDS runs found.")
         sys.exit(1)
         
-    print(f"Processing latest run: {latest_run}")
-    data = extract_metrics(latest_run)
-    
-    # Store design name for the post
-    design_name = os.path.basename(os.path.dirname(os.path.dirname(latest_run)))
-    data["design_name"] = design_name
-    
-    # Ensure data directory exists
-    os.makedirs("data/public_metrics", exist_ok=True)
-    
-    output_path = "data/public_metrics/latest.json"
-    with open(output_path, 'w') as f:
-        json.dump(data, f, indent=4)
-        
-    print(f"Metrics saved to {output_path}")
-    print(json.dumps(data, indent=2))
+    print(f"Processing latest run: {result.run_path}")
+    if result.from_cache:
+        print("Reports unchanged, using cached metrics.")
 
+    output_path = save_latest(result)
+    print(f"Metrics saved to {output_path}")
+    print(json.dumps(result.to_dict(), indent=2))
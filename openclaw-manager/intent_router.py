@@ -0,0 +1,179 @@
+import os
+import re
+import sys
+import json
+import math
+import threading
+from collections import Counter, defaultdict
+
+from database_manager import init_db, get_routing_examples
+
+# Get the directory of the current script
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(BASE_DIR, "data", "router_model.json")
+
+# Tier 1: keyword rules. A message is routed only if exactly one tool matches.
+RULES = {
+    "list_designs": [
+        re.compile(r"\b(list|inventory|show)\b.*\b(designs?|projects?|folders?)\b"),
+        re.compile(r"\binventory\b"),
+    ],
+    "check_metrics": [
+        re.compile(r"\b(check|analy[sz]e|metrics|benchmarks?|tape-?out|readiness|slack|drc)\b"),
+        re.compile(r"\bhow is my (chip|design)\b"),
+    ],
+    "regenerate_draft": [
+        re.compile(r"\b(regenerate|redo|rewrite)\b.*\b(draft|post|analysis)\b"),
+        re.compile(r"\b(fresh|new|different) (draft|post)\b"),
+    ],
+    # Publishing is public, so only a bare command that is the whole message counts
+    "confirm_post": [
+        re.compile(r"^(please |ok(ay)?,? |yes,? )?(post it|publish( it)?|confirm|go ahead|tweet it|send it)"
+                   r"( now)?( please)?[.!]*$"),
+        re.compile(r"^(please )?post (it )?(to|on) (x|twitter)( now)?[.!]*$"),
+    ],
+}
+
+# Tools the n-gram model never picks; only their anchored rules route them locally
+RULES_ONLY = {"confirm_post"}
+
+# Negations, questions and anything with a time in it always go to the LLM
+ESCALATE = re.compile(
+    r"\b(don'?t|do not|never|cancel|stop|wait|not yet)\b"
+    r"|\?\s*$"
+    r"|^\s*(how|why|what|which|who|where|when|should|shall|is|are|can|could|does|do|will|would)\b"
+    r"|\b(today|tonight|tomorrow|later|morning|afternoon|evening|noon|midnight|weekend|schedule[d]?"
+    r"|(mon|tues|wednes|thurs|fri|satur|sun)day)\b"
+    r"|\b(next|this) (week|month)\b|\bin \d+\s*(m|min|mins|minutes?|h|hrs?|hours?|days?)\b"
+    r"|\bat \d{1,2}\b|\b\d{1,2}(:\d{2})?\s*(am|pm)\b|\b\d{1,2}:\d{2}\b"
+)
+
+# Tier 2: n-gram naive Bayes model trained from the LLM's decisions in routing_log
+MIN_TRAINING_EXAMPLES = 30
+MODEL_CONFIDENCE = 0.9
+# Label for messages the LLM answered directly; never routed locally
+CHAT_LABEL = "chat"
+
+_model_lock = threading.Lock()
+_model_cache = {"mtime": None, "model": None}
+
+_stats_lock = threading.Lock()
+_stats = {"rules": 0, "model": 0, "llm": 0, "local_us": 0.0, "llm_ms": 0.0}
+
+def _tokens(text):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+def _features(text):
+    """Word unigrams plus bigrams."""
+    words = _tokens(text)
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+def match_rules(text):
+    """The single tool whose rules match, or None if none or several do."""
+    lowered = text.lower()
+    if ESCALATE.search(lowered):
+        return None
+    lowered = lowered.strip()
+    matched = [tool for tool, patterns in RULES.items() if any(p.search(lowered) for p in patterns)]
+    return matched[0] if len(matched) == 1 else None
+
+def train_model(examples, path=MODEL_PATH):
+    """Fits the n-gram model on [(message, label)] and saves it to disk."""
+    labels = defaultdict(lambda: {"docs": 0, "total": 0, "features": Counter()})
+    vocab = set()
+    for message, label in examples:
+        features = _features(message)
+        entry = labels[label]
+        entry["docs"] += 1
+        entry["total"] += len(features)
+        entry["features"].update(features)
+        vocab.update(features)
+
+    model = {"examples": len(examples), "vocab_size": len(vocab), "labels": labels}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(model, f)
+    return model
+
+def _load_model():
+    try:
+        mtime = os.path.getmtime(MODEL_PATH)
+    except OSError:
+        return None
+    with _model_lock:
+        if _model_cache["mtime"] != mtime:
+            with open(MODEL_PATH, 'r') as f:
+                _model_cache["model"] = json.load(f)
+            _model_cache["mtime"] = mtime
+        return _model_cache["model"]
+
+def predict(text, model):
+    """(label, probability) from the n-gram model."""
+    features = _features(text)
+    vocab_size = model["vocab_size"] + 1
+    scores = {}
+    for label, entry in model["labels"].items():
+        score = math.log(entry["docs"] / model["examples"])
+        denominator = entry["total"] + vocab_size
+        for feature in features:
+            score += math.log((entry["features"].get(feature, 0) + 1) / denominator)
+        scores[label] = score
+    best = max(scores, key=scores.get)
+    norm = sum(math.exp(score - scores[best]) for score in scores.values())
+    return best, 1 / norm
+
+def route_locally(text):
+    """
+    Resolves obvious requests without the LLM. Returns (tool_name, tier)
+    with tier 'rules' or 'model', or (None, None) to escalate.
+    """
+    tool = match_rules(text)
+    if tool:
+        return tool, "rules"
+
+    model = _load_model()
+    if model and model["examples"] >= MIN_TRAINING_EXAMPLES and not ESCALATE.search(text.lower()):
+        label, probability = predict(text, model)
+        if label != CHAT_LABEL and label not in RULES_ONLY and probability >= MODEL_CONFIDENCE:
+            return label, "model"
+    return None, None
+
+def record_route(tier, elapsed_s):
+    """Counts a routing decision; tier is 'rules', 'model' or 'llm'."""
+    with _stats_lock:
+        _stats[tier] += 1
+        if tier == "llm":
+            _stats["llm_ms"] += elapsed_s * 1000
+        else:
+            _stats["local_us"] += elapsed_s * 1e6
+
+def get_router_stats():
+    """Hit rate of the local tiers and the LLM routing time they saved."""
+    with _stats_lock:
+        stats = dict(_stats)
+    local = stats["rules"] + stats["model"]
+    total = local + stats["llm"]
+    avg_llm_ms = stats["llm_ms"] / stats["llm"] if stats["llm"] else None
+    avg_local_us = stats["local_us"] / local if local else None
+    return {
+        "routed": total,
+        "rules_hits": stats["rules"],
+        "model_hits": stats["model"],
+        "llm_routes": stats["llm"],
+        "hit_rate": local / total if total else None,
+        "avg_local_us": avg_local_us,
+        "avg_llm_ms": avg_llm_ms,
+        # Each local hit skips one LLM routing round-trip
+        "saved_ms": avg_llm_ms * local if avg_llm_ms is not None else None,
+    }
+
+if __name__ == "__main__":
+    if "--train" not in sys.argv:
+        print("Usage: python intent_router.py --train")
+        sys.exit(1)
+    init_db()
+    examples = get_routing_examples()
+    model = train_model(examples)
+    print(f"Trained router on {model['examples']} LLM-routed messages ({model['vocab_size']} n-grams) -> {MODEL_PATH}")
+    if model["examples"] < MIN_TRAINING_EXAMPLES:
+        print(f"Note: the model is only used once it has {MIN_TRAINING_EXAMPLES}+ examples.")
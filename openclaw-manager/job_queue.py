@@ -0,0 +1,149 @@
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+class JobQueue:
+    """
+    Bounded background worker pool. submit() never blocks: it returns False
+    when max_pending jobs are already queued or running, so a webhook can
+    refuse the update (and let the sender retry) instead of piling up work.
+    """
+
+    def __init__(self, max_workers=4, max_pending=32, name="job"):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+
+    def submit(self, func, *args, **kwargs):
+        """Queues func(*args, **kwargs). Returns False if the queue is full."""
+        if not self._slots.acquire(blocking=False):
+            return False
+        with self._lock:
+            self._pending += 1
+        try:
+            self._executor.submit(self._run, func, args, kwargs)
+        except RuntimeError:
+            # Executor already shut down
+            self._release(failed=True)
+            return False
+        return True
+
+    def _run(self, func, args, kwargs):
+        failed = False
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            failed = True
+            print(f"Background job {getattr(func, '__name__', func)} failed:")
+            traceback.print_exc()
+        finally:
+            self._release(failed)
+
+    def _release(self, failed):
+        with self._lock:
+            self._pending -= 1
+            if failed:
+                self._failed += 1
+            else:
+                self._completed += 1
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {"pending": self._pending, "completed": self._completed, "failed": self._failed}
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+class ChatScheduler:
+    """
+    Runs each chat's jobs one at a time and in arrival order on a JobQueue,
+    while different chats proceed in parallel. A job submitted with a
+    coalesce_key already queued or running for that chat is dropped, and
+    cancel() aborts the running job (via the cancel_event passed to it) and
+    discards the chat's queued jobs.
+    """
+
+    def __init__(self, job_queue, max_queued_per_chat=10):
+        self._queue = job_queue
+        self._max_queued = max_queued_per_chat
+        self._lock = threading.Lock()
+        # chat_id -> {"jobs": deque of (coalesce_key, func, args, kwargs), "running": (coalesce_key, cancel_event)}
+        self._chats = {}
+        self._coalesced = 0
+        self._cancelled = 0
+
+    def submit(self, chat_id, func, *args, coalesce_key=None, **kwargs):
+        """
+        Queues func(*args, cancel_event=..., **kwargs) behind the chat's other
+        jobs. Returns "queued", "coalesced", or "busy" if it could not be queued.
+        """
+        with self._lock:
+            chat = self._chats.get(chat_id)
+            if chat and coalesce_key is not None:
+                running = chat["running"]
+                in_flight = running and running[0] == coalesce_key and not running[1].is_set()
+                if in_flight or any(job[0] == coalesce_key for job in chat["jobs"]):
+                    self._coalesced += 1
+                    return "coalesced"
+            if chat and len(chat["jobs"]) >= self._max_queued:
+                return "busy"
+
+            job = (coalesce_key, func, args, kwargs)
+            if chat:
+                chat["jobs"].append(job)
+                return "queued"
+
+            chat = {"jobs": deque([job]), "running": None}
+            self._chats[chat_id] = chat
+            if not self._queue.submit(self._drain, chat_id):
+                del self._chats[chat_id]
+                return "busy"
+            return "queued"
+
+    def _drain(self, chat_id):
+        while True:
+            with self._lock:
+                chat = self._chats[chat_id]
+                if not chat["jobs"]:
+                    del self._chats[chat_id]
+                    return
+                coalesce_key, func, args, kwargs = chat["jobs"].popleft()
+                cancel_event = threading.Event()
+                chat["running"] = (coalesce_key, cancel_event)
+            try:
+                func(*args, cancel_event=cancel_event, **kwargs)
+            except Exception:
+                print(f"Job {getattr(func, '__name__', func)} for chat {chat_id} failed:")
+                traceback.print_exc()
+            finally:
+                with self._lock:
+                    chat["running"] = None
+
+    def cancel(self, chat_id):
+        """Signals the chat's running job and drops its queued ones. Returns (running_cancelled, dropped)."""
+        with self._lock:
+            chat = self._chats.get(chat_id)
+            if not chat:
+                return False, 0
+            dropped = len(chat["jobs"])
+            chat["jobs"].clear()
+            running = chat["running"]
+            running_cancelled = bool(running) and not running[1].is_set()
+            if running_cancelled:
+                running[1].set()
+            self._cancelled += dropped + running_cancelled
+            return running_cancelled, dropped
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active_chats": len(self._chats),
+                "queued": sum(len(chat["jobs"]) for chat in self._chats.values()),
+                "coalesced": self._coalesced,
+                "cancelled": self._cancelled,
+            }
@@ -0,0 +1,478 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+import httpx
+from openai import OpenAI, AsyncOpenAI
+
+from config_loader import load_section
+from database_manager import get_llm_cache_entry, save_llm_cache_entry, prune_llm_cache
+
+# Get the directory of the current script
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_LLM_SETTINGS = {
+    "base_url": "https://integrate.api.nvidia.com/v1",
+    "connect_timeout": 5,
+    "read_timeout": 30,
+    # Wall-clock cap for a whole streamed completion
+    "total_timeout": 120,
+    "max_connections": 10,
+    "keepalive_seconds": 120,
+    # Completion budget per call site; "default" covers anything unlisted
+    "max_tokens": {
+        "intent": 5,
+        "route": 256,
+        "analysis": 2048,
+        "chat": 1024,
+        "default": 16384,
+    },
+    # Response cache: in-memory LRU, optionally backed by the llm_cache table
+    "cache": {
+        "enabled": True,
+        "max_entries": 256,
+        "ttl_seconds": 86400,
+        "persist": True,
+    },
+}
+
+# One long-lived client (and HTTP connection pool) per (base_url, api_key)
+_clients = {}
+_clients_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {
+    "calls": 0,
+    "cold_calls": 0,
+    "cold_ttfb_ms": 0.0,
+    "warm_ttfb_ms": 0.0,
+    "total_ms": 0.0,
+}
+
+# cache_key -> (created_at, content, reasoning), least recently used first
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "persisted_hits": 0, "misses": 0, "bytes": 0}
+
+def load_llm_settings():
+    """The llm section of config.json over the defaults."""
+    overrides = load_section("llm")
+    settings = dict(DEFAULT_LLM_SETTINGS)
+    settings.update(overrides)
+    settings["max_tokens"] = {**DEFAULT_LLM_SETTINGS["max_tokens"], **overrides.get("max_tokens", {})}
+    settings["cache"] = {**DEFAULT_LLM_SETTINGS["cache"], **overrides.get("cache", {})}
+    return settings
+
+def get_client(base_url, api_key, settings=None):
+    """
+    Returns (client, created) for this endpoint and key. The client keeps its
+    keep-alive connections, so later calls skip the TCP + TLS handshake.
+    """
+    key = (base_url, api_key)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is not None:
+            return client, False
+
+        settings = settings or load_llm_settings()
+        timeout = httpx.Timeout(settings["read_timeout"], connect=settings["connect_timeout"])
+        http_client = httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=settings["max_connections"],
+                max_keepalive_connections=settings["max_connections"],
+                keepalive_expiry=settings["keepalive_seconds"],
+            ),
+        )
+        client = OpenAI(base_url=base_url, api_key=api_key, timeout=timeout, http_client=http_client)
+        _clients[key] = client
+        return client, True
+
+def _record_call(cold, ttfb_ms, total_ms):
+    with _stats_lock:
+        _stats["calls"] += 1
+        _stats["total_ms"] += total_ms
+        if cold:
+            _stats["cold_calls"] += 1
+            _stats["cold_ttfb_ms"] += ttfb_ms
+        else:
+            _stats["warm_ttfb_ms"] += ttfb_ms
+
+def get_llm_stats():
+    """
+    Call counts and latencies. saved_ms_per_call estimates what connection
+    reuse saves: mean time-to-first-token of calls that had to open a new
+    client minus that of calls on a warm client.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    warm_calls = stats["calls"] - stats["cold_calls"]
+    cold_ttfb = stats["cold_ttfb_ms"] / stats["cold_calls"] if stats["cold_calls"] else None
+    warm_ttfb = stats["warm_ttfb_ms"] / warm_calls if warm_calls else None
+    return {
+        "calls": stats["calls"],
+        "cold_calls": stats["cold_calls"],
+        "avg_cold_ttfb_ms": cold_ttfb,
+        "avg_warm_ttfb_ms": warm_ttfb,
+        "avg_total_ms": stats["total_ms"] / stats["calls"] if stats["calls"] else None,
+        "saved_ms_per_call": cold_ttfb - warm_ttfb if cold_ttfb is not None and warm_ttfb is not None else None,
+    }
+
+# --- Response cache ---
+
+def cache_key(model, prompt, params):
+    """
+    Hash of the model, the prompt with whitespace collapsed (so re-indented
+    f-string prompts still match) and every request parameter.
+    """
+    normalized = " ".join(prompt.split())
+    payload = json.dumps([model, normalized, params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _entry_size(content, reasoning):
+    return len(content.encode("utf-8")) + len(reasoning.encode("utf-8"))
+
+def _cache_put(key, created_at, content, reasoning, max_entries):
+    with _cache_lock:
+        old = _cache.pop(key, None)
+        if old:
+            _cache_stats["bytes"] -= _entry_size(old[1], old[2])
+        _cache[key] = (created_at, content, reasoning)
+        _cache_stats["bytes"] += _entry_size(content, reasoning)
+        while len(_cache) > max_entries:
+            _, (_, old_content, old_reasoning) = _cache.popitem(last=False)
+            _cache_stats["bytes"] -= _entry_size(old_content, old_reasoning)
+
+def _cache_get(key, cache_settings):
+    """Returns (content, reasoning) from memory, then SQLite, or None."""
+    ttl = cache_settings["ttl_seconds"]
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry and time.time() - entry[0] <= ttl:
+            _cache.move_to_end(key)
+            _cache_stats["hits"] += 1
+            return entry[1], entry[2]
+
+    row = None
+    if cache_settings["persist"]:
+        try:
+            row = get_llm_cache_entry(key, ttl)
+        except sqlite3.Error as e:
+            print(f"LLM cache lookup failed: {e}")
+    if row is None:
+        with _cache_lock:
+            _cache_stats["misses"] += 1
+        return None
+
+    content, reasoning, created_at = row
+    _cache_put(key, created_at, content, reasoning, cache_settings["max_entries"])
+    with _cache_lock:
+        _cache_stats["hits"] += 1
+        _cache_stats["persisted_hits"] += 1
+    return content, reasoning
+
+def _cache_store(key, model, content, reasoning, cache_settings):
+    created_at = time.time()
+    _cache_put(key, created_at, content, reasoning, cache_settings["max_entries"])
+    if cache_settings["persist"]:
+        try:
+            save_llm_cache_entry(key, model, content, reasoning, created_at)
+        except sqlite3.Error as e:
+            print(f"LLM cache write failed: {e}")
+
+def clear_llm_cache():
+    """Empties the in-memory and persisted response cache. Returns the number of persisted entries removed."""
+    with _cache_lock:
+        _cache.clear()
+        _cache_stats["bytes"] = 0
+    return prune_llm_cache()
+
+def expire_llm_cache():
+    """Drops persisted responses older than the cache TTL. Returns the number removed."""
+    return prune_llm_cache(load_llm_settings()["cache"]["ttl_seconds"])
+
+def get_cache_stats():
+    """Response cache hit ratio and the size of the in-memory entries."""
+    with _cache_lock:
+        stats = dict(_cache_stats)
+        entries = len(_cache)
+    lookups = stats["hits"] + stats["misses"]
+    return {
+        "hits": stats["hits"],
+        "persisted_hits": stats["persisted_hits"],
+        "misses": stats["misses"],
+        "hit_ratio": stats["hits"] / lookups if lookups else None,
+        "entries": entries,
+        "bytes": stats["bytes"],
+    }
+
+# --- Early-exit predicates for stop_when ---
+
+def call_line_complete(tool_names):
+    """
+    Routing is decided once a full 'CALL: <tool>' line has arrived: either the
+    line is terminated, or it names a tool that no other tool name extends.
+    """
+    def done(content):
+        text = content.lstrip()
+        if not text.startswith("CALL:"):
+            return False
+        line, newline, rest = text.partition("\n")
+        name = line[len("CALL:"):].strip()
+        if newline:
+            return True
+        return name in tool_names and not any(other != name and other.startswith(name) for other in tool_names)
+    return done
+
+def json_object_complete(content):
+    """True once the first top-level JSON object in content has been closed."""
+    depth = 0
+    in_string = escaped = False
+    for ch in content:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = depth > 0
+        elif ch == "{":
+            depth += 1
+        elif ch == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                return True
+    return False
+
+def _build_request(prompt, model, json_mode, purpose, stop, settings):
+    request_params = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.2 if json_mode else 1, # Lower temp for JSON reliability
+        "top_p": 1,
+        "max_tokens": settings["max_tokens"].get(purpose, settings["max_tokens"]["default"]),
+        "stream": True
+    }
+    if stop:
+        request_params["stop"] = stop
+
+    # Add response format for JSON mode if supported by the model/endpoint
+    if json_mode:
+        request_params["response_format"] = {"type": "json_object"}
+
+    # Only add thinking param for thinking models
+    if "glm5" in model:
+        request_params["extra_body"] = {"chat_template_kwargs": {"enable_thinking": True, "clear_thinking": False}}
+    return request_params
+
+def _request_cache_key(prompt, purpose, request_params, settings):
+    """The response cache key, or None when caching is off."""
+    if not settings["cache"]["enabled"]:
+        return None
+    # purpose stands in for stop_when, which is tied to the call site
+    params = {k: v for k, v in request_params.items() if k not in ("model", "messages", "stream")}
+    return cache_key(request_params["model"], prompt, {"purpose": purpose, **params})
+
+def _accepted(content, validate):
+    """Whether a completion may be served from or stored in the cache."""
+    if validate is None:
+        return True
+    try:
+        return validate(content) is not False
+    except Exception:
+        return False
+
+def _cacheable(result, validate):
+    """A fresh completion is cached only if it is complete and accepted."""
+    return bool(result["content"]) and result["finish_reason"] != "length" and _accepted(result["content"], validate)
+
+def _cached_result(cached, purpose, model):
+    print(f"[LLM] {purpose} via {model}: cache hit")
+    return {"content": cached[0], "reasoning": cached[1], "cached": True}
+
+class _StreamState:
+    """Accumulates streamed deltas and tracks timing for one completion."""
+
+    def __init__(self, settings, stop_when):
+        self.started = time.perf_counter()
+        self.deadline = self.started + settings["total_timeout"]
+        self.stop_when = stop_when
+        self.ttfb_ms = None
+        self.content = ""
+        self.reasoning = ""
+        self.finish_reason = None
+        self.stopped_early = False
+
+    def timed_out(self):
+        if self.ttfb_ms is None:
+            self.ttfb_ms = (time.perf_counter() - self.started) * 1000
+        return time.perf_counter() > self.deadline
+
+    def feed(self, chunk):
+        """Adds a chunk's deltas. True once stop_when says the answer is complete."""
+        if not getattr(chunk, "choices", None):
+            return False
+        if len(chunk.choices) == 0:
+            return False
+        self.finish_reason = getattr(chunk.choices[0], "finish_reason", None) or self.finish_reason
+        if getattr(chunk.choices[0], "delta", None) is None:
+            return False
+        delta = chunk.choices[0].delta
+
+        # Capture reasoning if available
+        reasoning = getattr(delta, "reasoning_content", None)
+        if reasoning:
+            self.reasoning += reasoning
+
+        # Capture final content
+        if getattr(delta, "content", None) is not None:
+            self.content += delta.content
+            if self.stop_when and self.stop_when(self.content):
+                self.stopped_early = True
+                return True
+        return False
+
+    def finish(self, cold, purpose, model):
+        total_ms = (time.perf_counter() - self.started) * 1000
+        ttfb_ms = total_ms if self.ttfb_ms is None else self.ttfb_ms
+        _record_call(cold, ttfb_ms, total_ms)
+        print(f"[LLM] {purpose} via {model} ({'cold' if cold else 'warm'} client): first token {ttfb_ms:.0f} ms, "
+              f"total {total_ms:.0f} ms{', stopped early' if self.stopped_early else ''}")
+        return {
+            "content": self.content.strip(),
+            "reasoning": self.reasoning.strip(),
+            "finish_reason": self.finish_reason,
+        }
+
+def call_llm(prompt, model="meta/llama-3.1-70b-instruct", json_mode=False, purpose="default", stop=None, stop_when=None,
+             use_cache=True, cancel_event=None, validate=None):
+    """
+    Streams a completion and returns {"content", "reasoning", "finish_reason"}
+    or {"error"}.
+
+    purpose selects the max_tokens budget from config.json's llm.max_tokens;
+    a completion cut off by it has finish_reason "length" and is not cached.
+    stop is passed through as API stop sequences. stop_when(content) is checked
+    as content streams in; once it returns True the stream is closed (so the
+    server stops generating) and what has arrived so far is returned.
+
+    Identical requests are answered from the response cache, with "cached"
+    set in the result. use_cache=False skips the lookup (e.g. to regenerate
+    a draft) but still caches the fresh response. validate(content) decides
+    what the caller can use: a completion it rejects (by returning False or
+    raising) is still returned but never cached, and a cached one it rejects
+    is treated as a miss.
+
+    Setting cancel_event aborts the stream; the result is then
+    {"error", "cancelled": True} and nothing is cached.
+    """
+    try:
+        api_key = os.getenv("NVIDIA_API_KEY")
+        if not api_key:
+            return {"error": "NVIDIA_API_KEY not found in .env"}
+
+        settings = load_llm_settings()
+        request_params = _build_request(prompt, model, json_mode, purpose, stop, settings)
+        key = _request_cache_key(prompt, purpose, request_params, settings)
+        cached = _cache_get(key, settings["cache"]) if key and use_cache else None
+        if cached and _accepted(cached[0], validate):
+            return _cached_result(cached, purpose, model)
+
+        state = _StreamState(settings, stop_when)
+        client, cold = get_client(settings["base_url"], api_key, settings)
+        completion = client.chat.completions.create(**request_params)
+
+        for chunk in completion:
+            if cancel_event is not None and cancel_event.is_set():
+                completion.close()
+                print(f"[LLM] {purpose} via {model}: cancelled")
+                return {"error": "Cancelled.", "cancelled": True}
+            if state.timed_out():
+                completion.close()
+                return {"error": f"NVIDIA LLM exceeded the {settings['total_timeout']}s total timeout"}
+            if state.feed(chunk):
+                completion.close()
+                break
+
+        result = state.finish(cold, purpose, model)
+        if key and _cacheable(result, validate):
+            _cache_store(key, model, result["content"], result["reasoning"], settings["cache"])
+        return result
+    except Exception as e:
+        return {"error": f"Error calling NVIDIA LLM: {e}"}
+
+# --- asyncio variant, for the ASGI server ---
+
+# AsyncOpenAI clients are bound to the event loop that created them
+_async_clients = {}
+
+def get_async_client(base_url, api_key, settings=None):
+    """Returns (client, created): a pooled AsyncOpenAI client for the running event loop."""
+    key = (base_url, api_key, id(asyncio.get_running_loop()))
+    client = _async_clients.get(key)
+    if client is not None:
+        return client, False
+
+    settings = settings or load_llm_settings()
+    timeout = httpx.Timeout(settings["read_timeout"], connect=settings["connect_timeout"])
+    http_client = httpx.AsyncClient(
+        timeout=timeout,
+        limits=httpx.Limits(
+            max_connections=settings["max_connections"],
+            max_keepalive_connections=settings["max_connections"],
+            keepalive_expiry=settings["keepalive_seconds"],
+        ),
+    )
+    client = AsyncOpenAI(base_url=base_url, api_key=api_key, timeout=timeout, http_client=http_client)
+    _async_clients[key] = client
+    return client, True
+
+async def call_llm_async(prompt, model="meta/llama-3.1-70b-instruct", json_mode=False, purpose="default", stop=None,
+                         stop_when=None, use_cache=True, validate=None):
+    """
+    call_llm for asyncio code: same arguments, result and cache, but the
+    stream is awaited so many completions share one event loop. Cancel it
+    by cancelling the awaiting task; the stream is closed on the way out.
+    """
+    try:
+        api_key = os.getenv("NVIDIA_API_KEY")
+        if not api_key:
+            return {"error": "NVIDIA_API_KEY not found in .env"}
+
+        settings = load_llm_settings()
+        request_params = _build_request(prompt, model, json_mode, purpose, stop, settings)
+        key = _request_cache_key(prompt, purpose, request_params, settings)
+        # A memory miss may fall through to SQLite; keep that off the event loop
+        cached = await asyncio.to_thread(_cache_get, key, settings["cache"]) if key and use_cache else None
+        if cached and _accepted(cached[0], validate):
+            return _cached_result(cached, purpose, model)
+
+        state = _StreamState(settings, stop_when)
+        client, cold = get_async_client(settings["base_url"], api_key, settings)
+        completion = await client.chat.completions.create(**request_params)
+
+        try:
+            async for chunk in completion:
+                if state.timed_out():
+                    return {"error": f"NVIDIA LLM exceeded the {settings['total_timeout']}s total timeout"}
+                if state.feed(chunk):
+                    break
+        finally:
+            await completion.close()
+
+        result = state.finish(cold, purpose, model)
+        if key and _cacheable(result, validate):
+            await asyncio.to_thread(_cache_store, key, model, result["content"], result["reasoning"], settings["cache"])
+        return result
+    except asyncio.CancelledError:
+        print(f"[LLM] {purpose} via {model}: cancelled")
+        raise
+    except Exception as e:
+        return {"error": f"Error calling NVIDIA LLM: {e}"}
@@ -1,10 +1,15 @@
 import os
 import json
 import time
-import requests
-import subprocess
+import threading
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from config_loader import load_config
+from extract_metrics import extract_latest, save_latest, get_design_inventory, ExtractionCancelled
+from llm_client import call_llm, get_llm_stats, get_cache_stats, call_line_complete, json_object_complete
+from intent_router import route_locally, record_route, get_router_stats, CHAT_LABEL
+from job_queue import JobQueue, ChatScheduler
+from telegram_client import get_telegram_client, TelegramError
 
 import sys
 
@@ -30,7 +35,7 @@ def detect_intent(text):
     
     Respond ONLY with the intent name: CHECK, CONFIRM, LIST, HELP, or CHAT.
     """
-    res = call_llm(prompt)
+    res = call_llm(prompt, purpose="intent", stop=["\n"])
     if isinstance(res, dict) and "content" in res:
         intent = res["content"].strip().upper()
         if "CHECK" in intent: return "/check_latest"
@@ -40,10 +45,8 @@ def detect_intent(text):
     return "/chat"
 
 def trigger_list_designs():
-    config_path = os.path.join(BASE_DIR, 'config.json')
     try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
+        config = load_config()
     except:
         return "Error: Could not load config.json"
         
@@ -58,30 +61,20 @@ def trigger_list_designs():
         if not os.path.exists(base_designs_path):
             return f"Error: Designs path not found: {base_designs_path}"
             
-        designs = [d for d in os.listdir(base_designs_path) if os.path.isdir(os.path.join(base_designs_path, d))]
+        designs = get_design_inventory(base_designs_path)
         
         if not designs:
             return "No designs found in the configured folder."
             
         for d in designs:
-            runs_path = os.path.join(base_designs_path, d, 'runs')
-            run_count = 0
-            gds_ready = False
-            
-            if os.path.exists(runs_path):
-                runs = [r for r in os.listdir(runs_path) if os.path.isdir(os.path.join(runs_path, r))]
-                run_count = len(runs)
-                
-                # Check for GDS in any run (non-recursive for speed)
-                for r in runs:
-                    results_path = os.path.join(runs_path, r, 'results', 'signoff')
-                    if os.path.exists(results_path):
-                        if any(f.endswith('.gds') for f in os.listdir(results_path)):
-                            gds_ready = True
-                            break
-            
-            status_icon = "🟢" if gds_ready else "🟠"
-            report += f"{status_icon} **{d}**: {run_count} runs found.\n"
+            status_icon = "🟢" if d["gds_ready"] else "🟠"
+            report += f"{status_icon} **{d['name']}**: {d['run_count']} runs found."
+            if d["latest_run"]:
+                report += f" Latest GDS: `{d['latest_run']}`"
+            metrics = d["last_metrics"]
+            if metrics:
+                report += f" ({metrics['area_mm2']} mm², {metrics['slack_ns']} ns slack)"
+            report += "\n"
             
         report += "\n💡 *Use /check_latest to analyze the newest completed run.*"
         return report
@@ -93,114 +86,52 @@ def trigger_list_designs():
 # Load configurations
 load_dotenv(os.path.join(BASE_DIR, ".env"))
 
-def run_command(command):
-    try:
-        result = subprocess.run(command, shell=True, capture_output=True, text=True, cwd=BASE_DIR)
-        return result.stdout.strip()
-    except Exception as e:
-        return f"Error: {e}"
-
-def call_llm(prompt, model="meta/llama-3.1-70b-instruct", json_mode=False):
-    try:
-        api_key = os.getenv("NVIDIA_API_KEY")
-        if not api_key:
-            return {"error": "NVIDIA_API_KEY not found in .env"}
-            
-        client = OpenAI(
-          base_url = "https://integrate.api.nvidia.com/v1",
-          api_key = api_key
-        )
-
-        # Build request body
-        request_params = {
-            "model": model,
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": 0.2 if json_mode else 1, # Lower temp for JSON reliability
-            "top_p": 1,
-            "max_tokens": 16384,
-            "stream": True,
-            "timeout": 30
-        }
-        
-        # Add response format for JSON mode if supported by the model/endpoint
-        if json_mode:
-            request_params["response_format"] = {"type": "json_object"}
-        
-        # Only add thinking param for thinking models
-        if "glm5" in model:
-            request_params["extra_body"] = {"chat_template_kwargs": {"enable_thinking": True, "clear_thinking": False}}
-
-        completion = client.chat.completions.create(**request_params)
-
-
-        full_content = ""
-        full_reasoning = ""
-        
-        for chunk in completion:
-            if not getattr(chunk, "choices", None):
-                continue
-            if len(chunk.choices) == 0 or getattr(chunk.choices[0], "delta", None) is None:
-                continue
-            delta = chunk.choices[0].delta
-            
-            # Capture reasoning if available
-            reasoning = getattr(delta, "reasoning_content", None)
-            if reasoning:
-                full_reasoning += reasoning
-                
-            # Capture final content
-            if getattr(delta, "content", None) is not None:
-                full_content += delta.content
-        
-        return {
-            "content": full_content.strip(),
-            "reasoning": full_reasoning.strip()
-        }
-    except Exception as e:
-        return {"error": f"Error calling NVIDIA LLM: {e}"}
-
-
-
-def trigger_check_flow():
+def prepare_check(cancel_event=None):
+    """
+    The blocking first half of a check: extracts the latest run and builds
+    the analysis prompt. Returns (None, context) or (error_message, None).
+    """
     print("Triggering AgentIC Check Flow...")
     
-    config_path = os.path.join(BASE_DIR, 'config.json')
-    pending_path = os.path.join(BASE_DIR, 'data/public_metrics/pending_post.txt')
-    
     # 1. Extract Metrics
     try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
+        config = load_config()
     except Exception as e:
-        return f"Error loading config.json: {e}"
+        return f"Error loading config.json: {e}", None
     
     designs_path = config.get("agentic_reports_path")
     if not designs_path:
-        return "Error: agentic_reports_path not configured in config.json"
+        return "Error: agentic_reports_path not configured in config.json", None
         
     model = config.get("default_model", "z-ai/glm5")
     print(f"Using model: {model}")
     
-    extract_output = run_command(f"python extract_metrics.py \"{designs_path}\"")
-    print(f"Extraction Output: {extract_output}")
+    try:
+        result = extract_latest(designs_path, cancel_event=cancel_event)
+    except ExtractionCancelled:
+        return "🛑 Check cancelled.", None
+    except Exception as e:
+        return f"Error extracting metrics: {e}", None
     
-    if "No completed GDS runs found" in extract_output:
-        return "No completed GDS runs found in the designs folder."
+    if not result:
+        return "No completed GDS runs found in the designs folder.", None
+
+    print(f"Extracted {result.run_path}" + (" (cached)" if result.from_cache else ""))
+    # latest.json stays the skill's hand-off file for post_to_x and external tools
+    save_latest(result)
 
     # 2. Prepare Prompt from SKILL.md and metrics
     try:
         skill_path = os.path.join(BASE_DIR, 'skills/agentic_pr/SKILL.md')
-        metrics_path = os.path.join(BASE_DIR, 'data/public_metrics/latest.json')
-        
-        print(f"Loading metrics from: {metrics_path}")
         with open(skill_path, 'r', encoding='utf-8') as f:
             skill_content = f.read()
+    except Exception as e:
+        return f"Error in check logic: {e}", None
 
-        with open(metrics_path, 'r', encoding='utf-8') as f:
-            latest_metrics = f.read()
-        data = json.loads(latest_metrics)
-        
-        prompt = f"""
+    data = result.to_dict()
+    latest_metrics = json.dumps(data, indent=4)
+    
+    prompt = f"""
         Analyze these hardware benchmarks and respond in STRICT JSON format.
         
         Benchmarks:
@@ -218,13 +149,22 @@ def trigger_check_flow():
             "post_text": "string (X post max 280 chars)"
         }}
         """
-        
-        print(f"Analyzing with {model}...")
-        llm_data = call_llm(prompt, model=model, json_mode=True)
-        
-        if "error" in llm_data:
-            return llm_data["error"]
+    print(f"Analyzing with {model}...")
+    return None, {"data": data, "prompt": prompt, "model": model}
 
+def analysis_llm_args(context, regenerate=False):
+    """Keyword arguments for call_llm / call_llm_async for a prepared check."""
+    return {"model": context["model"], "json_mode": True, "purpose": "analysis",
+            "stop_when": json_object_complete, "use_cache": not regenerate, "validate": json.loads}
+
+def finish_check(data, llm_data):
+    """The second half of a check: parses the analysis, stores the draft and formats the report."""
+    if llm_data.get("cancelled"):
+        return "🛑 Check cancelled."
+    if "error" in llm_data:
+        return llm_data["error"]
+
+    try:
         # Parse JSON response
         try:
             content = llm_data.get("content", "{}")
@@ -233,7 +173,7 @@ def trigger_check_flow():
             else:
                 res = content
         except:
-            return "AI returned invalid JSON. Retrying..."
+            return "AI returned invalid JSON. Send /check_latest to try again."
 
         recommendation = res.get("recommendation", "N/A")
         readiness_score = res.get("readiness_score", "0%")
@@ -254,7 +194,13 @@ def trigger_check_flow():
         report += f"📊 **Benchmark Summary:**\n"
         report += f"- Area: {data.get('area_mm2')} mm²\n"
         report += f"- Power: {data.get('power_mw')} mW\n"
-        report += f"- Timing: {data.get('slack_ns')} ns slack\n\n"
+        report += f"- Timing: {data.get('slack_ns')} ns slack\n"
+        report += f"- DRC: {data.get('drc_violations')} violations\n"
+        for key, label in (("lvs_errors", "LVS errors"), ("antenna_violations", "Antenna violations"),
+                           ("density_pct", "Density %"), ("ir_drop_pct", "IR drop %")):
+            if data.get(key) is not None:
+                report += f"- {label}: {data[key]}\n"
+        report += "\n"
         
         if reasoning:
             report += f"🧠 **AI Thinking:**\n_{reasoning[:300]}..._\n\n"
@@ -262,31 +208,100 @@ def trigger_check_flow():
         report += f"🏁 **Vs. Industry Standard:**\n{comparison_summary[:300]}\n\n"
         report += f"🎯 **Final Verdict:** {recommendation}\n\n"
         report += f"📝 **Draft Post for X:**\n`{post_text}`\n\n"
+        if llm_data.get("cached"):
+            report += "♻️ _Cached analysis of identical metrics. Use /regenerate for a fresh draft._\n"
         report += "🚀 Reply with 'Confirm' to publish."
         
         return report
 
-        
     except Exception as e:
         return f"Error in check logic: {e}"
 
-def trigger_confirm_post():
-    from database_manager import get_latest_pending_post, mark_post_published
-    
+def trigger_check_flow(regenerate=False, cancel_event=None):
+    error, context = prepare_check(cancel_event)
+    if error:
+        return error
+    llm_data = call_llm(context["prompt"], cancel_event=cancel_event, **analysis_llm_args(context, regenerate))
+    return finish_check(context["data"], llm_data)
+
+def queue_pending_post(chat_id=None, not_before=None):
+    """Hands the newest draft to the outbox publisher, now or at not_before. Returns the reply."""
+    from database_manager import get_latest_pending_post
+    from publisher import queue_post, enabled_platforms, PLATFORM_NAMES
+
     pending = get_latest_pending_post()
     if not pending:
         return "Nothing to confirm. Please run a design check first."
-        
-    post_text, design_name = pending
-    
-    # Post to X
-    post_script = os.path.join(BASE_DIR, 'skills/agentic_pr/post_to_x.py')
-    post_output = subprocess.check_output(f'python "{post_script}" "{post_text}"', shell=True).decode()
-    
-    # Mark as published
-    mark_post_published(post_text)
-    
-    return f"🚀 **Successfully posted to X!**\n\n{post_output}"
+    if not enabled_platforms():
+        return "No platforms are enabled under skill_settings.agentic_pr.platforms in config.json."
+
+    post_id, post_text, design_name = pending
+    # In a private chat the chat id is the user id
+    chat_id = chat_id or os.getenv("TELEGRAM_AUTHORIZED_USER_ID")
+    queued = queue_post(post_id, post_text, not_before=not_before, notify_chat_id=chat_id)
+    if not queued:
+        return "That draft is already queued."
+    targets = ", ".join(PLATFORM_NAMES[platform] for platform in queued)
+    # Without a chat to notify the publisher only logs each result
+    notice = " You'll get a message as each goes live." if chat_id else ""
+    if not_before:
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(not_before))
+        return f"🗓️ **Scheduled** the {design_name} post for {targets} at {when}.{notice}"
+    return f"📬 **Queued** the {design_name} post for {targets}.{notice}"
+
+def trigger_confirm_post(cancel_event=None, chat_id=None):
+    if cancel_event is not None and cancel_event.is_set():
+        return "🛑 Post cancelled."
+    return queue_pending_post(chat_id)
+
+def trigger_schedule_post(when, chat_id=None):
+    from publisher import parse_publish_time
+
+    try:
+        not_before = parse_publish_time(when)
+    except ValueError:
+        return "Usage: /schedule HH:MM, /schedule YYYY-MM-DD HH:MM or /schedule +30m"
+    return queue_pending_post(chat_id, not_before)
+
+def trigger_stats(jobs=None, chats=None, telegram=None):
+    """Bot stats; the ASGI server passes its own queue and Telegram counters."""
+    llm = get_llm_stats()
+    fmt = lambda ms: "n/a" if ms is None else f"{ms:.0f} ms"
+    report = "📈 **Bot Stats**\n\n"
+    report += f"🐆 **LLM calls:** {llm['calls']} ({llm['cold_calls']} on a new connection)\n"
+    report += f"- First token: {fmt(llm['avg_cold_ttfb_ms'])} cold / {fmt(llm['avg_warm_ttfb_ms'])} warm\n"
+    report += f"- Saved per call by connection reuse: {fmt(llm['saved_ms_per_call'])}\n\n"
+
+    cache = get_cache_stats()
+    hit_ratio = "n/a" if cache["hit_ratio"] is None else f"{cache['hit_ratio']:.0%}"
+    report += f"♻️ **Response cache:** {hit_ratio} hit ratio ({cache['hits']} hits, {cache['misses']} misses)\n"
+    report += f"- {cache['entries']} entries in memory, {cache['bytes'] / 1024:.1f} KiB; {cache['persisted_hits']} hits from disk\n\n"
+
+    router = get_router_stats()
+    hit_rate = "n/a" if router["hit_rate"] is None else f"{router['hit_rate']:.0%}"
+    local_us = "n/a" if router["avg_local_us"] is None else f"{router['avg_local_us']:.0f} µs"
+    report += f"🧭 **Router:** {router['routed']} messages, {hit_rate} resolved locally\n"
+    report += f"- Rules: {router['rules_hits']}, model: {router['model_hits']}, LLM: {router['llm_routes']}\n"
+    report += f"- Local decision: {local_us} vs LLM {fmt(router['avg_llm_ms'])}\n"
+    report += f"- LLM time saved: {fmt(router['saved_ms'])}\n\n"
+
+    jobs = jobs or get_job_queue().stats()
+    chats = chats or get_scheduler().stats()
+    report += f"📬 **Update queue:** {jobs['pending']} pending, {jobs['completed']} done, {jobs['failed']} failed\n"
+    report += f"- {chats['active_chats']} busy chats, {chats['queued']} queued, {chats['coalesced']} coalesced, {chats['cancelled']} cancelled\n"
+
+    telegram = telegram or get_telegram_client().get_stats()
+    report += f"✉️ **Telegram:** {telegram['sent']} messages, {telegram['retries']} retries, "
+    report += f"{telegram['rate_limited']} rate-limited, {telegram['throttled_s']:.1f} s throttled\n"
+
+    from database_manager import get_outbox_stats
+    from publisher import PLATFORM_NAMES
+    outbox = get_outbox_stats()
+    report += "📤 **Outbox:**" + ("" if outbox else " empty") + "\n"
+    for platform, counts in sorted(outbox.items()):
+        report += f"- {PLATFORM_NAMES.get(platform, platform)}: {counts.get('queued', 0)} queued, "
+        report += f"{counts.get('sending', 0)} sending, {counts.get('sent', 0)} sent, {counts.get('failed', 0)} failed\n"
+    return report
 
 # --- Tool Registry for the Agentic Brain ---
 TOOLS = {
@@ -296,19 +311,36 @@ TOOLS = {
     },
     "check_metrics": {
         "func": trigger_check_flow,
-        "desc": "Analyze the latest hardware metrics and compare with industry standards."
+        "desc": "Analyze the latest hardware metrics and compare with industry standards.",
+        "cancellable": True
+    },
+    "regenerate_draft": {
+        "func": lambda cancel_event=None: trigger_check_flow(regenerate=True, cancel_event=cancel_event),
+        "desc": "Re-run the analysis for a fresh draft post instead of reusing the cached one.",
+        "cancellable": True
     },
     "confirm_post": {
         "func": trigger_confirm_post,
-        "desc": "Post the generated draft to X (Twitter) after user approval."
+        "desc": "Publish the generated draft to the enabled social platforms (X, Mastodon, LinkedIn) after user approval.",
+        "cancellable": True,
+        # Publish results are reported back to the chat that asked
+        "needs_chat": True
     }
 }
 
-def run_agentic_loop(user_input):
-    """The 'Brain' of the bot. Decides which tools to use to solve a request."""
+def call_tool(tool_name, cancel_event=None, chat_id=None):
+    tool = TOOLS[tool_name]
+    kwargs = {}
+    if tool.get("cancellable"):
+        kwargs["cancel_event"] = cancel_event
+    if tool.get("needs_chat"):
+        kwargs["chat_id"] = chat_id
+    return tool["func"](**kwargs)
+
+def route_prompt(user_input):
     tools_desc = "\n".join([f"- {name}: {info['desc']}" for name, info in TOOLS.items()])
     
-    prompt = f"""
+    return f"""
     You are the AgentIC PR Manager brain. You help the user manage their silicon designs.
     
     Available Tools:
@@ -324,93 +356,378 @@ def run_agentic_loop(user_input):
     
     Constraint: Respond ONLY with 'CALL: name' or 'REPLY: message'.
     """
-    
-    # Use LLM to decide
-    res = call_llm(prompt)
+
+def route_fast_path(user_input):
+    """The tool picked by the local router, or None to ask the LLM."""
+    from database_manager import log_routing_decision
+
+    # Obvious requests are routed locally without an LLM round-trip
+    started = time.perf_counter()
+    tool_name, tier = route_locally(user_input)
+    if not tool_name:
+        return None
+    record_route(tier, time.perf_counter() - started)
+    log_routing_decision(user_input, tool_name, tier)
+    print(f"Fast path ({tier}) routed to: {tool_name}")
+    return tool_name
+
+def interpret_route(user_input, res, started):
+    """
+    Reads the routing LLM's answer. Returns (tool_name, None) to run a tool,
+    (None, reply) to answer directly, or (None, None) to fall back to chat.
+    """
+    from database_manager import log_routing_decision
+
     content = res.get("content", "").strip()
+    if "error" not in res and not res.get("cached"):
+        record_route("llm", time.perf_counter() - started)
     
     if content.startswith("CALL:"):
-        tool_name = content.replace("CALL:", "").strip()
+        tool_name = content.splitlines()[0].replace("CALL:", "").strip()
         if tool_name in TOOLS:
+            log_routing_decision(user_input, tool_name, "llm")
             print(f"Agentic Brain decided to call: {tool_name}")
-            return TOOLS[tool_name]["func"]()
+            return tool_name, None
         else:
-            return f"I tried to use a tool called {tool_name}, but I don't know how to use it yet!"
+            return None, f"I tried to use a tool called {tool_name}, but I don't know how to use it yet!"
             
     if content.startswith("REPLY:"):
-        return content.replace("REPLY:", "").strip()
+        log_routing_decision(user_input, CHAT_LABEL, "llm")
+        if res.get("finish_reason") == "length":
+            # The route budget only fits a CALL line or a short answer; let chat write the long one
+            return None, None
+        return None, mark_cached(content.replace("REPLY:", "").strip(), res)
+    return None, None
+
+def route_accepted(content):
+    """call_llm validate for routing: only a known tool call or a direct reply is worth caching."""
+    if content.startswith("CALL:"):
+        return content.splitlines()[0].replace("CALL:", "").strip() in TOOLS
+    return content.startswith("REPLY:")
+
+def chat_prompt(user_input):
+    return f"You are a professional hardware engineering agent. Reply to: {user_input}"
+
+def mark_cached(reply, res):
+    return reply + "\n\n♻️ _cached reply_" if res.get("cached") else reply
+
+def format_chat_reply(chat_res):
+    return mark_cached(chat_res.get("content", "I'm thinking... can you repeat that?"), chat_res)
+
+def run_agentic_loop(user_input, cancel_event=None, chat_id=None):
+    """The 'Brain' of the bot. Decides which tools to use to solve a request. None once cancelled."""
+    tool_name = route_fast_path(user_input)
+    if tool_name:
+        return call_tool(tool_name, cancel_event, chat_id)
+
+    # Use LLM to decide; stop reading as soon as a full CALL line is in
+    started = time.perf_counter()
+    res = call_llm(route_prompt(user_input), purpose="route", stop_when=call_line_complete(TOOLS),
+                   validate=route_accepted, cancel_event=cancel_event)
+    if res.get("cancelled"):
+        # /cancel or a newer message took over; no reply is sent, so skip the chat call too
+        return None
+    tool_name, reply = interpret_route(user_input, res, started)
+    if tool_name:
+        return call_tool(tool_name, cancel_event, chat_id)
+    if reply:
+        return reply
         
     # Fallback to general chat
-    chat_res = call_llm(f"You are a professional hardware engineering agent. Reply to: {user_input}")
-    return chat_res.get("content", "I'm thinking... can you repeat that?")
+    chat_res = call_llm(chat_prompt(user_input), purpose="chat", cancel_event=cancel_event)
+    return format_chat_reply(chat_res)
 
 # --- Flask Webhook Server ---
 from flask import Flask, request, jsonify
 
 app = Flask(__name__)
 
-@app.route('/telegram', methods=['POST'])
-def telegram_webhook():
-    update = request.get_json()
-    if not update:
-        return jsonify({"status": "error", "message": "No data received"}), 400
+def send_message(chat_id, text, parse_mode="Markdown"):
+    """Sends a Telegram message through the pooled, rate-limited client."""
+    try:
+        get_telegram_client().send_message(chat_id, text, parse_mode)
+    except TelegramError as e:
+        print(f"Error sending message: {e}")
+
+WELCOME_TEXT = "👋 Welcome to the AgentIC Autonomous PR Agent!\n\nI have my own brain now. Just tell me what you need in plain English!"
+HELP_TEXT = "📖 **I am an Autonomous Agent**\n\nI use tools to help you:\n- **List Designs**: Scans your WSL folder.\n- **Check Metrics**: Analyzes benchmarks.\n- **Confirm Post**: Publishes to X, Mastodon and LinkedIn.\n\n/clear\\_cache forces the next check to re-read all reports.\n/regenerate asks the AI for a fresh draft instead of the cached one.\n/cancel stops the running check and anything queued after it.\n/schedule 18:30 (or YYYY-MM-DD HH:MM, +2h) publishes the draft later."
 
+def clear_metrics_cache():
+    from database_manager import invalidate_metrics_cache
+    removed = invalidate_metrics_cache()
+    return f"🧹 Cleared {removed} cached metric entries. The next check will re-read all reports."
+
+def handle_update(update, cancel_event=None):
+    """
+    Processes one Telegram update. Runs on the chat's scheduler, off the
+    webhook's request thread; once cancel_event is set (by /cancel) the
+    work stops and no reply is sent.
+    """
     message = update.get("message", {})
     chat_id = message.get("chat", {}).get("id")
-    user_id = str(message.get("from", {}).get("id"))
     text = message.get("text", "")
-    
-    token = os.getenv("TELEGRAM_BOT_TOKEN")
-    auth_user = os.getenv("TELEGRAM_AUTHORIZED_USER_ID")
-    
-    if auth_user and user_id != auth_user:
-        print(f"Unauthorized attempt from user ID: {user_id}")
-        return jsonify({"status": "unauthorized"}), 200
+    cancelled = lambda: cancel_event is not None and cancel_event.is_set()
 
     print(f"Received message: {text}")
 
     # Agentic Brain Integration
     if text and not text.startswith("/"):
-        requests.post(f"https://api.telegram.org/bot{token}/sendMessage", 
-                      json={"chat_id": chat_id, "text": "🧠 *Thinking...*", "parse_mode": "Markdown"})
-        
-        response_text = run_agentic_loop(text)
-        
-        try:
-            r = requests.post(f"https://api.telegram.org/bot{token}/sendMessage", 
-                              json={"chat_id": chat_id, "text": response_text, "parse_mode": "Markdown"})
-            if not r.json().get("ok"):
-                requests.post(f"https://api.telegram.org/bot{token}/sendMessage", 
-                              json={"chat_id": chat_id, "text": response_text})
-        except Exception as e:
-            print(f"Error sending agent response: {e}")
-        return jsonify({"status": "ok"}), 200
+        send_message(chat_id, "🧠 *Thinking...*")
+        response_text = run_agentic_loop(text, cancel_event, chat_id)
+        if not cancelled():
+            send_message(chat_id, response_text)
+        return
 
     # Command Handling
     response_text = ""
     if text == "/start":
-        response_text = "👋 Welcome to the AgentIC Autonomous PR Agent!\n\nI have my own brain now. Just tell me what you need in plain English!"
+        response_text = WELCOME_TEXT
     elif text == "/help":
-        response_text = "📖 **I am an Autonomous Agent**\n\nI use tools to help you:\n- **List Designs**: Scans your WSL folder.\n- **Check Metrics**: Analyzes benchmarks.\n- **Confirm Post**: Publishes to X."
+        response_text = HELP_TEXT
     elif text == "/check_latest":
-        requests.post(f"https://api.telegram.org/bot{token}/sendMessage", 
-                      json={"chat_id": chat_id, "text": "🔍 **Scanning OpenLane designs...**", "parse_mode": "Markdown"})
-        response_text = trigger_check_flow()
+        send_message(chat_id, "🔍 **Scanning OpenLane designs...**")
+        response_text = trigger_check_flow(cancel_event=cancel_event)
+    elif text == "/regenerate":
+        send_message(chat_id, "🔄 **Regenerating the analysis...**")
+        response_text = trigger_check_flow(regenerate=True, cancel_event=cancel_event)
     elif text == "/confirm":
-        response_text = trigger_confirm_post()
+        response_text = trigger_confirm_post(cancel_event, chat_id)
+    elif text.startswith("/schedule"):
+        response_text = trigger_schedule_post(text[len("/schedule"):], chat_id)
     elif text == "/list_designs":
         response_text = trigger_list_designs()
+    elif text == "/stats":
+        response_text = trigger_stats()
+    elif text == "/clear_cache":
+        response_text = clear_metrics_cache()
+
+    if response_text and not cancelled():
+        send_message(chat_id, response_text)
+
+# Repeats of these while one is queued or running in the same chat are dropped
+COALESCED_COMMANDS = {"/check_latest", "/regenerate", "/list_designs", "/stats"}
+
+_job_queue = None
+_scheduler = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue():
+    """The bounded worker pool for updates, sized by triggers.telegram.workers / max_pending."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            try:
+                settings = load_config().get("triggers", {}).get("telegram", {})
+            except Exception:
+                settings = {}
+            _job_queue = JobQueue(settings.get("workers", 4), settings.get("max_pending", 32), name="telegram")
+        return _job_queue
+
+def get_scheduler():
+    """Per-chat ordering on top of the job queue."""
+    global _scheduler
+    job_queue = get_job_queue()
+    with _job_queue_lock:
+        if _scheduler is None:
+            _scheduler = ChatScheduler(job_queue)
+        return _scheduler
+
+def cancel_chat(chat_id, scheduler=None):
+    running_cancelled, dropped = (scheduler or get_scheduler()).cancel(chat_id)
+    if not running_cancelled and not dropped:
+        return "Nothing is running."
+    parts = []
+    if running_cancelled:
+        parts.append("stopped the running job")
+    if dropped:
+        parts.append(f"dropped {dropped} queued message{'s' if dropped != 1 else ''}")
+    return f"🛑 Cancelled: {' and '.join(parts)}."
+
+def admit_update(update):
+    """
+    Checks the sender and claims the update_id. Returns None if the update
+    should be processed, else the reason ("unauthorized" or "duplicate").
+    """
+    from database_manager import claim_update
+
+    message = update.get("message", {})
+    user_id = str(message.get("from", {}).get("id"))
+    auth_user = os.getenv("TELEGRAM_AUTHORIZED_USER_ID")
+    
+    if auth_user and user_id != auth_user:
+        print(f"Unauthorized attempt from user ID: {user_id}")
+        return "unauthorized"
 
-    if response_text:
-        requests.post(f"https://api.telegram.org/bot{token}/sendMessage", 
-                      json={"chat_id": chat_id, "text": response_text, "parse_mode": "Markdown"})
+    update_id = update.get("update_id")
+    if update_id is not None and not claim_update(update_id):
+        print(f"Ignoring redelivered update {update_id}")
+        return "duplicate"
+    return None
 
-    return jsonify({"status": "ok"}), 200
+def coalesced_notice(text):
+    return f"⏳ `{text}` is already in progress; you'll get its result."
 
-if __name__ == "__main__":
+def dispatch_update(update):
+    """
+    Validates, de-duplicates and queues one update; shared by the webhook and
+    the getUpdates poller. Returns the status: "queued", "coalesced", "ok"
+    (/cancel), "unauthorized", "duplicate", or "busy" when it could not be
+    queued and should be delivered again later.
+    """
+    from database_manager import release_update
+
+    rejected = admit_update(update)
+    if rejected:
+        return rejected
+
+    update_id = update.get("update_id")
+    message = update.get("message", {})
+    chat_id = message.get("chat", {}).get("id")
+    text = message.get("text", "")
+
+    # /cancel jumps the chat's queue; only its reply is sent in the background
+    if text == "/cancel":
+        get_job_queue().submit(send_message, chat_id, cancel_chat(chat_id))
+        return "ok"
+
+    status = get_scheduler().submit(chat_id, handle_update, update,
+                                    coalesce_key=text if text in COALESCED_COMMANDS else None)
+    if status == "busy":
+        # Forget the update_id so the redelivery is processed
+        if update_id is not None:
+            release_update(update_id)
+    elif status == "coalesced":
+        get_job_queue().submit(send_message, chat_id, coalesced_notice(text))
+    return status
+
+@app.route('/telegram', methods=['POST'])
+def telegram_webhook():
+    """Queues the update and acks right away so Telegram does not redeliver; 503 asks it to retry later."""
+    update = request.get_json()
+    if not update:
+        return jsonify({"status": "error", "message": "No data received"}), 400
+
+    status = dispatch_update(update)
+    return jsonify({"status": status}), 503 if status == "busy" else 200
+
+# --- getUpdates Long Polling ---
+
+UPDATE_OFFSET_KEY = "telegram_update_offset"
+# An update whose dispatch keeps raising is skipped after this many tries, so it cannot stall the poller
+MAX_DISPATCH_ATTEMPTS = 5
+
+def _release_failed_update(update):
+    """Unclaims an update whose dispatch raised, so its redelivery is processed."""
+    from database_manager import release_update
+
+    if update.get("update_id") is None:
+        return
+    try:
+        release_update(update["update_id"])
+    except Exception as e:
+        print(f"Could not release update {update['update_id']}: {e}")
+
+def poll_updates(stop_event=None):
+    """
+    Ingests updates with getUpdates instead of a webhook: long-polls for
+    batches of up to triggers.telegram.polling.limit updates and feeds them
+    to dispatch_update. The offset is saved after every batch so a restart
+    resumes where it stopped; an update the queue is too busy for (and the
+    rest of its batch) is fetched again on the next poll. An update whose
+    dispatch raises (e.g. "database is locked") is retried with backoff and
+    skipped after MAX_DISPATCH_ATTEMPTS.
+    """
+    from database_manager import get_bot_state, set_bot_state
+
+    settings = load_config().get("triggers", {}).get("telegram", {}).get("polling", {})
+    timeout = settings.get("timeout", 30)
+    limit = min(settings.get("limit", 100), 100)
+    wait = stop_event.wait if stop_event else time.sleep
+    client = get_telegram_client()
+
+    # Telegram refuses getUpdates while a webhook is set
+    client.call("deleteWebhook")
+    offset = get_bot_state(UPDATE_OFFSET_KEY)
+    offset = int(offset) if offset is not None else None
+    print(f"📥 Polling for updates (offset {offset}, up to {limit} per request)...")
+
+    backoff = 1
+    failed_id, failures = None, 0
+    while not (stop_event and stop_event.is_set()):
+        try:
+            updates = client.get_updates(offset, timeout, limit)
+        except TelegramError as e:
+            print(f"getUpdates failed: {e}; retrying in {backoff}s")
+            wait(backoff)
+            backoff = min(backoff * 2, 60)
+            continue
+        backoff = 1
+
+        busy = retry = False
+        next_offset = offset
+        for update in updates:
+            try:
+                status = dispatch_update(update)
+            except Exception as e:
+                _release_failed_update(update)
+                failures = failures + 1 if update.get("update_id") == failed_id else 1
+                failed_id = update.get("update_id")
+                if failures < MAX_DISPATCH_ATTEMPTS:
+                    print(f"Dispatching update {failed_id} failed ({type(e).__name__}: {e}); "
+                          f"retrying in {min(2 ** (failures - 1), 60)}s")
+                    retry = True
+                    break
+                print(f"Dispatching update {failed_id} failed {failures} times ({type(e).__name__}: {e}); skipping it")
+                status = "failed"
+            if status == "busy":
+                busy = True
+                break
+            next_offset = update["update_id"] + 1
+        if next_offset != offset:
+            offset = next_offset
+            try:
+                set_bot_state(UPDATE_OFFSET_KEY, offset)
+            except Exception as e:
+                # getUpdates still confirms the offset; after a restart redeliveries are de-duplicated
+                print(f"Could not save the update offset: {e}")
+        if retry:
+            wait(min(2 ** (failures - 1), 60))
+        elif busy:
+            # Give the workers a moment before fetching the rest again
+            wait(1)
+
+def startup():
+    """One-time setup shared by the Flask and ASGI servers. Returns the background services started."""
     from database_manager import init_db
     init_db()
-    
+    from database_manager import prune_processed_updates
+    prune_processed_updates()
+    from llm_client import expire_llm_cache
+    expire_llm_cache()
+
+    # Pre-extract metrics in the background as soon as a GDS lands
+    from metrics_watcher import start_watcher_from_config
+    watcher = start_watcher_from_config()
+
+    # Publish confirmed and scheduled posts from the outbox
+    from publisher import start_publisher_from_config
+    publisher = start_publisher_from_config(notify=send_message)
+    return [service for service in (watcher, publisher) if service]
+
+if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
-    print(f"🚀 Enterprise Bot Server starting on port {port}...")
-    app.run(host='0.0.0.0', port=port)
+    telegram_settings = load_config().get("triggers", {}).get("telegram", {})
+    server = telegram_settings.get("server", "flask")
+    if telegram_settings.get("mode", "webhook") == "polling":
+        startup()
+        try:
+            poll_updates()
+        except KeyboardInterrupt:
+            print("Stopped polling.")
+    elif server == "asgi":
+        from asgi_server import run
+        run(port)
+    else:
+        startup()
+        print(f"🚀 Enterprise Bot Server starting on port {port}...")
+        app.run(host='0.0.0.0', port=port)
@@ -0,0 +1,184 @@
+import os
+import sys
+import time
+import threading
+
+from config_loader import load_config
+from database_manager import init_db
+from extract_metrics import (
+    find_latest_runs_by_design, extract_run, save_latest, load_report_globs, get_design_inventory,
+)
+
+# inotify via watchdog is optional; without it (or on the WSL share) we poll
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+# Get the directory of the current script
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_WATCHER_SETTINGS = {
+    "enabled": False,
+    "debounce_seconds": 30,
+    "scan_interval_seconds": 60,
+    "use_inotify": True,
+}
+
+def load_watcher_config():
+    """Returns (designs_path, watcher settings) from config.json."""
+    config = load_config()
+    settings = dict(DEFAULT_WATCHER_SETTINGS)
+    settings.update(config.get("skill_settings", {}).get("agentic_pr", {}).get("watcher", {}))
+    return config.get("agentic_reports_path"), settings
+
+class _GdsEventHandler(FileSystemEventHandler):
+    def __init__(self, on_gds):
+        self.on_gds = on_gds
+
+    def on_any_event(self, event):
+        path = getattr(event, "dest_path", "") or event.src_path
+        if not event.is_directory and path.endswith(".gds") and f"{os.sep}results{os.sep}" in path:
+            self.on_gds(path)
+
+class MetricsWatcher:
+    """
+    Pre-extracts metrics whenever a run's GDS lands, so /check_latest only has
+    to read the stored results (run index + metrics cache + metrics_history).
+
+    Uses inotify (watchdog) on local Linux paths and falls back to polling the
+    run index every scan_interval_seconds, which is what the WSL share needs.
+    Extraction waits until no new GDS activity has been seen for
+    debounce_seconds so half-written results are not picked up.
+    """
+
+    def __init__(self, designs_path, debounce_seconds=30, scan_interval_seconds=60, use_inotify=True):
+        self.designs_path = designs_path
+        self.debounce_seconds = debounce_seconds
+        self.scan_interval_seconds = scan_interval_seconds
+        self.use_inotify = use_inotify and Observer is not None and sys.platform.startswith("linux") \
+            and not designs_path.startswith("\\\\")
+        self._gds_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._seen = {}
+        self._observer = None
+        self._thread = None
+
+    def start(self):
+        if self.use_inotify:
+            self._observer = Observer()
+            self._observer.schedule(_GdsEventHandler(lambda path: self._gds_event.set()),
+                                    self.designs_path, recursive=True)
+            self._observer.start()
+        self._thread = threading.Thread(target=self._run, name="metrics-watcher", daemon=True)
+        self._thread.start()
+        mode = "inotify" if self.use_inotify else f"polling every {self.scan_interval_seconds}s"
+        print(f"Metrics watcher started on {self.designs_path} ({mode})")
+
+    def stop(self):
+        self._stop_event.set()
+        self._gds_event.set()
+        if self._observer:
+            self._observer.stop()
+            self._observer.join()
+        if self._thread:
+            self._thread.join()
+
+    def _debounce(self):
+        """Waits until no GDS event arrived for debounce_seconds. False if stopped."""
+        self._gds_event.clear()
+        while self._gds_event.wait(self.debounce_seconds):
+            if self._stop_event.is_set():
+                return False
+            self._gds_event.clear()
+        return not self._stop_event.is_set()
+
+    def _changed_runs(self):
+        latest_runs = find_latest_runs_by_design(self.designs_path)
+        return {design: run for design, run in latest_runs.items() if self._seen.get(design) != run}
+
+    def _run(self):
+        # Warm the index and cache for whatever is already on disk
+        self.scan_once()
+        while not self._stop_event.is_set():
+            # One unreadable share or index hiccup must not end the thread
+            try:
+                if not self._poll_once():
+                    break
+            except Exception as e:
+                print(f"Watcher poll failed: {e}")
+
+    def _poll_once(self):
+        """Waits for the next change and extracts it. False once stopped."""
+        if self.use_inotify:
+            if not self._gds_event.wait(self.scan_interval_seconds):
+                return True
+        elif not self._stop_event.wait(self.scan_interval_seconds) and not self._changed_runs():
+            return True
+        if self._stop_event.is_set() or not self._debounce():
+            return False
+        self.scan_once()
+        return True
+
+    def scan_once(self):
+        """Extracts every design whose latest completed run changed. Returns the new ExtractionResults."""
+        try:
+            changed = self._changed_runs()
+        except Exception as e:
+            print(f"Watcher scan failed: {e}")
+            return []
+
+        report_globs = load_report_globs()
+        results = []
+        for design_name, (run_path, mtime) in changed.items():
+            try:
+                result = extract_run(design_name, run_path, report_globs)
+            except Exception as e:
+                print(f"Watcher failed to extract {run_path}: {e}")
+                continue
+            self._seen[design_name] = (run_path, mtime)
+            results.append((mtime, result))
+            print(f"Watcher pre-extracted {design_name}/{result.record.run_id}" +
+                  (" (cached)" if result.from_cache else ""))
+
+        if results:
+            newest_mtime, newest = max(results, key=lambda item: item[0])
+            if newest_mtime >= max((mtime for path, mtime in self._seen.values()), default=0):
+                save_latest(newest)
+            # Keep /list_designs answering from a fresh inventory
+            get_design_inventory(self.designs_path, max_age=0)
+        return [result for mtime, result in results]
+
+def start_watcher_from_config():
+    """Starts the watcher if enabled in config.json. Returns it, or None."""
+    try:
+        designs_path, settings = load_watcher_config()
+    except Exception as e:
+        print(f"Metrics watcher not started: {e}")
+        return None
+    if not settings["enabled"] or not designs_path:
+        return None
+    watcher = MetricsWatcher(designs_path, settings["debounce_seconds"],
+                             settings["scan_interval_seconds"], settings["use_inotify"])
+    watcher.start()
+    return watcher
+
+if __name__ == "__main__":
+    init_db()
+    designs_path, settings = load_watcher_config()
+    if len(sys.argv) > 1:
+        designs_path = sys.argv[1]
+    if not designs_path:
+        print("Usage: python metrics_watcher.py [designs_directory]")
+        sys.exit(1)
+
+    watcher = MetricsWatcher(designs_path, settings["debounce_seconds"],
+                             settings["scan_interval_seconds"], settings["use_inotify"])
+    watcher.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        watcher.stop()
@@ -0,0 +1,273 @@
+import os
+import re
+import sys
+import time
+import random
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from database_manager import (
+    init_db, transaction, enqueue_outbox, claim_next_outbox, next_outbox_due, record_outbox_progress, complete_outbox,
+    retry_outbox, fail_outbox, requeue_interrupted_outbox, mark_post_published, record_post_failure,
+)
+
+# Get the directory of the current script
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "skills", "agentic_pr"))
+from publishers import publish, enabled_platforms, PublishError, PLATFORM_NAMES
+from config_loader import load_section
+
+DEFAULT_PUBLISHER_SETTINGS = {
+    "enabled": True,
+    # Retries of network and 5xx errors before a post is marked failed
+    "max_attempts": 8,
+    "backoff_base_seconds": 5,
+    "backoff_max_seconds": 900,
+    # How often the queue is re-checked when nothing is due
+    "idle_seconds": 60,
+}
+
+def load_publisher_settings():
+    settings = dict(DEFAULT_PUBLISHER_SETTINGS)
+    settings.update(load_section("skill_settings", "agentic_pr", "publisher"))
+    return settings
+
+def backoff_delay(attempt, base, cap):
+    """Exponential backoff with full jitter: uniform in [0, min(cap, base * 2^(attempt-1))]."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+def parse_publish_time(text, now=None):
+    """
+    Epoch seconds for "+30m" / "+2h", "HH:MM" (the next time it is that
+    local time) or "YYYY-MM-DD HH:MM". Raises ValueError otherwise.
+    """
+    now = now if now is not None else time.time()
+    text = text.strip()
+    relative = re.fullmatch(r"\+(\d+)\s*([mh])", text)
+    if relative:
+        return now + int(relative.group(1)) * (60 if relative.group(2) == "m" else 3600)
+    if re.fullmatch(r"\d{1,2}:\d{2}", text):
+        clock = datetime.datetime.strptime(text, "%H:%M").time()
+        current = datetime.datetime.fromtimestamp(now)
+        when = datetime.datetime.combine(current.date(), clock)
+        if when <= current:
+            when += datetime.timedelta(days=1)
+        return when.timestamp()
+    return datetime.datetime.strptime(text, "%Y-%m-%d %H:%M").timestamp()
+
+def format_rate_limit(rate_limit):
+    if "remaining" not in rate_limit:
+        return ""
+    window = f"{rate_limit['remaining']}"
+    if "limit" in rate_limit:
+        window += f"/{rate_limit['limit']}"
+    if "reset" in rate_limit:
+        window += f", resets at {time.strftime('%H:%M', time.localtime(rate_limit['reset']))}"
+    return f"\nPosts left in this window: {window}"
+
+class OutboxPublisher:
+    """
+    Background worker draining the outbox table. Platforms publish
+    concurrently, each one row at a time in queue order and as fast as it
+    allows: when the rate-limit headers report the window used up (or a 429
+    arrives), that platform pauses until the window resets while others
+    carry on. Network and 5xx errors retry with jittered exponential
+    backoff; other errors fail the row at once. State lives in the
+    database, so queued and scheduled posts survive restarts.
+    """
+
+    def __init__(self, notify=None, max_attempts=8, backoff_base_seconds=5, backoff_max_seconds=900,
+                 idle_seconds=60):
+        self.notify = notify
+        self.max_attempts = max_attempts
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.idle_seconds = idle_seconds
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._paused_until = {}
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        requeued = requeue_interrupted_outbox()
+        if requeued:
+            print(f"Publisher re-queued {requeued} post(s) interrupted mid-send")
+        self._thread = threading.Thread(target=self._run, name="outbox-publisher", daemon=True)
+        self._thread.start()
+        print("Outbox publisher started")
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+
+    def wake(self):
+        """Re-checks the queue now (after something was enqueued)."""
+        self._wake.set()
+
+    def _busy_platforms(self, now):
+        """Platforms not to claim for: publishing right now, or paused for their rate limit."""
+        with self._lock:
+            paused = [platform for platform, until in self._paused_until.items() if until > now]
+            return paused + list(self._in_flight)
+
+    def _idle_wait(self, now):
+        """Seconds until the next queued row is due or a paused platform resumes, at most idle_seconds."""
+        with self._lock:
+            wake_at = [until for until in self._paused_until.values() if until > now]
+        due = next_outbox_due(self._busy_platforms(now))
+        if due is not None:
+            wake_at.append(due)
+        return max(0.0, min([now + self.idle_seconds] + wake_at) - now)
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=len(PLATFORM_NAMES), thread_name_prefix="publish") as pool:
+            while not self._stop_event.is_set():
+                now = time.time()
+                try:
+                    item = claim_next_outbox(now, self._busy_platforms(now))
+                    if item is not None:
+                        with self._lock:
+                            self._in_flight.add(item["platform"])
+                        pool.submit(self._publish_and_release, item)
+                        continue
+                    wait = self._idle_wait(now)
+                except Exception as e:
+                    print(f"Publisher error: {e}")
+                    wait = self.idle_seconds
+                self._wake.wait(wait)
+                self._wake.clear()
+
+    def _publish_and_release(self, item):
+        try:
+            self.publish(item)
+        finally:
+            with self._lock:
+                self._in_flight.discard(item["platform"])
+            # The platform can take its next row
+            self._wake.set()
+
+    def _pause(self, platform, until):
+        with self._lock:
+            self._paused_until[platform] = until
+
+    def _track_rate_limit(self, platform, rate_limit):
+        if rate_limit.get("remaining") == 0 and "reset" in rate_limit:
+            self._pause(platform, rate_limit["reset"])
+            print(f"Publisher: {platform} rate limit used up; pausing until "
+                  f"{time.strftime('%H:%M:%S', time.localtime(rate_limit['reset']))}")
+
+    def publish(self, item):
+        """
+        Sends one claimed outbox row and records the outcome. Each thread part
+        is recorded as it goes out, so a retry resumes after the last one.
+        """
+        try:
+            result = publish(item["platform"], item["content"], item["idempotency_key"], item["remote_ids"],
+                             lambda remote_ids: record_outbox_progress(item["id"], remote_ids))
+        except PublishError as e:
+            self._handle_error(item, e)
+            return
+        except Exception as e:
+            # Unexpected errors are retried like network errors rather than leaving the row in sending
+            self._handle_error(item, PublishError(f"{type(e).__name__}: {e}"))
+            return
+        self._finish(item, result["remote_id"], result["rate_limit"], len(result["remote_ids"]))
+
+    def _finish(self, item, remote_id, rate_limit, parts=1):
+        platform = item["platform"]
+        complete_outbox(item["id"], remote_id)
+        # The posts table keeps X's tweet id and window; every platform's result is on its outbox row
+        if platform == "x":
+            mark_post_published(item["post_id"], remote_id, rate_limit)
+        else:
+            mark_post_published(item["post_id"])
+        self._track_rate_limit(platform, rate_limit)
+        if remote_id is None:
+            print(f"Publisher: post {item['post_id']} was already live on {platform}")
+        thread = f" as a {parts}-part thread" if parts > 1 else ""
+        self._notify(item, f"🚀 **Posted to {PLATFORM_NAMES[platform]}{thread}!**" +
+                     (f"\n\nID: {remote_id}" if remote_id else "\n\n(It was already live from an earlier attempt.)") +
+                     format_rate_limit(rate_limit))
+
+    def _handle_error(self, item, error):
+        platform, rate_limit = item["platform"], error.rate_limit
+        record_post_failure(item["post_id"], f"{platform}: {error}", rate_limit if platform == "x" else None)
+        now = time.time()
+
+        if not error.retryable:
+            self._give_up(item, error)
+            return
+
+        if error.status_code == 429:
+            # Wait out the window; these attempts do not count towards max_attempts
+            reset = rate_limit.get("reset") or now + backoff_delay(item["attempts"], self.backoff_base_seconds,
+                                                                   self.backoff_max_seconds)
+            self._pause(platform, reset)
+            retry_outbox(item["id"], reset, str(error), count_attempt=False)
+            print(f"Publisher: {platform} returned 429; retrying post {item['post_id']} after the reset")
+            return
+
+        if item["attempts"] < self.max_attempts:
+            delay = backoff_delay(item["attempts"], self.backoff_base_seconds, self.backoff_max_seconds)
+            retry_outbox(item["id"], now + delay, str(error))
+            print(f"Publisher: post {item['post_id']} attempt {item['attempts']} failed ({error}); retrying in {delay:.1f}s")
+            return
+
+        self._give_up(item, error)
+
+    def _give_up(self, item, error):
+        platform = item["platform"]
+        pending_again = fail_outbox(item["id"], str(error))
+        self._notify(item, f"❌ Publishing to {PLATFORM_NAMES[platform]} failed after {item['attempts']} attempt(s): {error}" +
+                     ("\nThe draft is pending again; /confirm retries it." if pending_again else ""))
+
+    def _notify(self, item, text):
+        if self.notify and item["notify_chat_id"] is not None:
+            try:
+                self.notify(item["notify_chat_id"], text)
+            except Exception as e:
+                print(f"Publisher could not notify chat {item['notify_chat_id']}: {e}")
+
+_publisher = None
+
+def start_publisher_from_config(notify=None):
+    """Starts the publisher if enabled in config.json. Returns it, or None."""
+    global _publisher
+    settings = load_publisher_settings()
+    if not settings["enabled"]:
+        return None
+    _publisher = OutboxPublisher(notify, settings["max_attempts"], settings["backoff_base_seconds"],
+                                 settings["backoff_max_seconds"], settings["idle_seconds"])
+    _publisher.start()
+    return _publisher
+
+def queue_post(post_id, content, platforms=None, not_before=None, notify_chat_id=None):
+    """
+    Adds a post to the outbox once per platform (default: every enabled one)
+    and wakes the publisher. Returns the platforms it was queued for; ones
+    where it is already queued or sent are skipped.
+    """
+    with transaction():
+        queued = [platform for platform in platforms or enabled_platforms()
+                  if enqueue_outbox(post_id, platform, content, not_before, notify_chat_id)]
+    if queued and _publisher is not None:
+        _publisher.wake()
+    return queued
+
+if __name__ == "__main__":
+    # Standalone worker, for when the bot runs with the publisher disabled
+    init_db()
+    settings = load_publisher_settings()
+    publisher = OutboxPublisher(None, settings["max_attempts"], settings["backoff_base_seconds"],
+                                settings["backoff_max_seconds"], settings["idle_seconds"])
+    publisher.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        publisher.stop()
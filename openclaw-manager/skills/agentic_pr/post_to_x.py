@@ -1,41 +1,125 @@
 import os
 import sys
+import threading
+
+import requests
 import tweepy
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
-def post_to_x(text):
+# tweepy always calls this host; XPoster can send its requests elsewhere (e.g. a local mock)
+X_API_BASE = "https://api.twitter.com"
+
+# X reports the posting quota of the current window on every response
+RATE_LIMIT_HEADERS = {
+    "limit": "x-rate-limit-limit",
+    "remaining": "x-rate-limit-remaining",
+    "reset": "x-rate-limit-reset",
+}
+
+def load_credentials():
+    """(api_key, api_secret, access_token, access_secret) from .env, or None if any is missing."""
     # Load environment variables from .env file
     load_dotenv()
-    
-    api_key = os.getenv("API_KEY")
-    api_secret = os.getenv("API_SECRET")
-    access_token = os.getenv("ACCESS_TOKEN")
-    access_secret = os.getenv("ACCESS_SECRET")
-    
-    if not all([api_key, api_secret, access_token, access_secret]):
-        print("Error: Missing X API credentials in .env file.")
-        sys.exit(1)
-        
-    try:
-        # Authenticate with V2 API
-        client = tweepy.Client(
+
+    credentials = (os.getenv("API_KEY"), os.getenv("API_SECRET"), os.getenv("ACCESS_TOKEN"), os.getenv("ACCESS_SECRET"))
+    return credentials if all(credentials) else None
+
+def parse_rate_limit(headers):
+    """{"limit", "remaining", "reset"} from x-rate-limit-* headers; keys are missing when the header is."""
+    rate_limit = {}
+    for key, header in RATE_LIMIT_HEADERS.items():
+        try:
+            rate_limit[key] = int(headers[header])
+        except (KeyError, TypeError, ValueError):
+            pass
+    return rate_limit
+
+class _BaseURLAdapter(HTTPAdapter):
+    """Sends requests for X_API_BASE to api_base instead."""
+
+    def __init__(self, api_base, **kwargs):
+        super().__init__(**kwargs)
+        self.api_base = api_base.rstrip("/")
+
+    def send(self, request, **kwargs):
+        request.url = self.api_base + request.url[len(X_API_BASE):]
+        return super().send(request, **kwargs)
+
+class XPostError(Exception):
+    def __init__(self, description, status_code=None, rate_limit=None):
+        super().__init__(description)
+        self.status_code = status_code
+        self.rate_limit = rate_limit or {}
+
+class XPoster:
+    """
+    Long-lived X API client. One tweepy.Client, and with it one pooled
+    requests.Session, serves every post, so a confirm pays neither process
+    startup nor the TLS handshake. post() returns {"tweet_id", "rate_limit"}
+    and raises XPostError.
+    """
+
+    def __init__(self, credentials, api_base=X_API_BASE):
+        api_key, api_secret, access_token, access_secret = credentials
+        # requests.Response keeps the rate-limit headers tweepy's Response drops
+        self.client = tweepy.Client(
             consumer_key=api_key,
             consumer_secret=api_secret,
             access_token=access_token,
-            access_token_secret=access_secret
+            access_token_secret=access_secret,
+            return_type=requests.Response
         )
-        
-        response = client.create_tweet(text=text)
-        print(f"Successfully posted to X! Tweet ID: {response.data['id']}")
-        return response.data['id']
-    except Exception as e:
-        print(f"Error posting to X: {e}")
-        sys.exit(1)
+        if api_base.rstrip("/") != X_API_BASE:
+            self.client.session.mount(X_API_BASE, _BaseURLAdapter(api_base))
+        self._lock = threading.Lock()
+        self.last_rate_limit = {}
+
+    def _remember(self, rate_limit):
+        if rate_limit:
+            with self._lock:
+                self.last_rate_limit = rate_limit
+        return rate_limit
+
+    def post(self, text, in_reply_to=None):
+        try:
+            response = self.client.create_tweet(text=text, in_reply_to_tweet_id=in_reply_to)
+        except tweepy.HTTPException as e:
+            rate_limit = self._remember(parse_rate_limit(e.response.headers))
+            raise XPostError(str(e), e.response.status_code, rate_limit) from e
+        except (tweepy.TweepyException, requests.RequestException) as e:
+            raise XPostError(str(e)) from e
+
+        rate_limit = self._remember(parse_rate_limit(response.headers))
+        return {"tweet_id": response.json()["data"]["id"], "rate_limit": rate_limit}
+
+_poster = None
+_poster_lock = threading.Lock()
+
+def get_poster(api_base=X_API_BASE):
+    """The process-wide XPoster. Raises XPostError if the credentials are missing."""
+    global _poster
+    with _poster_lock:
+        if _poster is None:
+            credentials = load_credentials()
+            if not credentials:
+                raise XPostError("Missing X API credentials in .env file.")
+            _poster = XPoster(credentials, api_base)
+        return _poster
+
+def post_to_x(text):
+    """Posts text and returns {"tweet_id", "rate_limit"}. Raises XPostError."""
+    return get_poster().post(text)
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python post_to_x.py \"Your tweet text here\"")
         sys.exit(1)
-        
+
     tweet_text = sys.argv[1]
-    post_to_x(tweet_text)
+    try:
+        result = post_to_x(tweet_text)
+    except XPostError as e:
+        print(f"Error posting to X: {e}")
+        sys.exit(1)
+    print(f"Successfully posted to X! Tweet ID: {result['tweet_id']}")
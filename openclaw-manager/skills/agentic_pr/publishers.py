@@ -0,0 +1,368 @@
+"""
+Publishing backends for the PR skill. Each platform adapts the draft to
+its own rules (length limits, how URLs count, whether a long post becomes
+a thread) and publishes it through a pooled client. Every base URL comes
+from config.json, so local mock servers can stand in for the real APIs.
+"""
+import os
+import re
+import sys
+import time
+import datetime
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from post_to_x import get_poster, XPostError, X_API_BASE
+
+# Get the directory of the current script
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# config_loader lives with the bot, two levels up
+sys.path.append(os.path.normpath(os.path.join(BASE_DIR, "..", "..")))
+from config_loader import load_section
+
+DEFAULT_PLATFORM_SETTINGS = {
+    "x": {"enabled": True, "api_base": X_API_BASE, "max_chars": 280, "thread": True},
+    "mastodon": {"enabled": False, "base_url": "https://mastodon.social", "max_chars": 500, "thread": True,
+                 "visibility": "public"},
+    "linkedin": {"enabled": False, "api_base": "https://api.linkedin.com", "version": "202405", "max_chars": 3000},
+}
+
+PLATFORM_NAMES = {"x": "X", "mastodon": "Mastodon", "linkedin": "LinkedIn"}
+
+_URL = re.compile(r"https?://\S+")
+_LINKEDIN_RESERVED = re.compile(r"([\\|{}@\[\]()<>#*_~])")
+_LINKEDIN_DUPLICATE = re.compile(r"duplicate of (urn:li:\w+:\d+)", re.I)
+
+class PublishError(Exception):
+    """
+    A failed publish. retryable says whether trying again later may work;
+    already_published means an earlier attempt went through after all, and
+    remote_id is that post's id when the platform reports it.
+    """
+
+    def __init__(self, description, status_code=None, rate_limit=None, retryable=None, already_published=False,
+                 remote_id=None):
+        super().__init__(description)
+        self.status_code = status_code
+        self.rate_limit = rate_limit or {}
+        if retryable is None:
+            retryable = status_code is None or status_code == 429 or status_code >= 500
+        self.retryable = retryable
+        self.already_published = already_published
+        self.remote_id = remote_id
+
+def load_platform_settings():
+    """{platform: settings} from skill_settings.agentic_pr.platforms, over the defaults."""
+    overrides = load_section("skill_settings", "agentic_pr", "platforms")
+    return {name: {**defaults, **overrides.get(name, {})} for name, defaults in DEFAULT_PLATFORM_SETTINGS.items()}
+
+# --- Text adaptation ---
+
+def x_length(text):
+    """Length as X counts it: URLs are 23, and characters outside the Latin/common ranges count double."""
+    text = _URL.sub("x" * 23, text)
+    light = lambda c: ord(c) <= 0x10FF or 0x2000 <= ord(c) <= 0x200D or 0x2010 <= ord(c) <= 0x201F \
+        or 0x2032 <= ord(c) <= 0x2037
+    return sum(1 if light(c) else 2 for c in text)
+
+def url_length(text):
+    """Length as Mastodon counts it: every URL is 23."""
+    return len(_URL.sub("x" * 23, text))
+
+def _pieces(text):
+    """Paragraphs, then sentences, then words: the boundaries a split prefers, coarsest first."""
+    for index, paragraph in enumerate(re.split(r"\n\s*\n", text.strip())):
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph.strip()):
+            yield sentence, index
+
+def _pack(text, budget, length):
+    """The text in chunks of at most budget, each as full as the preferred boundaries allow."""
+    parts, current, last_paragraph = [], "", None
+    for sentence, paragraph in _pieces(text):
+        for word in sentence.split(" "):
+            # Hard-cut anything that does not fit on its own
+            while length(word) > budget:
+                cut = budget
+                while cut > 1 and length(word[:cut]) > budget:
+                    cut -= 1
+                if current:
+                    parts.append(current)
+                parts.append(word[:cut])
+                current, word = "", word[cut:]
+            joiner = " " if paragraph == last_paragraph else "\n\n"
+            if not current:
+                current = word
+            elif length(current + joiner + word) <= budget:
+                current += joiner + word
+            else:
+                parts.append(current)
+                current = word
+            last_paragraph = paragraph
+    if current:
+        parts.append(current)
+    return parts
+
+def split_thread(text, limit, length=len):
+    """
+    Splits text into posts of at most limit (as measured by length), at
+    paragraph, sentence or word boundaries, numbered " 1/3" etc. when there
+    is more than one. Raises ValueError if limit leaves no room for text
+    next to the numbering.
+    """
+    if length(text) <= limit:
+        return [text]
+
+    # Room for the " 12/12" numbering, widened if the thread runs to 100+ parts
+    reserve = 6
+    while True:
+        if limit - reserve < 2:
+            raise ValueError(f"A limit of {limit} is too small to split into a numbered thread")
+        parts = _pack(text, limit - reserve, length)
+        numbering = len(f" {len(parts)}/{len(parts)}")
+        if numbering <= reserve:
+            return [f"{part} {n}/{len(parts)}" for n, part in enumerate(parts, 1)]
+        reserve = numbering
+
+def truncate(text, limit, length=len):
+    if length(text) <= limit:
+        return text
+    while text and length(text + "…") > limit:
+        text = text[:-1]
+    return text.rstrip() + "…"
+
+# --- Backends ---
+
+class Backend(ABC):
+    """
+    One platform. adapt() turns a draft into the posts to send; publish()
+    sends them in order (replies chained into a thread) and returns
+    {"remote_id": first post's id, "remote_ids", "rate_limit"}.
+    """
+    name = None
+
+    def __init__(self, settings):
+        self.settings = settings
+
+    def length(self, text):
+        return len(text)
+
+    def adapt(self, text):
+        if self.settings.get("thread"):
+            return split_thread(text, self.settings["max_chars"], self.length)
+        return [truncate(text, self.settings["max_chars"], self.length)]
+
+    @abstractmethod
+    def send(self, text, in_reply_to=None, idempotency_key=None):
+        """Posts one part. Returns (remote_id, rate_limit); raises PublishError."""
+
+    def publish(self, text, idempotency_key=None, posted=(), on_part=None):
+        """
+        Sends the parts not yet in posted (the ids of those an earlier attempt
+        got out), calling on_part(remote_ids) after each one so the caller can
+        store the progress and a retry resumes instead of repeating the thread.
+        """
+        try:
+            parts = self.adapt(text)
+        except ValueError as e:
+            # A max_chars too small to thread; retrying cannot help
+            raise PublishError(f"{self.name}: {e}", retryable=False) from e
+        remote_ids, rate_limit = list(posted)[:len(parts)], {}
+        for n in range(len(remote_ids), len(parts)):
+            key = f"{idempotency_key}-{n}" if idempotency_key else None
+            try:
+                remote_id, rate_limit = self.send(parts[n], remote_ids[-1] if remote_ids else None, key)
+            except PublishError as e:
+                if not e.already_published:
+                    raise
+                # The part went out on an attempt that crashed before recording it
+                if e.remote_id is None and n < len(parts) - 1:
+                    raise PublishError(f"{e} (part {n + 1}/{len(parts)} is already live but its id is unknown, "
+                                       f"so the rest of the thread cannot be chained to it)",
+                                       e.status_code, e.rate_limit, retryable=False) from e
+                remote_id, rate_limit = e.remote_id, e.rate_limit
+            remote_ids.append(remote_id)
+            if on_part:
+                on_part(remote_ids)
+        return {"remote_id": remote_ids[0], "remote_ids": remote_ids, "rate_limit": rate_limit}
+
+class XBackend(Backend):
+    """X through the shared XPoster (post_to_x.py)."""
+    name = "x"
+
+    def length(self, text):
+        return x_length(text)
+
+    def send(self, text, in_reply_to=None, idempotency_key=None):
+        try:
+            poster = get_poster(self.settings["api_base"])
+        except XPostError as e:
+            raise PublishError(str(e), retryable=False) from e
+        try:
+            result = poster.post(text, in_reply_to)
+        except XPostError as e:
+            # X refuses a repeat of a recent post, which means an earlier attempt went through
+            duplicate = e.status_code == 403 and "duplicate" in str(e).lower()
+            raise PublishError(str(e), e.status_code, e.rate_limit, already_published=duplicate) from e
+        return result["tweet_id"], result["rate_limit"]
+
+class _HTTPBackend(Backend):
+    """Backend on its own pooled requests.Session."""
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.timeout = (self.settings.get("connect_timeout", 5), self.settings.get("read_timeout", 30))
+
+    def _post(self, url, **kwargs):
+        try:
+            response = self.session.post(url, timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            raise PublishError(f"{self.name}: {e}") from e
+        rate_limit = self.parse_rate_limit(response.headers)
+        if response.status_code >= 400:
+            try:
+                body = response.json()
+                detail = body.get("error") or body.get("message") or response.text
+            except ValueError:
+                detail = response.text
+            raise PublishError(f"{self.name} {response.status_code}: {detail}", response.status_code, rate_limit)
+        return response, rate_limit
+
+    def parse_rate_limit(self, headers):
+        return {}
+
+class MastodonBackend(_HTTPBackend):
+    """Mastodon statuses API; long drafts become a reply thread."""
+    name = "mastodon"
+
+    def __init__(self, settings, access_token):
+        super().__init__(settings)
+        self.url = f"{settings['base_url'].rstrip('/')}/api/v1/statuses"
+        self.session.headers["Authorization"] = f"Bearer {access_token}"
+
+    def length(self, text):
+        return url_length(text)
+
+    def parse_rate_limit(self, headers):
+        rate_limit = {}
+        for key in ("limit", "remaining"):
+            try:
+                rate_limit[key] = int(headers[f"X-RateLimit-{key.capitalize()}"])
+            except (KeyError, ValueError):
+                pass
+        try:
+            reset = headers["X-RateLimit-Reset"].replace("Z", "+00:00")
+            rate_limit["reset"] = int(datetime.datetime.fromisoformat(reset).timestamp())
+        except (KeyError, ValueError):
+            pass
+        return rate_limit
+
+    def send(self, text, in_reply_to=None, idempotency_key=None):
+        data = {"status": text, "visibility": self.settings["visibility"]}
+        if in_reply_to:
+            data["in_reply_to_id"] = in_reply_to
+        # Mastodon drops a repeat of the same Idempotency-Key for an hour
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else {}
+        response, rate_limit = self._post(self.url, json=data, headers=headers)
+        return str(response.json()["id"]), rate_limit
+
+class LinkedInBackend(_HTTPBackend):
+    """LinkedIn Posts API; no threads, so long drafts are truncated."""
+    name = "linkedin"
+
+    def __init__(self, settings, access_token, author):
+        super().__init__(settings)
+        self.url = f"{settings['api_base'].rstrip('/')}/rest/posts"
+        self.author = author
+        self.session.headers.update({
+            "Authorization": f"Bearer {access_token}",
+            "LinkedIn-Version": str(settings["version"]),
+            "X-Restli-Protocol-Version": "2.0.0",
+        })
+
+    def adapt(self, text):
+        # commentary is "little text": reserved characters must be escaped
+        escaped = _LINKEDIN_RESERVED.sub(r"\\\1", text)
+        return [truncate(escaped, self.settings["max_chars"])]
+
+    def send(self, text, in_reply_to=None, idempotency_key=None):
+        body = {
+            "author": self.author,
+            "commentary": text,
+            "visibility": "PUBLIC",
+            "distribution": {"feedDistribution": "MAIN_FEED", "targetEntities": [], "thirdPartyDistributionChannels": []},
+            "lifecycleState": "PUBLISHED",
+            "isReshareDisabledByAuthor": False,
+        }
+        try:
+            response, rate_limit = self._post(self.url, json=body)
+        except PublishError as e:
+            # LinkedIn refuses a repeat with 422 "Content is a duplicate of urn:li:share:..."
+            duplicate = _LINKEDIN_DUPLICATE.search(str(e)) if e.status_code == 422 else None
+            if duplicate is None:
+                raise
+            raise PublishError(str(e), e.status_code, e.rate_limit, already_published=True,
+                               remote_id=duplicate.group(1)) from e
+        return response.headers.get("x-restli-id"), rate_limit
+
+def _build_backend(name, settings):
+    """The backend for name, or raises PublishError if its credentials are missing."""
+    load_dotenv()
+    if name == "x":
+        return XBackend(settings)
+    if name == "mastodon":
+        token = os.getenv("MASTODON_ACCESS_TOKEN")
+        if not token:
+            raise PublishError("Missing MASTODON_ACCESS_TOKEN in .env file.", retryable=False)
+        return MastodonBackend(settings, token)
+    if name == "linkedin":
+        token, author = os.getenv("LINKEDIN_ACCESS_TOKEN"), os.getenv("LINKEDIN_AUTHOR_URN")
+        if not token or not author:
+            raise PublishError("Missing LINKEDIN_ACCESS_TOKEN or LINKEDIN_AUTHOR_URN in .env file.", retryable=False)
+        return LinkedInBackend(settings, token, author)
+    raise PublishError(f"Unknown platform: {name}", retryable=False)
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+def enabled_platforms():
+    return [name for name, settings in load_platform_settings().items() if settings["enabled"]]
+
+def get_backend(name):
+    """The process-wide backend for a platform. Raises PublishError."""
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = _build_backend(name, load_platform_settings().get(name, {}))
+        return _backends[name]
+
+def publish(platform, text, idempotency_key=None, posted=(), on_part=None):
+    """Adapts and publishes text on one platform (see Backend.publish). Returns the backend's result; raises PublishError."""
+    started = time.perf_counter()
+    result = get_backend(platform).publish(text, idempotency_key, posted, on_part)
+    result["elapsed_ms"] = (time.perf_counter() - started) * 1000
+    return result
+
+def publish_all(text, platforms=None):
+    """
+    Publishes text on every platform (default: the enabled ones) at once.
+    Returns {platform: result dict or PublishError}.
+    """
+    platforms = platforms or enabled_platforms()
+    if not platforms:
+        return {}
+
+    def attempt(platform):
+        try:
+            return publish(platform, text)
+        except PublishError as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=len(platforms)) as pool:
+        return dict(zip(platforms, pool.map(attempt, platforms)))
@@ -0,0 +1,370 @@
+import os
+import re
+import time
+import asyncio
+import threading
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from config_loader import load_section
+
+# Get the directory of the current script
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Telegram rejects longer message texts
+MAX_MESSAGE_LENGTH = 4096
+
+DEFAULT_TELEGRAM_SETTINGS = {
+    # Point at a local stub server for testing
+    "api_base": "https://api.telegram.org",
+    "connect_timeout": 5,
+    "read_timeout": 30,
+    "max_retries": 3,
+    # Bot API limits: ~30 messages/s overall and ~1/s per chat (short bursts allowed)
+    "global_per_second": 30,
+    "chat_per_second": 1,
+    "chat_burst": 3,
+}
+
+MARKDOWN_MARKERS = "*_`["
+_LINK = re.compile(r"\[[^\]\n]+\]\([^)\s]+\)")
+
+def load_telegram_settings():
+    settings = dict(DEFAULT_TELEGRAM_SETTINGS)
+    settings.update(load_section("triggers", "telegram", "client"))
+    return settings
+
+# --- Markdown ---
+
+def _find_close(text, marker, start):
+    """Index of the marker closing an entity opened before start, or -1."""
+    j = text.find(marker, start)
+    while j != -1:
+        followed_by_word = j + 1 < len(text) and text[j + 1].isalnum()
+        if j > start and not text[j - 1].isspace() and not followed_by_word:
+            return j
+        j = text.find(marker, j + 1)
+    return -1
+
+def _escape_entity(marker, body):
+    """
+    Telegram does not allow escapes inside an entity, so stray markers in
+    the body close the entity, get escaped, and the entity is reopened.
+    """
+    parts = re.split(r"([*_`\[])", body)
+    out = []
+    for part in parts:
+        if not part:
+            continue
+        out.append("\\" + part if part in MARKDOWN_MARKERS else f"{marker}{part}{marker}")
+    return "".join(out)
+
+def sanitize_markdown(text):
+    """
+    Makes text safe for parse_mode=Markdown so it is accepted on the first
+    send: '**bold**' becomes Telegram's '*bold*', code spans and links pass
+    through, balanced *bold* / _italic_ are kept, and every other marker
+    character (e.g. the underscore in a design name) is escaped.
+    """
+    # Code spans are literal; only normalize ** outside them
+    pieces = re.split(r"(```.*?```|`[^`\n]*`)", text, flags=re.S)
+    text = "".join(piece if piece.startswith("`") else piece.replace("**", "*") for piece in pieces)
+
+    out = []
+    i = 0
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch == "\\" and i + 1 < n and text[i + 1] in MARKDOWN_MARKERS:
+            out.append(text[i:i + 2])
+            i += 2
+            continue
+        if ch == "`":
+            fence = "```" if text.startswith("```", i) else "`"
+            end = text.find(fence, i + len(fence))
+            if end != -1 and (fence == "```" or "\n" not in text[i:end]):
+                out.append(text[i:end + len(fence)])
+                i = end + len(fence)
+            else:
+                out.append("\\`")
+                i += 1
+            continue
+        if ch == "[":
+            link = _LINK.match(text, i)
+            if link:
+                out.append(link.group(0))
+                i = link.end()
+            else:
+                out.append("\\[")
+                i += 1
+            continue
+        if ch in "*_":
+            opens_word = (i == 0 or not text[i - 1].isalnum()) and i + 1 < n and not text[i + 1].isspace()
+            end = _find_close(text, ch, i + 1) if opens_word else -1
+            if end == -1:
+                out.append("\\" + ch)
+                i += 1
+            else:
+                out.append(_escape_entity(ch, text[i + 1:end]))
+                i = end + 1
+            continue
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
+def split_message(text, limit=MAX_MESSAGE_LENGTH):
+    """Splits text into chunks of at most limit chars, preferring paragraph, line, then word breaks."""
+    chunks = []
+    while len(text) > limit:
+        window = text[:limit]
+        cut = max(window.rfind("\n\n"), 0) or max(window.rfind("\n"), 0) or max(window.rfind(" "), 0) or limit
+        chunk = text[:cut].rstrip()
+        # A run of blank lines can leave nothing before the cut; Telegram rejects empty messages
+        if chunk:
+            chunks.append(chunk)
+        text = text[cut:].lstrip("\n ")
+    if text:
+        chunks.append(text)
+    return chunks
+
+# --- Rate limiting ---
+
+class _TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def reserve(self, now):
+        """Takes a token and returns how long to wait before using it."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+class RateLimiter:
+    """Global plus per-chat token buckets, and a pause honouring a 429's retry_after."""
+
+    def __init__(self, global_per_second, chat_per_second, chat_burst):
+        self._lock = threading.Lock()
+        self._global = _TokenBucket(global_per_second, global_per_second)
+        self._chat_rate = chat_per_second
+        self._chat_burst = chat_burst
+        self._chats = {}
+        self._paused_until = 0.0
+
+    def reserve(self, chat_id):
+        """Books a send for chat_id and returns how many seconds to wait first."""
+        with self._lock:
+            now = time.monotonic()
+            chat = self._chats.get(chat_id)
+            if chat is None:
+                chat = self._chats[chat_id] = _TokenBucket(self._chat_rate, self._chat_burst)
+            return max(self._global.reserve(now), chat.reserve(now), self._paused_until - now, 0.0)
+
+    def wait(self, chat_id):
+        delay = self.reserve(chat_id)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def wait_async(self, chat_id):
+        delay = self.reserve(chat_id)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+# --- Client ---
+
+class TelegramError(Exception):
+    def __init__(self, description, error_code=None):
+        super().__init__(description)
+        self.error_code = error_code
+
+class _TelegramBase:
+    """Settings, rate limiting, retry decisions and message rendering shared by both clients."""
+
+    def __init__(self, token, settings=None):
+        self.settings = settings or load_telegram_settings()
+        self.base_url = f"{self.settings['api_base'].rstrip('/')}/bot{token}"
+        self.limiter = RateLimiter(self.settings["global_per_second"], self.settings["chat_per_second"],
+                                   self.settings["chat_burst"])
+        self._stats_lock = threading.Lock()
+        self.stats = {"sent": 0, "retries": 0, "rate_limited": 0, "throttled_s": 0.0}
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _retry_delay(self, method, body, status_code, attempt):
+        """
+        Decides what to do with a failed response: returns the backoff before
+        the next attempt, or raises TelegramError if it should not be retried.
+        """
+        error_code = body.get("error_code", status_code)
+        description = body.get("description", f"{method} failed")
+        retry_after = body.get("parameters", {}).get("retry_after")
+        if error_code == 429 and retry_after is not None:
+            # The limiter holds every send until retry_after has passed
+            self._count("rate_limited")
+            self.limiter.pause(retry_after)
+            delay = 0
+        elif error_code < 500:
+            raise TelegramError(description, error_code)
+        else:
+            delay = 2 ** attempt
+        if attempt >= self.settings["max_retries"]:
+            raise TelegramError(description, error_code)
+        self._count("retries")
+        return delay
+
+    def _network_retry_delay(self, method, error, attempt):
+        if attempt >= self.settings["max_retries"]:
+            raise TelegramError(f"{method} failed: {error}")
+        self._count("retries")
+        return 2 ** attempt
+
+    def _render(self, text, parse_mode):
+        """[(params, plain_chunk)] for each message text should be sent as."""
+        messages = []
+        for chunk in split_message(text):
+            formatted = sanitize_markdown(chunk) if parse_mode == "Markdown" else chunk
+            # Escaping can push a chunk over the limit; send those as plain text
+            if parse_mode and len(formatted) <= MAX_MESSAGE_LENGTH:
+                messages.append(({"text": formatted, "parse_mode": parse_mode}, chunk))
+            else:
+                messages.append(({"text": chunk}, chunk))
+        return messages
+
+    @staticmethod
+    def _is_format_error(params, error):
+        # Last resort only: a 400 means nothing was delivered, so a plain resend is not a duplicate
+        return "parse_mode" in params and error.error_code == 400
+
+    def get_stats(self):
+        with self._stats_lock:
+            return dict(self.stats)
+
+class TelegramClient(_TelegramBase):
+    """
+    Bot API client on one pooled requests.Session. Calls are rate limited,
+    retried on 429 (after retry_after) and on network / 5xx errors with
+    backoff, and send_message splits long texts and sanitizes Markdown first.
+    """
+
+    def __init__(self, token, settings=None):
+        super().__init__(token, settings)
+        self.timeout = (self.settings["connect_timeout"], self.settings["read_timeout"])
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=10))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=10))
+
+    def call(self, method, chat_id=None, read_timeout=None, **params):
+        """
+        Calls a Bot API method and returns its result. Raises TelegramError.
+        Only calls addressed to a chat count against the send rate limits.
+        """
+        timeout = self.timeout if read_timeout is None else (self.timeout[0], read_timeout)
+        if chat_id is not None:
+            params["chat_id"] = chat_id
+        attempt = 0
+        while True:
+            if chat_id is not None:
+                self._count("throttled_s", self.limiter.wait(chat_id))
+            try:
+                r = self.session.post(f"{self.base_url}/{method}", json=params, timeout=timeout)
+                body = r.json()
+            except (requests.RequestException, ValueError) as e:
+                delay = self._network_retry_delay(method, e, attempt)
+            else:
+                if body.get("ok"):
+                    return body.get("result")
+                delay = self._retry_delay(method, body, r.status_code, attempt)
+            time.sleep(delay)
+            attempt += 1
+
+    def send_message(self, chat_id, text, parse_mode="Markdown"):
+        """Sends text, split into several messages if needed. Returns the sent Message objects."""
+        sent = []
+        for params, plain in self._render(text, parse_mode):
+            try:
+                sent.append(self.call("sendMessage", chat_id, **params))
+            except TelegramError as e:
+                if not self._is_format_error(params, e):
+                    raise
+                print(f"Telegram rejected formatting ({e}); sending as plain text")
+                sent.append(self.call("sendMessage", chat_id, text=plain))
+            self._count("sent")
+        return sent
+
+    def get_updates(self, offset=None, timeout=30, limit=100):
+        """Long-polls for up to limit updates from offset on; [] if none arrive within timeout seconds."""
+        params = {"timeout": timeout, "limit": limit}
+        if offset is not None:
+            params["offset"] = offset
+        return self.call("getUpdates", read_timeout=timeout + self.settings["read_timeout"], **params)
+
+class AsyncTelegramClient(_TelegramBase):
+    """TelegramClient for asyncio code, on a pooled httpx.AsyncClient."""
+
+    def __init__(self, token, settings=None):
+        super().__init__(token, settings)
+        self.http = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.settings["read_timeout"], connect=self.settings["connect_timeout"]),
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+        )
+
+    async def call(self, method, chat_id=None, **params):
+        """Calls a Bot API method and returns its result. Raises TelegramError."""
+        if chat_id is not None:
+            params["chat_id"] = chat_id
+        attempt = 0
+        while True:
+            if chat_id is not None:
+                self._count("throttled_s", await self.limiter.wait_async(chat_id))
+            try:
+                r = await self.http.post(f"{self.base_url}/{method}", json=params)
+                body = r.json()
+            except (httpx.HTTPError, ValueError) as e:
+                delay = self._network_retry_delay(method, e, attempt)
+            else:
+                if body.get("ok"):
+                    return body.get("result")
+                delay = self._retry_delay(method, body, r.status_code, attempt)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def send_message(self, chat_id, text, parse_mode="Markdown"):
+        """Sends text, split into several messages if needed. Returns the sent Message objects."""
+        sent = []
+        for params, plain in self._render(text, parse_mode):
+            try:
+                sent.append(await self.call("sendMessage", chat_id, **params))
+            except TelegramError as e:
+                if not self._is_format_error(params, e):
+                    raise
+                print(f"Telegram rejected formatting ({e}); sending as plain text")
+                sent.append(await self.call("sendMessage", chat_id, text=plain))
+            self._count("sent")
+        return sent
+
+    async def aclose(self):
+        await self.http.aclose()
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_telegram_client():
+    """The process-wide client for TELEGRAM_BOT_TOKEN."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = TelegramClient(os.getenv("TELEGRAM_BOT_TOKEN"))
+        return _client
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# The bot's modules import each other by name, as when run from openclaw-manager/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "skills", "agentic_pr"))
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """database_manager on a fresh, fully migrated database."""
+    import database_manager
+
+    monkeypatch.setattr(database_manager, "DB_PATH", str(tmp_path / "test.db"))
+    database_manager.init_db()
+    yield database_manager
+    database_manager.close_connection()
@@ -0,0 +1,35 @@
+import json
+import os
+
+import pytest
+
+import config_loader
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    path = tmp_path / "config.json"
+    monkeypatch.setattr(config_loader, "CONFIG_PATH", str(path))
+    monkeypatch.setattr(config_loader, "_config_cache", {"mtime": None, "config": None})
+
+    def write(data, mtime):
+        path.write_text(json.dumps(data))
+        os.utime(path, (mtime, mtime))
+    return write
+
+def test_the_file_is_parsed_once_until_it_changes(config):
+    config({"llm": {"read_timeout": 10}}, 1000)
+    first = config_loader.load_config()
+    assert config_loader.load_config() is first
+
+    config({"llm": {"read_timeout": 20}}, 2000)
+    assert config_loader.load_section("llm") == {"read_timeout": 20}
+
+def test_a_missing_section_gives_the_default(config):
+    config({"skill_settings": {"agentic_pr": {}}}, 1000)
+    assert config_loader.load_section("skill_settings", "agentic_pr", "platforms") == {}
+    assert config_loader.load_section("skill_settings", "agentic_pr", "report_globs", default={"a": []}) == {"a": []}
+
+def test_a_missing_file_gives_the_default_section_but_load_config_raises(config):
+    assert config_loader.load_section("llm") == {}
+    with pytest.raises(OSError):
+        config_loader.load_config()
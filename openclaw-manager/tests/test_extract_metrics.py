@@ -0,0 +1,101 @@
+import os
+
+import pytest
+
+import extract_metrics
+from extract_metrics import scan_report, METRIC_PATTERNS, METRIC_REGEXES
+
+REPORT = (
+    "OpenROAD report\n"
+    "Design area 1523 u^2 41.7% utilization.\n"
+    "Chip area for module '\\counter': 1523.456\n"
+    "noise line with violation count words but no number\n"
+    "worst slack 0.523\n"
+    "worst slack -9.9\n"
+    "Total Power = 1.25e-03 W\n"
+    "[INFO] violation count 17\n"
+    "Total errors = 0\n"
+    "Net violations: 3\n"
+    "Percentage drop : 2.5 %"  # last line without a newline
+)
+
+def whole_file(text, wanted):
+    """The reference: the first match of each metric in the whole text at once."""
+    found = {}
+    for key in wanted:
+        match = METRIC_REGEXES[key].search(text)
+        if match:
+            found[key] = METRIC_PATTERNS[key][1](match.group(1))
+    return found
+
+@pytest.fixture
+def report(tmp_path):
+    def write(text):
+        path = tmp_path / "report.rpt"
+        path.write_text(text)
+        return str(path)
+    return write
+
+def test_whole_report_scan_finds_every_metric(report):
+    expected = whole_file(REPORT, METRIC_PATTERNS)
+    assert len(expected) == len(METRIC_PATTERNS)
+    assert scan_report(report(REPORT), METRIC_PATTERNS) == expected
+
+@pytest.mark.parametrize("chunk_size", range(1, 48))
+def test_every_chunk_boundary_gives_the_whole_file_result(report, monkeypatch, chunk_size):
+    monkeypatch.setattr(extract_metrics, "CHUNK_SIZE", chunk_size)
+    # Shifting the text moves every line across every chunk boundary
+    for shift in range(chunk_size):
+        text = "x" * shift + "\n" + REPORT
+        assert scan_report(report(text), METRIC_PATTERNS) == whole_file(text, METRIC_PATTERNS), shift
+
+def test_only_wanted_metrics_are_returned(report, monkeypatch):
+    monkeypatch.setattr(extract_metrics, "CHUNK_SIZE", 7)
+    assert scan_report(report(REPORT), ["slack_ns", "drc_violations"]) == {"slack_ns": 0.523, "drc_violations": 17}
+
+def test_a_metric_at_the_end_of_a_line_longer_than_max_carry(report, monkeypatch):
+    monkeypatch.setattr(extract_metrics, "CHUNK_SIZE", 16)
+    monkeypatch.setattr(extract_metrics, "MAX_CARRY", 64)
+    text = "#" * 1000 + " worst slack 1.25\nviolation count 4\n"
+    assert scan_report(report(text), ["slack_ns", "drc_violations"]) == {"slack_ns": 1.25, "drc_violations": 4}
+
+# --- _extract ---
+
+def write_run(tmp_path, files):
+    for name, text in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    return str(tmp_path)
+
+def test_each_known_report_is_searched_only_for_its_own_metrics(tmp_path, monkeypatch):
+    run = write_run(tmp_path, {
+        "reports/synthesis/stat.rpt": "Chip area for module 'top': 12.5\n",
+        "reports/signoff/sta.summary.rpt": "worst slack 0.5\nTotal Power = 2e-03 W\n",
+        "reports/signoff/drc.rpt": "violation count 0\n",
+        # A step log echoing a stale utilization line, listed under the area globs only
+        "logs/synthesis/floorplan.log": "Design area 100 u^2 99.0% utilization\n",
+        "logs/placement/global.log": "Design area 100 u^2 41.5% utilization\n",
+    })
+    # ... and newer than the area report, so it is the first area candidate searched
+    os.utime(tmp_path / "logs/synthesis/floorplan.log", (2e9, 2e9))
+    globs = dict(extract_metrics.DEFAULT_REPORT_GLOBS, area_mm2=["reports/synthesis/*stat*.rpt", "logs/synthesis/*.log"])
+    calls = []
+    real_scan = extract_metrics.scan_report
+    monkeypatch.setattr(extract_metrics, "scan_report",
+                        lambda path, wanted, cancel_event=None: calls.append(path) or real_scan(path, wanted, cancel_event))
+
+    metrics, sources, complete = extract_metrics._extract(run, globs)
+    assert complete
+    assert metrics["density_pct"] == 41.5
+    assert metrics["area_mm2"] == 12.5 and metrics["slack_ns"] == 0.5 and metrics["power_mw"] == 2.0
+    assert len(calls) == len(set(calls))
+
+def test_the_fallback_still_searches_a_known_report_for_other_core_metrics(tmp_path):
+    run = write_run(tmp_path, {
+        "logs/placement/global.log": "Design area 100 u^2 41.5% utilization\nworst slack -0.25\n",
+    })
+    metrics, sources, complete = extract_metrics._extract(run, extract_metrics.DEFAULT_REPORT_GLOBS)
+    assert not complete
+    assert metrics["density_pct"] == 41.5
+    assert metrics["slack_ns"] == -0.25
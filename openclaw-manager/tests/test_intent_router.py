@@ -0,0 +1,44 @@
+import pytest
+
+import intent_router
+from intent_router import route_locally, predict, train_model, RULES_ONLY
+
+@pytest.fixture
+def model(tmp_path, monkeypatch):
+    """A trained n-gram model that strongly prefers confirm_post for 'push the draft out'."""
+    path = str(tmp_path / "router_model.json")
+    monkeypatch.setattr(intent_router, "MODEL_PATH", path)
+    monkeypatch.setattr(intent_router, "_model_cache", {"mtime": None, "model": None})
+    examples = [("push the draft out", "confirm_post"), ("push my post out", "confirm_post")] * 20
+    examples += [("give me the chip numbers", "check_metrics"), ("chip numbers for counter", "check_metrics")] * 10
+    return train_model(examples, path)
+
+@pytest.mark.parametrize("text", ["go ahead", "post it", "yes, publish it", "Post it now!", "okay, go ahead please"])
+def test_bare_publish_commands_route_to_confirm_post(text):
+    assert route_locally(text) == ("confirm_post", "rules")
+
+@pytest.mark.parametrize("text", [
+    "should I post it?",
+    "don't post it",
+    "post it?",
+    "post it tomorrow",
+    "post it at 9pm",
+    "wait, not yet",
+])
+def test_questions_negations_and_qualified_publishes_escalate(text, model):
+    assert route_locally(text) == (None, None)
+
+def test_the_model_never_returns_a_rules_only_label(model):
+    label, probability = predict("push the draft out", model)
+    assert label in RULES_ONLY and probability >= intent_router.MODEL_CONFIDENCE
+    assert route_locally("push the draft out") == (None, None)
+
+def test_the_model_routes_labels_it_is_confident_about(model):
+    assert route_locally("give me the chip numbers") == ("check_metrics", "model")
+
+def test_the_model_is_not_used_below_the_minimum_examples(tmp_path, monkeypatch):
+    path = str(tmp_path / "router_model.json")
+    monkeypatch.setattr(intent_router, "MODEL_PATH", path)
+    monkeypatch.setattr(intent_router, "_model_cache", {"mtime": None, "model": None})
+    train_model([("give me the chip numbers", "check_metrics")] * (intent_router.MIN_TRAINING_EXAMPLES - 1), path)
+    assert route_locally("give me the chip numbers") == (None, None)
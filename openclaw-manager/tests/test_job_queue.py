@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+
+from job_queue import ChatScheduler, JobQueue
+
+class BlockingJobs:
+    """Jobs that record their start and then block until released (or cancelled)."""
+
+    def __init__(self):
+        self.started = []
+        self.cancelled = []
+        self.release = threading.Event()
+        self._started = threading.Condition()
+
+    def job(self, name, cancel_event):
+        with self._started:
+            self.started.append(name)
+            self._started.notify_all()
+        self.release.wait(5)
+        if cancel_event.is_set():
+            self.cancelled.append(name)
+
+    def wait_started(self, count):
+        with self._started:
+            assert self._started.wait_for(lambda: len(self.started) >= count, 5)
+
+@pytest.fixture
+def scheduler():
+    queue = JobQueue(max_workers=4, max_pending=8)
+    yield ChatScheduler(queue, max_queued_per_chat=3)
+    queue.shutdown()
+
+@pytest.fixture
+def jobs(scheduler):
+    jobs = BlockingJobs()
+    yield jobs
+    jobs.release.set()
+
+def test_a_chats_jobs_run_one_at_a_time_in_arrival_order(scheduler, jobs):
+    for name in ("a", "b", "c"):
+        assert scheduler.submit(1, jobs.job, name) == "queued"
+    jobs.wait_started(1)
+    assert jobs.started == ["a"]
+    assert scheduler.stats()["queued"] == 2
+
+    jobs.release.set()
+    jobs.wait_started(3)
+    assert jobs.started == ["a", "b", "c"]
+
+def test_different_chats_run_in_parallel(scheduler, jobs):
+    scheduler.submit(1, jobs.job, "chat1")
+    scheduler.submit(2, jobs.job, "chat2")
+    jobs.wait_started(2)
+    assert sorted(jobs.started) == ["chat1", "chat2"]
+
+def test_a_duplicate_check_is_coalesced_while_queued_or_running(scheduler, jobs):
+    assert scheduler.submit(1, jobs.job, "check", coalesce_key="/check_latest") == "queued"
+    jobs.wait_started(1)
+    assert scheduler.submit(1, jobs.job, "check again", coalesce_key="/check_latest") == "coalesced"
+
+    assert scheduler.submit(1, jobs.job, "list") == "queued"
+    assert scheduler.submit(1, jobs.job, "post", coalesce_key="/confirm") == "queued"
+    assert scheduler.submit(1, jobs.job, "post again", coalesce_key="/confirm") == "coalesced"
+    assert scheduler.stats()["coalesced"] == 2
+
+    jobs.release.set()
+    jobs.wait_started(3)
+    assert jobs.started == ["check", "list", "post"]
+
+def test_a_full_chat_queue_is_busy(scheduler, jobs):
+    scheduler.submit(1, jobs.job, "running")
+    jobs.wait_started(1)
+    for name in ("q1", "q2", "q3"):
+        assert scheduler.submit(1, jobs.job, name) == "queued"
+    assert scheduler.submit(1, jobs.job, "q4") == "busy"
+
+def test_cancel_signals_the_running_job_and_drops_the_queued_ones(scheduler, jobs):
+    scheduler.submit(1, jobs.job, "check", coalesce_key="/check_latest")
+    scheduler.submit(1, jobs.job, "list")
+    jobs.wait_started(1)
+
+    assert scheduler.cancel(1) == (True, 1)
+    # A cancelled check no longer blocks a new one
+    assert scheduler.submit(1, jobs.job, "check again", coalesce_key="/check_latest") == "queued"
+
+    jobs.release.set()
+    jobs.wait_started(2)
+    assert jobs.started == ["check", "check again"]
+    assert jobs.cancelled[0] == "check"
+    assert scheduler.stats()["cancelled"] == 2
+
+def test_cancel_without_jobs_does_nothing(scheduler):
+    assert scheduler.cancel(1) == (False, 0)
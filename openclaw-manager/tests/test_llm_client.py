@@ -0,0 +1,89 @@
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import llm_client
+import messenger_listener
+
+def chunk(content=None, finish_reason=None):
+    delta = SimpleNamespace(content=content, reasoning_content=None)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=finish_reason)])
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def close(self):
+        pass
+
+class FakeClient:
+    """Answers each completion with the next scripted list of chunks."""
+
+    def __init__(self):
+        self.script = []
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **request_params):
+        self.requests.append(request_params)
+        return FakeStream(self.script.pop(0))
+
+@pytest.fixture
+def client(db, monkeypatch):
+    fake = FakeClient()
+    monkeypatch.setenv("NVIDIA_API_KEY", "test")
+    monkeypatch.setattr(llm_client, "get_client", lambda base_url, api_key, settings=None: (fake, False))
+    monkeypatch.setattr(llm_client, "_cache", llm_client.OrderedDict())
+    return fake
+
+def test_a_completion_cut_off_by_max_tokens_is_not_cached(client):
+    client.script = [[chunk("REPLY: The long answer"), chunk(" goes on", "length")],
+                     [chunk("REPLY: The long answer goes on", "length")]]
+    first = llm_client.call_llm("explain timing closure", purpose="route")
+    assert first["finish_reason"] == "length"
+    assert not llm_client.call_llm("explain timing closure", purpose="route").get("cached")
+    assert len(client.requests) == 2
+
+def test_a_complete_completion_is_cached(client):
+    client.script = [[chunk("REPLY: Hi!"), chunk("", "stop")]]
+    assert llm_client.call_llm("hello", purpose="route")["finish_reason"] == "stop"
+    assert llm_client.call_llm("hello", purpose="route")["cached"]
+
+def test_a_truncated_route_reply_falls_back_to_chat(client):
+    truncated = {"content": "REPLY: Timing closure means", "finish_reason": "length"}
+    assert messenger_listener.interpret_route("explain timing closure", truncated, time.perf_counter()) == (None, None)
+    complete = {"content": "REPLY: Hi!", "finish_reason": "stop"}
+    assert messenger_listener.interpret_route("hello", complete, time.perf_counter()) == (None, "Hi!")
+
+def test_a_completion_the_caller_rejects_is_not_cached(client):
+    client.script = [[chunk("Sure! Here is the analysis:"), chunk("", "stop")],
+                     [chunk('{"readiness_score": "90%"}'), chunk("", "stop")]]
+    first = llm_client.call_llm("analyze", purpose="analysis", validate=json.loads)
+    assert first["content"] == "Sure! Here is the analysis:"
+    second = llm_client.call_llm("analyze", purpose="analysis", validate=json.loads)
+    assert not second.get("cached")
+    assert llm_client.call_llm("analyze", purpose="analysis", validate=json.loads)["cached"]
+
+def test_a_cached_completion_the_caller_rejects_is_a_miss(client):
+    client.script = [[chunk("not json"), chunk("", "stop")],
+                     [chunk('{"readiness_score": "90%"}'), chunk("", "stop")]]
+    # Cached before the caller started validating
+    llm_client.call_llm("analyze", purpose="analysis")
+    result = llm_client.call_llm("analyze", purpose="analysis", validate=json.loads)
+    assert not result.get("cached")
+    assert result["content"] == '{"readiness_score": "90%"}'
+
+def test_only_known_tool_calls_and_replies_are_accepted_routes():
+    assert messenger_listener.route_accepted("CALL: check_metrics")
+    assert messenger_listener.route_accepted("REPLY: Hi!")
+    assert not messenger_listener.route_accepted("CALL: launch_rocket")
+    assert not messenger_listener.route_accepted("I think you want the metrics.")
+
+def test_a_cached_route_reply_is_marked_as_cached(db):
+    cached = {"content": "REPLY: Hi!", "cached": True}
+    assert messenger_listener.interpret_route("hello", cached, time.perf_counter()) == (None, "Hi!\n\n♻️ _cached reply_")
@@ -0,0 +1,34 @@
+import pytest
+
+import messenger_listener
+import publisher
+
+@pytest.fixture
+def queued(db, monkeypatch):
+    """A pending draft, with queue_post recording the chat it would notify."""
+    calls = []
+
+    def queue_post(post_id, content, platforms=None, not_before=None, notify_chat_id=None):
+        calls.append(notify_chat_id)
+        return ["x"]
+    monkeypatch.setattr(publisher, "queue_post", queue_post)
+    monkeypatch.setattr(publisher, "enabled_platforms", lambda: ["x"])
+    monkeypatch.delenv("TELEGRAM_AUTHORIZED_USER_ID", raising=False)
+    db.save_pending_post("counter", "draft", "90%")
+    return calls
+
+def test_a_plain_english_post_it_notifies_the_chat_that_asked(queued):
+    reply = messenger_listener.run_agentic_loop("post it", chat_id=42)
+    assert queued == [42]
+    assert "You'll get a message" in reply
+
+def test_the_authorized_user_is_notified_when_no_chat_is_known(queued, monkeypatch):
+    monkeypatch.setenv("TELEGRAM_AUTHORIZED_USER_ID", "7")
+    reply = messenger_listener.call_tool("confirm_post")
+    assert queued == ["7"]
+    assert "You'll get a message" in reply
+
+def test_no_notification_is_promised_without_a_chat_to_notify(queued):
+    reply = messenger_listener.call_tool("confirm_post")
+    assert queued == [None]
+    assert "Queued" in reply and "You'll get a message" not in reply
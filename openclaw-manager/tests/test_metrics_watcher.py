@@ -0,0 +1,23 @@
+import threading
+
+import metrics_watcher
+
+def test_a_failing_poll_does_not_stop_the_watcher(monkeypatch):
+    calls = []
+    polled_twice = threading.Event()
+
+    def find_latest_runs(designs_path):
+        calls.append(designs_path)
+        if len(calls) == 3:
+            polled_twice.set()
+        raise OSError("share unavailable")
+    monkeypatch.setattr(metrics_watcher, "find_latest_runs_by_design", find_latest_runs)
+
+    watcher = metrics_watcher.MetricsWatcher("/designs", scan_interval_seconds=0.01, use_inotify=False)
+    watcher.start()
+    try:
+        # The warm-up scan_once plus two polls, each raising
+        assert polled_twice.wait(2)
+        assert watcher._thread.is_alive()
+    finally:
+        watcher.stop()
@@ -0,0 +1,84 @@
+NOW = 1_000_000.0
+
+def post_status(db, post_id):
+    return db.get_connection().execute("SELECT status FROM posts WHERE id = ?", (post_id,)).fetchone()[0]
+
+def outbox_row(db, outbox_id):
+    row = db.get_connection().execute("SELECT status, attempts, not_before FROM outbox WHERE id = ?",
+                                      (outbox_id,)).fetchone()
+    return dict(zip(("status", "attempts", "not_before"), row))
+
+def queue(db, platform="x", not_before=NOW, content="draft"):
+    post_id = db.save_pending_post("counter", content, "90%")
+    assert db.enqueue_outbox(post_id, platform, content, not_before)
+    return post_id
+
+def test_enqueue_marks_the_post_queued_once(db):
+    post_id = queue(db)
+    assert post_status(db, post_id) == "queued"
+    assert not db.enqueue_outbox(post_id, "x", "draft", NOW)
+    assert db.get_outbox_stats() == {"x": {"queued": 1}}
+
+def test_claims_are_first_in_first_out(db):
+    first, second = queue(db), queue(db)
+    assert db.claim_next_outbox(NOW)["post_id"] == first
+    assert db.claim_next_outbox(NOW)["post_id"] == second
+    assert db.claim_next_outbox(NOW) is None
+
+def test_claim_waits_for_not_before_and_skips_platforms(db):
+    queue(db, "x", not_before=NOW + 60)
+    mastodon = queue(db, "mastodon")
+    assert db.claim_next_outbox(NOW, ["mastodon"]) is None
+    assert db.next_outbox_due(["mastodon"]) == NOW + 60
+    assert db.claim_next_outbox(NOW)["post_id"] == mastodon
+    assert db.claim_next_outbox(NOW + 60)["platform"] == "x"
+
+def test_claim_moves_the_row_to_sending_and_counts_the_attempt(db):
+    queue(db)
+    item = db.claim_next_outbox(NOW)
+    assert item["attempts"] == 1
+    assert outbox_row(db, item["id"])["status"] == "sending"
+
+def test_retry_requeues_and_a_rate_limited_attempt_is_not_counted(db):
+    queue(db)
+    item = db.claim_next_outbox(NOW)
+    db.retry_outbox(item["id"], NOW + 30, "503")
+    assert outbox_row(db, item["id"]) == {"status": "queued", "attempts": 1, "not_before": NOW + 30}
+    assert db.claim_next_outbox(NOW) is None
+
+    item = db.claim_next_outbox(NOW + 30)
+    db.retry_outbox(item["id"], NOW + 900, "429", count_attempt=False)
+    assert outbox_row(db, item["id"])["attempts"] == 1
+
+def test_rows_interrupted_mid_send_are_claimed_again_after_a_restart(db):
+    queue(db)
+    queue(db)
+    item = db.claim_next_outbox(NOW)
+    sent = db.claim_next_outbox(NOW)
+    db.complete_outbox(sent["id"], "remote-1")
+    # Crash: item is left in sending and no longer claimable
+    assert db.claim_next_outbox(NOW) is None
+
+    assert db.requeue_interrupted_outbox() == 1
+    reclaimed = db.claim_next_outbox(NOW)
+    assert reclaimed["id"] == item["id"]
+    assert reclaimed["idempotency_key"] == item["idempotency_key"]
+    assert reclaimed["attempts"] == 2
+    assert db.claim_next_outbox(NOW) is None
+    assert outbox_row(db, sent["id"])["status"] == "sent"
+
+def test_a_failed_row_is_queued_again_by_a_new_confirm(db):
+    post_id = queue(db)
+    item = db.claim_next_outbox(NOW)
+    assert db.fail_outbox(item["id"], "400 bad request")
+    assert post_status(db, post_id) == "pending"
+
+    assert db.enqueue_outbox(post_id, "x", "edited draft", NOW)
+    assert outbox_row(db, item["id"]) == {"status": "queued", "attempts": 0, "not_before": NOW}
+
+def test_failing_one_platform_keeps_the_post_while_another_is_queued(db):
+    post_id = queue(db, "x")
+    assert db.enqueue_outbox(post_id, "linkedin", "draft", NOW)
+    item = db.claim_next_outbox(NOW)
+    assert not db.fail_outbox(item["id"], "401")
+    assert post_status(db, post_id) == "queued"
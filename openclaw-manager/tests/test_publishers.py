@@ -0,0 +1,208 @@
+import re
+
+import pytest
+
+import publisher
+import publishers
+from publishers import Backend, LinkedInBackend, PublishError, split_thread, truncate, x_length
+
+NUMBERING = re.compile(r" \d+/\d+$")
+
+# --- split_thread / truncate ---
+
+def test_text_that_fits_is_one_unnumbered_post():
+    assert split_thread("a" * 20, 20) == ["a" * 20]
+
+def test_one_over_the_limit_becomes_a_numbered_thread():
+    parts = split_thread("a" * 21, 20)
+    assert parts == ["a" * 14 + " 1/2", "a" * 7 + " 2/2"]
+    assert all(len(part) <= 20 for part in parts)
+
+def test_splits_prefer_paragraph_then_sentence_boundaries():
+    text = "First point. Second point.\n\nNew paragraph here."
+    assert split_thread(text, 32) == ["First point. Second point. 1/2", "New paragraph here. 2/2"]
+
+def test_parts_fit_and_keep_every_word():
+    text = "\n\n".join(" ".join(f"w{p}.{i}" for i in range(40 + p * 7)) for p in range(5))
+    parts = split_thread(text, 100)
+    assert all(len(part) <= 100 for part in parts)
+    assert " ".join(NUMBERING.sub("", part) for part in parts).split() == text.split()
+
+def test_limit_is_measured_with_the_given_length():
+    text = "日本語" * 60
+    parts = split_thread(text, 280, x_length)
+    assert len(parts) > 1
+    assert all(x_length(part) <= 280 for part in parts)
+    assert "".join(NUMBERING.sub("", part) for part in parts) == text
+
+def test_numbering_stays_within_the_limit_past_99_parts():
+    parts = split_thread(" ".join(["w"] * 3000), 20)
+    assert len(parts) >= 100
+    assert all(len(part) <= 20 for part in parts)
+    assert parts[-1].endswith(f" {len(parts)}/{len(parts)}")
+
+@pytest.mark.parametrize("limit", [1, 5, 7])
+def test_a_limit_with_no_room_next_to_the_numbering_raises(limit):
+    with pytest.raises(ValueError):
+        split_thread("a" * 50, limit)
+
+def test_x_length_counts_urls_as_23_and_wide_characters_as_2():
+    assert x_length("see https://example.com/" + "a" * 100) == 4 + 23
+    assert x_length("日本") == 4
+    assert x_length("café – ok") == 9
+
+def test_truncate_leaves_text_at_the_limit_alone():
+    assert truncate("hello", 5) == "hello"
+
+def test_truncate_ends_with_an_ellipsis_within_the_limit():
+    assert truncate("hello world", 8) == "hello w…"
+    assert truncate("hello   world", 9) == "hello…"
+
+def test_truncate_uses_the_given_length():
+    result = truncate("日本語テキスト", 6, x_length)
+    assert result == "日本…"
+    assert x_length(result) <= 6
+
+# --- Backend.publish ---
+
+class FakeBackend(Backend):
+    """Records each part; script holds the outcome of each send in turn (None to succeed)."""
+    name = "x"
+
+    def __init__(self, max_chars=20, script=()):
+        super().__init__({"max_chars": max_chars, "thread": True})
+        self.script = list(script)
+        self.sent = []
+
+    def send(self, text, in_reply_to=None, idempotency_key=None):
+        outcome = self.script.pop(0) if self.script else None
+        if outcome is not None:
+            raise outcome
+        self.sent.append((text, in_reply_to))
+        return f"id{len(self.sent)}", {"remaining": 10}
+
+DRAFT = "a" * 30  # three parts at max_chars=20
+
+def test_parts_are_chained_into_a_thread():
+    backend = FakeBackend()
+    result = backend.publish(DRAFT)
+    assert [reply_to for text, reply_to in backend.sent] == [None, "id1", "id2"]
+    assert result["remote_id"] == "id1"
+    assert result["remote_ids"] == ["id1", "id2", "id3"]
+
+def test_publish_reports_progress_and_resumes_after_the_posted_parts():
+    progress = []
+    backend = FakeBackend()
+    result = backend.publish(DRAFT, posted=["old1"], on_part=progress.append)
+    assert [text[-3:] for text, reply_to in backend.sent] == ["2/3", "3/3"]
+    assert backend.sent[0][1] == "old1"
+    assert progress[-1] == result["remote_ids"] == ["old1", "id1", "id2"]
+
+def test_a_failed_part_keeps_the_progress_of_the_earlier_ones():
+    progress = []
+    backend = FakeBackend(script=[None, PublishError("503", 503)])
+    with pytest.raises(PublishError) as raised:
+        backend.publish(DRAFT, on_part=progress.append)
+    assert raised.value.retryable
+    assert progress == [["id1"]]
+
+def test_a_duplicate_final_part_counts_as_published():
+    backend = FakeBackend(script=[PublishError("duplicate", 403, already_published=True)])
+    result = backend.publish("short", posted=[])
+    assert result["remote_ids"] == [None]
+
+def test_a_duplicate_part_with_a_known_id_is_chained_to():
+    backend = FakeBackend(script=[PublishError("duplicate", 422, already_published=True, remote_id="urn:1")])
+    result = backend.publish(DRAFT)
+    assert result["remote_ids"] == ["urn:1", "id1", "id2"]
+    assert backend.sent[0][1] == "urn:1"
+
+def test_a_duplicate_mid_thread_part_without_an_id_stops_the_thread():
+    backend = FakeBackend(script=[PublishError("duplicate", 403, already_published=True)])
+    with pytest.raises(PublishError) as raised:
+        backend.publish(DRAFT)
+    assert not raised.value.retryable
+    assert backend.sent == []
+
+def test_a_limit_too_small_to_thread_is_not_retried():
+    with pytest.raises(PublishError) as raised:
+        FakeBackend(max_chars=5).publish(DRAFT)
+    assert not raised.value.retryable
+
+def test_linkedin_maps_its_duplicate_error_to_the_existing_post(monkeypatch):
+    backend = LinkedInBackend({"api_base": "http://mock", "version": "202405", "max_chars": 3000}, "token", "urn:li:person:1")
+
+    def refuse(url, **kwargs):
+        raise PublishError("linkedin 422: Content is a duplicate of urn:li:share:7123", 422)
+    monkeypatch.setattr(backend, "_post", refuse)
+    with pytest.raises(PublishError) as raised:
+        backend.send("hello")
+    assert raised.value.already_published
+    assert raised.value.remote_id == "urn:li:share:7123"
+
+# --- OutboxPublisher ---
+
+NOW = 1_000_000.0
+
+@pytest.fixture
+def outbox(db, monkeypatch):
+    """A post queued for X on a fake backend, and a publisher that does not wait."""
+    backend = FakeBackend()
+    monkeypatch.setitem(publishers._backends, "x", backend)
+    post_id = db.save_pending_post("counter", DRAFT, "90%")
+    db.enqueue_outbox(post_id, "x", DRAFT, NOW)
+    worker = publisher.OutboxPublisher(max_attempts=3, backoff_base_seconds=0, backoff_max_seconds=0)
+    return db, backend, worker
+
+def outbox_state(db):
+    status, remote_ids = db.get_connection().execute("SELECT status, remote_ids FROM outbox").fetchone()
+    return status, remote_ids
+
+def test_a_429_mid_thread_resumes_after_the_reset_without_reposting(outbox):
+    db, backend, worker = outbox
+    backend.script = [None, PublishError("429", 429, {"remaining": 0, "reset": NOW + 900})]
+    worker.publish(db.claim_next_outbox(NOW))
+    assert outbox_state(db) == ("queued", '["id1"]')
+    assert db.claim_next_outbox(NOW) is None
+
+    item = db.claim_next_outbox(NOW + 900)
+    assert item["attempts"] == 1
+    worker.publish(item)
+    assert [text[-3:] for text, reply_to in backend.sent] == ["1/3", "2/3", "3/3"]
+    assert [reply_to for text, reply_to in backend.sent] == [None, "id1", "id2"]
+    assert outbox_state(db)[0] == "sent"
+
+def test_a_non_retryable_error_fails_the_row_even_with_a_429_status(outbox):
+    db, backend, worker = outbox
+    backend.script = [PublishError("429 after a partial thread", 429, retryable=False)]
+    worker.publish(db.claim_next_outbox(NOW))
+    assert outbox_state(db)[0] == "failed"
+    assert db.claim_next_outbox(NOW + 10_000) is None
+
+def test_a_thread_interrupted_by_a_crash_resumes_after_a_restart(outbox):
+    db, backend, worker = outbox
+    item = db.claim_next_outbox(NOW)
+
+    class Crash(BaseException):
+        pass
+    backend.script = [None, Crash()]
+    with pytest.raises(Crash):
+        worker.publish(item)
+    assert outbox_state(db) == ("sending", '["id1"]')
+
+    assert db.requeue_interrupted_outbox() == 1
+    worker.publish(db.claim_next_outbox(NOW))
+    assert [text[-3:] for text, reply_to in backend.sent] == ["1/3", "2/3", "3/3"]
+    assert outbox_state(db) == ("sent", '["id1", "id2", "id3"]')
+
+def test_reconfirming_a_failed_thread_resumes_it(outbox):
+    db, backend, worker = outbox
+    backend.script = [None, PublishError("400", 400)]
+    item = db.claim_next_outbox(NOW)
+    worker.publish(item)
+    assert outbox_state(db) == ("failed", '["id1"]')
+
+    assert db.enqueue_outbox(item["post_id"], "x", DRAFT, NOW)
+    worker.publish(db.claim_next_outbox(NOW))
+    assert len(backend.sent) == 3
+    assert outbox_state(db)[0] == "sent"
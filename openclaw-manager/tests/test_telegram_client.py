@@ -0,0 +1,90 @@
+import re
+
+import pytest
+
+from telegram_client import sanitize_markdown, split_message, MAX_MESSAGE_LENGTH
+
+def unescaped(text, marker):
+    """Count of marker characters not preceded by a backslash, outside code spans."""
+    text = re.sub(r"```.*?```|`[^`\n]*`", "", text, flags=re.S)
+    return len(re.findall(r"(?<!\\)" + re.escape(marker), text))
+
+# --- sanitize_markdown ---
+
+def test_double_asterisks_become_telegram_bold():
+    assert sanitize_markdown("**Ready** for tape-out") == "*Ready* for tape-out"
+
+def test_balanced_entities_are_kept():
+    assert sanitize_markdown("*bold* and _italic_") == "*bold* and _italic_"
+
+@pytest.mark.parametrize("text, expected", [
+    ("*unclosed bold", "\\*unclosed bold"),
+    ("_unclosed italic", "\\_unclosed italic"),
+    ("`unclosed code", "\\`unclosed code"),
+    ("[not a link", "\\[not a link"),
+    ("a * b", "a \\* b"),
+])
+def test_unbalanced_markers_are_escaped(text, expected):
+    assert sanitize_markdown(text) == expected
+
+def test_underscores_inside_words_are_escaped():
+    assert sanitize_markdown("design_name_v2 passed") == "design\\_name\\_v2 passed"
+
+def test_markers_between_digits_are_escaped():
+    assert sanitize_markdown("5*3*2") == "5\\*3\\*2"
+
+def test_code_spans_and_links_pass_through():
+    text = "see `run_1/**/x.rpt` and [the report](https://example.com/a_b)"
+    assert sanitize_markdown(text) == text
+
+def test_fenced_code_keeps_markers_literal():
+    text = "```\nworst_slack **0.5**\n```"
+    assert sanitize_markdown(text) == text
+
+def test_existing_escapes_are_not_doubled():
+    assert sanitize_markdown("\\*literal\\*") == "\\*literal\\*"
+
+def test_nested_marker_closes_and_reopens_the_entity():
+    result = sanitize_markdown("*bold with _inner_ text*")
+    assert result == "*bold with *\\_*inner*\\_* text*"
+    assert unescaped(result, "*") % 2 == 0
+
+@pytest.mark.parametrize("text", [
+    "**Area** is 12% below *baseline and slack_ns is +1.2",
+    "_a *b_ c*",
+    "*x* *y _z",
+    "``` unterminated fence *bold*",
+    "[a](b) [c] *d*",
+])
+def test_output_has_balanced_entities(text):
+    result = sanitize_markdown(text)
+    assert unescaped(result, "*") % 2 == 0
+    assert unescaped(result, "_") % 2 == 0
+
+# --- split_message ---
+
+def test_text_at_the_limit_is_one_chunk():
+    text = "x" * MAX_MESSAGE_LENGTH
+    assert split_message(text) == [text]
+
+def test_one_over_the_limit_splits():
+    assert split_message("x" * 11, limit=10) == ["x" * 10, "x"]
+
+def test_splits_prefer_paragraphs_then_lines_then_words():
+    assert split_message("aa\n\nbb\ncc dd", limit=7) == ["aa", "bb", "cc dd"]
+    assert split_message("aaaa bbbb cccc", limit=9) == ["aaaa", "bbbb cccc"]
+
+def test_unbroken_text_is_hard_cut():
+    assert split_message("x" * 25, limit=10) == ["x" * 10, "x" * 10, "x" * 5]
+
+def test_every_chunk_fits_and_nothing_is_lost():
+    text = "\n\n".join(f"Paragraph {i}: " + "word " * (i * 37 % 300) for i in range(60))
+    chunks = split_message(text, limit=500)
+    assert all(0 < len(chunk) <= 500 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+def test_blank_lines_never_make_an_empty_chunk():
+    assert split_message("\n" * 20 + "b", limit=10) == ["b"]
+
+def test_empty_text_has_no_chunks():
+    assert split_message("") == []